@@ -0,0 +1,131 @@
+"""
+批量处理模块
+
+一次请求处理多个条目（URL、HTML内容或文本），供整理阅读清单等场景使用：
+- 条目之间并发处理，同时处理的条目数受 batch_concurrency 限制
+- 同一域名的并发下载数由抓取模块统一限制（fetch_per_host_concurrency）
+- 单个条目失败时只记录该条目的错误，不影响其它条目
+- 直接提交的 HTML 与上传文件一样受 upload_max_bytes 限制，超过时该条目返回 413（异步任务在提交时就拒绝）
+- 流式模式下每个条目完成后立即发出结果（见 streaming.py）
+"""
+
+import asyncio
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel, validator
+
+from cards import save_card
+from config import settings
+from pipeline import extract_content_async, fetch_and_extract, render_extracted, render_result, result_content
+from prompts import PromptReference
+from streaming import encode_event
+
+_URL_PATTERN = re.compile(r'^https?://\S+$')
+
+
+class BatchItem(BaseModel):
+    """批量请求中的一个条目，url / html / text 三者必须且只能提供一个"""
+    url: Optional[str] = None
+    html: Optional[str] = None
+    text: Optional[str] = None
+
+
+class BatchRequest(PromptReference):
+    """批量请求：条目列表，共用同一个提示词（prompt 全文或 prompt_id 引用的预设提示词）"""
+    items: List[BatchItem]
+
+    @validator('items')
+    def validate_items(cls, v):
+        if not v:
+            raise ValueError('items 不能为空')
+        if len(v) > settings.batch_max_items:
+            raise ValueError(f'单次最多处理 {settings.batch_max_items} 个条目')
+        return v
+
+
+def validate_item(item: BatchItem) -> None:
+    """检查条目是否有效，无效时抛出 400；直接提交的 HTML 超过 upload_max_bytes 时抛出 413（与上传文件的上限相同）"""
+    sources = [name for name in ('url', 'html', 'text') if getattr(item, name) is not None]
+    if len(sources) != 1:
+        raise HTTPException(status_code=400, detail="每个条目必须且只能提供 url、html、text 中的一个")
+    if item.html is not None and len(item.html.encode('utf-8')) > settings.upload_max_bytes:
+        raise HTTPException(status_code=413,
+                            detail=f"HTML内容过大，最大支持 {settings.upload_max_bytes // (1024 * 1024)}MB")
+    if item.url is not None and not _URL_PATTERN.match(item.url):
+        raise HTTPException(status_code=400, detail="URL必须以http://或https://开头")
+    if item.text is not None and len(item.text.strip()) < 5:
+        raise HTTPException(status_code=400, detail="请输入有效的文本内容，至少5个字符")
+
+
+async def process_item(item: BatchItem, prompt: str) -> str:
+    """处理单个条目，返回拼接后的结果；条目无效或处理失败时抛出 HTTPException"""
+    validate_item(item)
+    if item.url is not None:
+        return render_extracted(prompt, await fetch_and_extract(item.url), "URL")
+    if item.html is not None:
+        return render_extracted(prompt, await extract_content_async(item.html), "HTML文件")
+    return render_result(prompt, item.text)
+
+
+def item_source(item: BatchItem) -> Tuple[str, Optional[str]]:
+    """条目的来源类型和来源（只记录URL，不记录HTML和文本本身），用于保存卡片"""
+    if item.url is not None:
+        return "url", item.url
+    return ("html" if item.html is not None else "text"), None
+
+
+async def _run_item(index: int, item: BatchItem, prompt: str, semaphore: asyncio.Semaphore,
+                    split: bool = False) -> Dict[str, Any]:
+    """
+    在并发限制下处理一个条目，把异常转换为该条目的错误信息；成功时附带卡片ID
+
+    split 为真时返回正文 content 而不是带提示词的 result，避免每个条目都重复一遍提示词全文
+    """
+    async with semaphore:
+        try:
+            result = await process_item(item, prompt)
+            entry = {"index": index, "ok": True}
+            if split:
+                entry["content"] = result_content(prompt, result)
+            else:
+                entry["result"] = result
+            card_id = await save_card(prompt, result, *item_source(item))
+            if card_id is not None:
+                entry["card_id"] = card_id
+            return entry
+        except HTTPException as e:
+            return {"index": index, "ok": False, "status_code": e.status_code, "error": e.detail}
+        except Exception as e:
+            return {"index": index, "ok": False, "status_code": 500, "error": f"处理失败: {str(e)}"}
+
+
+async def process_batch_items(items: List[BatchItem], prompt: str, split: bool = False) -> List[Dict[str, Any]]:
+    """并发处理所有条目，返回与 items 顺序一致的结果列表"""
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    return await asyncio.gather(*(_run_item(index, item, prompt, semaphore, split)
+                                  for index, item in enumerate(items)))
+
+
+async def iter_batch_events(fmt: str, items: List[BatchItem], prompt: str, split: bool = False,
+                            done_fields: Optional[Dict[str, Any]] = None) -> AsyncIterator[bytes]:
+    """
+    批量处理的事件流：每个条目完成后立即发出 item 事件（按完成顺序，用 index 对应条目），
+    全部完成后发出 done 事件 ``{"succeeded": 成功数, "failed": 失败数}``，加上 done_fields 中的字段
+
+    客户端中途断开连接时，取消尚未完成的条目。
+    """
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    tasks = [asyncio.ensure_future(_run_item(index, item, prompt, semaphore, split))
+             for index, item in enumerate(items)]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            succeeded += result["ok"]
+            yield encode_event(fmt, "item", result)
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield encode_event(fmt, "done", {"succeeded": succeeded, "failed": len(items) - succeeded, **(done_fields or {})})
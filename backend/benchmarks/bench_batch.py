@@ -0,0 +1,88 @@
+"""
+批量处理吞吐量基准测试
+
+本地桩服务器为每个页面模拟固定的网络延迟，比较处理同样数量的URL时：
+- sequential: 前端逐个调用 /process_content（旧方式）
+- batch:      一次调用 /process_batch
+
+测试期间关闭内容缓存，每个URL都真正抓取一次。列表中混入一个返回 404 的URL，
+用于确认单个条目失败不影响其它条目。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_batch.py --urls 120 --delay 0.05
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import StubServer
+
+import httpx
+
+import batch
+import fetcher
+import http_client
+import main
+import pipeline
+
+PAGE = ("<html><body><article>" + "<p>批量处理基准测试页面的正文内容，足够长以通过过滤条件。</p>" * 20 + "</article></body></html>").encode("utf-8")
+
+
+def make_handler(delay: float):
+    def handler(request) -> None:
+        time.sleep(delay)
+        status, body = (404, b"not found") if request.path.startswith("/missing") else (200, PAGE)
+        request.send_response(status)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+    return handler
+
+
+async def run(total: int, delay: float, concurrency: int, per_host: int) -> None:
+    pipeline.content_cache = None
+    batch.settings = dataclasses.replace(batch.settings, batch_concurrency=concurrency, batch_max_items=total)
+    fetcher.host_limiter = fetcher.HostLimiter(per_host)
+
+    results = {"urls": total, "delay_ms": delay * 1000, "batch_concurrency": concurrency, "per_host": per_host}
+    with StubServer(handler=make_handler(delay)) as server:
+        urls = [server.url(f"/page/{i}") for i in range(total - 1)] + [server.url("/missing")]
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            start = time.perf_counter()
+            for i, url in enumerate(urls[:-1]):
+                response = await client.post("/process_content", json={"url": f"{url}?run=seq", "prompt": "总结"})
+                response.raise_for_status()
+            elapsed = time.perf_counter() - start
+            results["sequential"] = {"seconds": round(elapsed, 2), "urls_per_sec": round((total - 1) / elapsed, 1)}
+
+            start = time.perf_counter()
+            response = await client.post("/process_batch", json={
+                "items": [{"url": url} for url in urls], "prompt": "总结"})
+            response.raise_for_status()
+            elapsed = time.perf_counter() - start
+            body = response.json()
+            results["batch"] = {
+                "seconds": round(elapsed, 2),
+                "urls_per_sec": round(total / elapsed, 1),
+                "succeeded": body["succeeded"],
+                "failed": body["failed"],
+            }
+    await http_client.close_client()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=120, help="URL数量")
+    parser.add_argument("--delay", type=float, default=0.05, help="桩服务器每个页面的响应延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=16, help="批量请求内同时处理的条目数")
+    parser.add_argument("--per-host", type=int, default=16, help="同一域名的并发下载数上限")
+    args = parser.parse_args()
+    asyncio.run(run(args.urls, args.delay, args.concurrency, args.per_host))
@@ -0,0 +1,263 @@
+"""
+广告和无关内容过滤规则基准测试
+
+1. 关键词匹配的开销随规则数量的变化（10 / 100 / 1000 / 10000 条），比较：
+   - naive:       逐个关键词 in 查找（规则数为 n 时每段文本查找 n 次）
+   - alternation: 所有关键词直接用 | 连接成一个正则
+   - combined:    boilerplate.compile_keywords()，按前缀合并成字典树后编译的正则
+   文本为样本页面提取出的段落；关键词由样本页面中的常用字随机组成，但以文本中没有的字结尾，
+   前几个字经常匹配而整体不命中，每段文本都要完整扫描（最坏情况）。
+2. 在样本页面上，默认规则、随附规则（boilerplate_rules.json）和随附规则加上 10000 条 class/id 关键词时
+   清理文档树的耗时。
+
+并验证（任一检查失败时以非0状态码退出）：
+- 三种匹配方式的结果完全相同；combined 从 1000 条到 10000 条耗时增长不超过 2 倍，10000 条时比 naive 快 10 倍以上
+- 未配置规则文件时，清理后的文档树与原先 find_all() 移除7种标签的结果完全相同
+- 随附规则移除了样本页面中的评论区、翻页链接、相关推荐等内容，正文段落仍然保留
+- 使用随附规则时，dom (flat) 与增量提取的结果相同
+- 站点规则用于该域名及其子域名，不影响其它站点；上传文件等没有URL的内容使用默认规则
+- 规则文件中有未知的规则名时报错；配置项 extract_boilerplate_rules 指定的规则文件在启动时加载
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_boilerplate.py --sizes 10,100,1000,10000
+"""
+
+import argparse
+import collections
+import dataclasses
+import json
+import random
+import re
+import sys
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import BACKEND_DIR, load_corpus
+
+import boilerplate
+from boilerplate import BoilerplateRules, BoilerplateRuleSet, compile_keywords, create_boilerplate_rules
+from config import settings
+from extractor import extract_main_content, remove_boilerplate
+from incremental_extractor import extract_incremental
+from parsers import available_backends, parse_html
+
+BUNDLED_RULES = BACKEND_DIR / "boilerplate_rules.json"
+PARSERS = [name for name in ("html.parser", "lxml") if name in available_backends()]
+# 样本页面中没有的字
+NEVER_MATCH = "\u9fa5"
+LEGACY_TAGS = ['script', 'style', 'iframe', 'nav', 'footer', 'ads', 'header']
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message, file=sys.stderr)
+    return condition
+
+
+def best_of(run, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def corpus_paragraphs(pages: dict) -> list:
+    texts = []
+    for html in pages.values():
+        texts.extend(extract_main_content(html, "lxml" if "lxml" in PARSERS else None, "flat").split("\n"))
+    return texts
+
+
+def random_keywords(texts: list, count: int, seed: int) -> list:
+    """
+    由文本中最常用的 300 个字随机组成、以文本中没有的字结尾的 2~5 字关键词
+
+    关键词的前几个字经常出现在文本中但整体不会命中，每段文本都要完整扫描一遍（最坏情况）。
+    """
+    chars = [char for char, _ in collections.Counter("".join(texts)).most_common(300)]
+    rng = random.Random(seed)
+    keywords = set()
+    while len(keywords) < count:
+        keywords.add("".join(rng.choice(chars) for _ in range(rng.randint(1, 4))) + NEVER_MATCH)
+    return sorted(keywords)
+
+
+def bench_matchers(texts: list, sizes: list, repeat: int) -> tuple:
+    ok = True
+    report = {}
+    for size in sizes:
+        # 再加上几个一定能在文本中找到的关键词，使结果中既有命中也有未命中
+        keywords = random_keywords(texts, size, size) + ["连接池", "FastAPI"]
+        start = time.perf_counter()
+        combined = compile_keywords(keywords)
+        compile_ms = (time.perf_counter() - start) * 1000
+        search = re.compile("|".join(map(re.escape, keywords))).search
+        matchers = {
+            "naive": lambda text: any(keyword in text for keyword in keywords),
+            "alternation": lambda text: search(text) is not None,
+            "combined": combined,
+        }
+        results = {}
+        row = {"compile_ms": round(compile_ms, 1)}
+        for name, match in matchers.items():
+            results[name] = [match(text) for text in texts]
+            row[f"{name}_us"] = round(best_of(lambda: [match(text) for text in texts], repeat)
+                                      / len(texts) * 1e6, 2)
+        ok &= check(results["alternation"] == results["naive"] == results["combined"],
+                    f"{size} 条关键词: 三种方式的匹配结果相同（命中 {sum(results['naive'])}/{len(texts)} 段）")
+        report[size] = row
+
+    largest, reference = max(sizes), 1000
+    if largest > reference and reference in report:
+        growth = report[largest]["combined_us"] / report[reference]["combined_us"]
+        ok &= check(growth <= 2, f"combined 从 {reference} 条到 {largest} 条关键词耗时增长 {growth:.2f} 倍")
+    speedup = report[largest]["naive_us"] / report[largest]["combined_us"]
+    ok &= check(speedup >= 10, f"{largest} 条关键词时 combined 比 naive 快 {speedup:.0f} 倍")
+    return ok, report
+
+
+def bench_cleanup(pages: dict, repeat: int) -> dict:
+    bundled = BoilerplateRuleSet.load(str(BUNDLED_RULES)).default
+    data = json.loads(BUNDLED_RULES.read_text(encoding="utf-8"))
+    extra = ["x-" + "".join(random.Random(i).choice("abcdefghijklmnopqrstuvwxyz") for _ in range(8))
+             for i in range(10000)]
+    many = BoilerplateRules(data["tags"], data["class_id_tokens"], data["class_id_keywords"] + extra,
+                            data["text_keywords"])
+    variants = {"legacy_find_all": None, "default": BoilerplateRules(), "bundled": bundled,
+                f"bundled+{len(extra)}": many}
+    parser = "lxml" if "lxml" in PARSERS else None
+    report = {}
+    for page, html in pages.items():
+        row = {}
+        for name, rules in variants.items():
+            soups = [parse_html(html, parser) for _ in range(repeat)]
+
+            def run():
+                soup = soups.pop()
+                if rules is None:
+                    for tag in soup.find_all(LEGACY_TAGS):
+                        tag.decompose()
+                else:
+                    remove_boilerplate(soup, rules)
+            row[f"{name}_ms"] = round(best_of(run, repeat) * 1000, 2)
+        report[page] = row
+    return report
+
+
+def verify_default(pages: dict) -> bool:
+    mismatched = []
+    for name, html in pages.items():
+        legacy, soup = parse_html(html), parse_html(html)
+        for tag in legacy.find_all(LEGACY_TAGS):
+            tag.decompose()
+        remove_boilerplate(soup, BoilerplateRules())
+        if str(legacy) != str(soup):
+            mismatched.append(name)
+    return check(not mismatched, f"默认规则清理后的 {len(pages)} 个页面与原先移除7种标签的结果相同"
+                 + (f"，不同: {mismatched}" if mismatched else ""))
+
+
+def with_rules(rule_set: BoilerplateRuleSet, run):
+    original = boilerplate.boilerplate_rules
+    boilerplate.boilerplate_rules = rule_set
+    try:
+        return run()
+    finally:
+        boilerplate.boilerplate_rules = original
+
+
+def verify_bundled(pages: dict) -> bool:
+    ok = True
+    rule_set = BoilerplateRuleSet.load(str(BUNDLED_RULES))
+    expected = {
+        "blog_tech": (["写得很清楚", "上一篇"], "用 asyncio 编写高并发爬虫"),
+        "wechat_article": (["阅读原文"], "看得越多，反而越焦虑"),
+    }
+    for name, (removed, kept) in expected.items():
+        url = "https://mp.weixin.qq.com/s/abc" if name == "wechat_article" else None
+        before = extract_main_content(pages[name], None, "flat", url)
+        after = with_rules(rule_set, lambda: extract_main_content(pages[name], None, "flat", url))
+        ok &= check(all(text in before and text not in after for text in removed) and kept in after,
+                    f"{name}: 随附规则移除了 {removed}，保留正文（{len(before)} -> {len(after)} 字符）")
+
+    soup = parse_html(pages["news_zh"])
+    with_rules(rule_set, lambda: remove_boilerplate(soup, rule_set.default))
+    leftover = [selector for selector in ("div.ad-banner", "div.related-news", "div.breadcrumb", "aside")
+                if soup.select_one(selector) is not None]
+    ok &= check(not leftover, "news_zh: 广告位、相关阅读、面包屑导航和侧栏已从文档树中移除"
+                + (f"，残留: {leftover}" if leftover else ""))
+
+    for parser in PARSERS:
+        mismatched = [name for name, html in pages.items()
+                      if with_rules(rule_set, lambda: extract_incremental(html, parser, 0, 0))
+                      != with_rules(rule_set, lambda: extract_main_content(html, parser, "flat"))]
+        ok &= check(not mismatched, f"{parser}: 随附规则下 {len(pages)} 个页面的增量提取结果与 dom (flat) 相同"
+                    + (f"，不同: {mismatched}" if mismatched else ""))
+    return ok
+
+
+def verify_sites(pages: dict) -> bool:
+    ok = True
+    rule_set = BoilerplateRuleSet.from_dict({
+        "text_keywords": ["广告"],
+        "sites": {
+            "mp.weixin.qq.com": {"text_keywords": ["阅读原文"]},
+            "example.com": {"inherit": False, "tags": ["script"]},
+        },
+    })
+    site = rule_set.sites["mp.weixin.qq.com"]
+    ok &= check(rule_set.for_url("https://mp.weixin.qq.com/s/abc") is site
+                and rule_set.for_url("http://a.mp.weixin.qq.com/") is site
+                and rule_set.for_url("https://weixin.qq.com/") is rule_set.default
+                and rule_set.for_url("https://notmp.weixin.qq.com.evil.cn/") is rule_set.default
+                and rule_set.for_url(None) is rule_set.default,
+                "站点规则用于该域名及其子域名，其它域名和没有URL时使用默认规则")
+    ok &= check(site.is_boilerplate_text("广告位招租，联系方式见下方") and site.is_boilerplate_text("点击阅读原文")
+                and not rule_set.default.is_boilerplate_text("点击阅读原文")
+                and not rule_set.for_url("https://example.com/").is_boilerplate_text("广告位招租，联系方式见下方"),
+                "站点规则默认在默认规则上追加，inherit=false 时只使用站点自己的规则")
+
+    html = pages["wechat_article"]
+    with_url = with_rules(rule_set, lambda: extract_main_content(html, url="https://mp.weixin.qq.com/s/abc"))
+    without_url = with_rules(rule_set, lambda: extract_main_content(html))
+    ok &= check("阅读原文" not in with_url and "阅读原文" in without_url,
+                "按URL提取时使用站点规则，没有URL时使用默认规则")
+
+    try:
+        BoilerplateRuleSet.from_dict({"sites": {"example.com": {"text_keyword": ["广告"]}}})
+        ok &= check(False, "未知的规则名应报错")
+    except ValueError as exc:
+        ok &= check(True, f"未知的规则名报错: {exc}")
+
+    loaded = create_boilerplate_rules(dataclasses.replace(settings, extract_boilerplate_rules=str(BUNDLED_RULES)))
+    ok &= check("mp.weixin.qq.com" in loaded.sites and loaded.default.rule_count > 10
+                and create_boilerplate_rules(dataclasses.replace(settings, extract_boilerplate_rules=""))
+                .default.tags == frozenset(LEGACY_TAGS),
+                f"配置 extract_boilerplate_rules 后加载规则文件（默认规则 {loaded.default.rule_count} 条）")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="关键词数量，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    corpus = load_corpus()
+    paragraphs = [text for text in corpus_paragraphs(corpus) if text]
+    ok, matcher_report = bench_matchers(paragraphs, sizes, args.repeat)
+    ok &= verify_default(corpus)
+    ok &= verify_bundled(corpus)
+    ok &= verify_sites(corpus)
+    report = {
+        "paragraphs": len(paragraphs),
+        "keyword_match_per_paragraph": matcher_report,
+        "cleanup": bench_cleanup({name: html for name, html in corpus.items() if name != "forum_thread_huge"},
+                                 args.repeat),
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,224 @@
+"""
+卡片存储基准测试
+
+用样本页面（不含超长论坛帖子）的提取结果搭配各预设提示词生成一批卡片（每个页面再生成若干个正文略有不同的版本，
+模拟同一提示词被大量卡片使用的情况），分别用 zstd / zlib 压缩保存，报告：
+- 写入和读取的吞吐量（卡片/秒），以及分页列出全部卡片的耗时
+- 数据库文件大小，与所有结果原文的字节数、以及“每行直接保存完整结果”的朴素 sqlite 表对比
+
+并验证（任一检查失败时以非0状态码退出）：
+- 读取的结果与保存时完全相同，重复保存返回同一个卡片ID且不新增数据
+- 提示词只保存一份：blob 数等于不同提示词数加不同正文数
+- 删除卡片后不再被引用的 blob 一并删除
+- 接口：生成结果时返回 card_id，GET /cards/{id} 返回相同的结果并支持 304，分页列表覆盖全部卡片
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_cards.py --copies 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus
+
+import httpx
+
+import cards
+import main
+from cards import CardStore
+from extractor import extract_main_content
+from pipeline import render_extracted
+from prompts import prompt_store
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message, file=sys.stderr)
+    return condition
+
+
+def build_cards(copies: int) -> list:
+    """返回 (提示词, 结果) 列表"""
+    prompts = [template.body for template in prompt_store.list()]
+    pages = load_corpus()
+    # 超长论坛帖子单张卡片就有几MB，会掩盖典型卡片的读写耗时
+    pages.pop("forum_thread_huge", None)
+    contents = [extract_main_content(html) for html in pages.values()]
+    items = []
+    for content in contents:
+        for copy in range(copies):
+            variant = content if copy == 0 else f"{content}\n（第 {copy} 版）"
+            for prompt in prompts:
+                items.append((prompt, render_extracted(prompt, variant, "URL")))
+    return items
+
+
+def file_bytes(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def naive_size(path: str, items: list) -> int:
+    """每行直接保存完整结果（不去重、不压缩）时的数据库大小"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("CREATE TABLE cards (id INTEGER PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)")
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO cards (result, created_at) VALUES (?, ?)",
+                     [(result, time.time()) for _, result in items])
+    conn.execute("COMMIT")
+    conn.close()
+    return file_bytes(path)
+
+
+def bench_codec(codec: str, items: list, tmp: str) -> tuple:
+    path = os.path.join(tmp, f"cards-{codec}.sqlite3")
+    store = CardStore(path, codec)
+    start = time.perf_counter()
+    ids = [store.save(prompt, result, "url", f"https://example.com/{i}") for i, (prompt, result) in enumerate(items)]
+    write = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = [store.get(card_id).result for card_id in ids]
+    read = time.perf_counter() - start
+
+    start = time.perf_counter()
+    listed, cursor = [], None
+    while True:
+        page, cursor = store.list(100, cursor)
+        listed.extend(page)
+        if cursor is None:
+            break
+    listing = time.perf_counter() - start
+    stats = store.stats()
+    store.close()
+
+    report = {
+        "codec": stats["codec"],
+        "cards": stats["cards"],
+        "writes_per_sec": round(len(items) / write),
+        "reads_per_sec": round(len(items) / read),
+        "list_all_ms": round(listing * 1000, 1),
+        "blobs": stats["blobs"],
+        "blob_bytes": stats["blob_bytes"],
+        "stored_bytes": stats["stored_bytes"],
+        "file_bytes": file_bytes(path),
+    }
+    return report, ids, loaded, len(listed), path
+
+
+def verify_store(items: list, ids: list, loaded: list, listed: int, path: str, codec: str) -> bool:
+    ok = True
+    results = [result for _, result in items]
+    ok &= check(loaded == results, f"{codec}: 读取的 {len(loaded)} 张卡片与保存时完全相同")
+    ok &= check(listed == len(set(ids)), f"{codec}: 分页列出 {listed} 张卡片")
+
+    store = CardStore(path, codec)
+    before = store.stats()
+    again = store.save(*items[0], "url")
+    after = store.stats()
+    ok &= check(again == ids[0] and after["cards"] == before["cards"] and after["blobs"] == before["blobs"],
+                f"{codec}: 重复保存返回同一个卡片ID，不新增数据")
+    prompts = {prompt for prompt, _ in items}
+    contents = {result[len(cards.render_result(prompt, "")):] for prompt, result in items}
+    ok &= check(before["blobs"] == len(prompts) + len(contents),
+                f"{codec}: {len(items)} 张卡片共 {before['blobs']} 个 blob（{len(prompts)} 个提示词 + {len(contents)} 个正文）")
+
+    # 删除用到同一正文的全部卡片后，该正文被删除，提示词仍被其它卡片引用而保留
+    content = items[0][1][len(cards.render_result(items[0][0], "")):]
+    victims = [card_id for card_id, (prompt, result) in zip(ids, items)
+               if result[len(cards.render_result(prompt, "")):] == content]
+    for card_id in victims:
+        store.delete(card_id)
+    final = store.stats()
+    ok &= check(final["blobs"] == before["blobs"] - 1 and store.get(victims[0]) is None,
+                f"{codec}: 删除 {len(victims)} 张卡片后只删除了不再被引用的正文")
+    store.close()
+    return ok
+
+
+async def wait_job_result(client: httpx.AsyncClient, job_id: str, timeout: float = 30) -> httpx.Response:
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get(f"/jobs/{job_id}/result")
+        if response.status_code != 202 or time.perf_counter() > deadline:
+            return response
+        await asyncio.sleep(0.05)
+
+
+async def verify_api() -> bool:
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        cards.card_store = CardStore(os.path.join(tmp, "cards.sqlite3"))
+        prompt = prompt_store.list()[0].body
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            created = []
+            for i in range(5):
+                body = {"text": f"第 {i} 段测试文本，用于验证卡片存储。", "prompt": prompt}
+                created.append((await client.post("/process_text_input", json=body)).json())
+            ok &= check(all("card_id" in item for item in created), "生成结果时返回 card_id")
+
+            response = await client.get(f"/cards/{created[0]['card_id']}")
+            ok &= check(response.status_code == 200 and response.json()["result"] == created[0]["result"],
+                        "GET /cards/{id} 返回与生成时相同的结果")
+            revalidated = await client.get(f"/cards/{created[0]['card_id']}",
+                                           headers={"If-None-Match": response.headers["etag"]})
+            ok &= check(revalidated.status_code == 304, f"带 If-None-Match 重新请求返回 {revalidated.status_code}")
+
+            listed, cursor = [], None
+            while True:
+                page = (await client.get("/cards", params={"limit": 2, **({"cursor": cursor} if cursor else {})})).json()
+                listed.extend(item["id"] for item in page["cards"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            ok &= check(listed == [item["card_id"] for item in reversed(created)],
+                        f"每页 2 张分页列出全部 {len(listed)} 张卡片，按生成时间倒序")
+
+            streamed = await client.post("/process_text_input", params={"stream": "ndjson"},
+                                         json={"text": "第 1 段测试文本，用于验证卡片存储。", "prompt": prompt})
+            done = json.loads(streamed.text.splitlines()[-1])
+            ok &= check(done["event"] == "done" and done.get("card_id") == created[1]["card_id"],
+                        "流式响应的 done 事件中附带与非流式响应相同的 card_id")
+
+            deleted = await client.delete(f"/cards/{created[0]['card_id']}")
+            missing = await client.get(f"/cards/{created[0]['card_id']}")
+            ok &= check(deleted.status_code == 200 and missing.status_code == 404, "删除后返回 404")
+
+            # 关闭服务时会一并关闭卡片存储，所以放在最后
+            async with main.lifespan(main.app):
+                submitted = await client.post("/jobs", json={"text": "异步任务的测试文本，结果同样保存为卡片。",
+                                                             "prompt": prompt})
+                job_result = await wait_job_result(client, submitted.json()["job_id"])
+                job_card = job_result.json().get("card_id")
+                saved = (await client.get(f"/cards/{job_card}")) if job_card else None
+            ok &= check(saved is not None and saved.status_code == 200
+                        and saved.json()["result"] == job_result.json()["result"],
+                        "异步任务的结果同样保存为卡片并返回 card_id")
+        cards.card_store.close()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=50, help="每个样本页面生成的正文版本数")
+    args = parser.parse_args()
+
+    items = build_cards(args.copies)
+    ok = True
+    report = {"cards": len(items), "result_bytes": sum(len(result.encode("utf-8")) for _, result in items)}
+    with tempfile.TemporaryDirectory() as tmp:
+        report["naive_file_bytes"] = naive_size(os.path.join(tmp, "naive.sqlite3"), items)
+        for codec in ("zstd", "zlib"):
+            result, ids, loaded, listed, path = bench_codec(codec, items, tmp)
+            report[codec] = result
+            ok &= verify_store(items, ids, loaded, listed, path, codec)
+    ok &= asyncio.run(verify_api())
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if ok else 1)
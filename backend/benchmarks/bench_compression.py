@@ -0,0 +1,128 @@
+"""
+响应压缩基准测试
+
+1. 对典型的响应体（各样本页面的 /process_content 结果、超长论坛帖子的结果、
+   /preset_prompts 全部提示词）分别用 gzip / br / zstd 的几个压缩级别压缩，
+   报告压缩后的字节数、压缩率和单次压缩的CPU耗时
+2. 通过接口请求验证：每种可用的算法返回的响应解压后与不压缩的响应完全一致，
+   流式响应不压缩（失败时以非0状态码退出）
+
+br 需要安装 brotli，zstd 需要安装 zstandard，未安装的算法跳过。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_compression.py --repeat 20
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus
+
+import httpx
+
+import main
+from content_encoding import _brotli_compressor, _gzip_compressor, _zstd_compressor, compressors
+from extractor import extract_main_content
+from pipeline import render_result
+from prompts import prompt_store
+
+# 每种算法测试的压缩级别（包含默认配置使用的级别）
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 11), "zstd": (1, 3, 9)}
+FACTORIES = {"gzip": _gzip_compressor, "br": _brotli_compressor, "zstd": _zstd_compressor}
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        import brotli
+        return brotli.decompress(data)
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def build_payloads() -> dict:
+    prompt = prompt_store.list()[0].body
+    pages = load_corpus()
+    huge = pages.pop("forum_thread_huge", None)
+    payloads = {
+        "process_content_typical": [json.dumps({"result": render_result(prompt, extract_main_content(html))},
+                                               ensure_ascii=False).encode("utf-8") for html in pages.values()],
+        "preset_prompts": [prompt_store.preset().data],
+    }
+    if huge is not None:
+        payloads["process_content_huge"] = [json.dumps({"result": render_result(prompt, extract_main_content(huge))},
+                                                       ensure_ascii=False).encode("utf-8")]
+    return payloads
+
+
+def bench_codecs(payloads: dict, repeat: int) -> dict:
+    results = {}
+    for name, bodies in payloads.items():
+        raw = sum(len(body) for body in bodies)
+        entry = {"bodies": len(bodies), "identity_bytes": raw}
+        for encoding, levels in LEVELS.items():
+            for level in levels:
+                compressor = FACTORIES[encoding](level)
+                if compressor is None:
+                    continue
+                runs = max(1, repeat // 10) if raw > 256 * 1024 else repeat
+                start = time.perf_counter()
+                for _ in range(runs):
+                    compressed = [compressor(body) for body in bodies]
+                elapsed = (time.perf_counter() - start) / runs
+                size = sum(len(c) for c in compressed)
+                entry[f"{encoding}-{level}"] = {
+                    "bytes": size,
+                    "ratio": round(raw / size, 2),
+                    "cpu_ms": round(elapsed * 1000, 3),
+                    "mb_per_sec": round(raw / 1024 / 1024 / elapsed, 1),
+                }
+        results[name] = entry
+    return results
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message, file=sys.stderr)
+    return condition
+
+
+async def fetch_raw(client: httpx.AsyncClient, method: str, path: str, encoding: str, **kwargs):
+    headers = {"Accept-Encoding": encoding}
+    async with client.stream(method, path, headers=headers, **kwargs) as response:
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response, raw
+
+
+async def verify() -> bool:
+    ok = True
+    body = {"text": load_corpus()["news_zh"], "prompt": prompt_store.list()[0].body}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for method, path, kwargs in (("GET", "/preset_prompts", {}), ("POST", "/process_text_input", {"json": body})):
+            _, identity = await fetch_raw(client, method, path, "identity", **kwargs)
+            for encoding in compressors:
+                response, raw = await fetch_raw(client, method, path, encoding, **kwargs)
+                used = response.headers.get("content-encoding")
+                ok &= check(used == encoding and decompress(encoding, raw) == identity,
+                            f"{method} {path} 使用 {encoding}: {len(identity)} -> {len(raw)} 字节，解压后一致")
+        response, _ = await fetch_raw(client, "POST", "/process_text_input?stream=ndjson", "gzip", json=body)
+        ok &= check("content-encoding" not in response.headers, "NDJSON 流式响应不压缩")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="每种压缩级别的重复次数")
+    args = parser.parse_args()
+
+    print(json.dumps(bench_codecs(build_payloads(), args.repeat), indent=2))
+    sys.exit(0 if asyncio.run(verify()) else 1)
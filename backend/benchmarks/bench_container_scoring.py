@@ -0,0 +1,98 @@
+"""
+内容容器选择基准测试
+
+对比两种容器选择方式在深度嵌套页面上的耗时，并检查二者选中的是同一个元素
+（样本页面上任一页面不同时以非0状态码退出；随机文档树上的对比见 tests/test_container_scoring.py）：
+- select: 旧实现，依次执行13个CSS选择器，再对每个候选调用 get_text()
+- walk:   新实现 extractor.find_main_container()，单次遍历完成打分
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_container_scoring.py --depth 200 --width 20
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus
+
+from extractor import find_main_container
+from parsers import parse_html
+
+LEGACY_SELECTORS = [
+    'article', 'main', '.content', '.article', '.post', '#content', '#article', '#main',
+    '[class*="article"]', '[class*="content"]', '[class*="post"]', '.post-content', '.entry-content'
+]
+
+
+def legacy_find_container(soup):
+    """旧实现：多次 select + 对每个候选调用 get_text()"""
+    potential_containers = []
+    for selector in LEGACY_SELECTORS:
+        potential_containers.extend(soup.select(selector))
+    if not potential_containers:
+        return None
+    return max(potential_containers, key=lambda x: len(x.get_text(strip=True)))
+
+
+def build_nested_page(depth: int, width: int) -> str:
+    """生成一个每层都带有 content/post 类名的深度嵌套页面"""
+    html = ""
+    for level in range(depth):
+        paragraphs = "".join(f"<p>第{level}层第{i}段正文内容。</p>" for i in range(width))
+        css = ("post-content", "article-body", "content-wrap", "main-post")[level % 4]
+        html = f"<div class='{css}'>{paragraphs}{html}<a href='#'>相关链接{level}</a></div>"
+    return f"<html><body>{html}</body></html>"
+
+
+def strip_noise(soup):
+    for tag in soup.find_all(['script', 'style', 'iframe', 'nav', 'footer', 'ads', 'header']):
+        tag.decompose()
+    return soup
+
+
+def time_it(func, soup, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(soup)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=200, help="嵌套层数")
+    parser.add_argument("--width", type=int, default=20, help="每层的段落数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    # 样本页面上两种实现必须选中同一个元素
+    pages = dict(load_corpus())
+    pages["nested"] = build_nested_page(args.depth, args.width)
+    mismatches = []
+    for name, html in pages.items():
+        soup = strip_noise(parse_html(html))
+        if legacy_find_container(soup) is not find_main_container(soup):
+            mismatches.append(name)
+
+    soup = strip_noise(parse_html(pages["nested"]))
+    legacy = time_it(legacy_find_container, soup, args.repeat)
+    walk = time_it(find_main_container, soup, args.repeat)
+    print(json.dumps({
+        "mismatches": mismatches,
+        "nested_elements": len(soup.find_all(True)),
+        "select_ms": round(legacy * 1000, 2),
+        "walk_ms": round(walk * 1000, 2),
+        "speedup": round(legacy / walk, 1),
+    }, ensure_ascii=False, indent=2))
+    if mismatches:
+        print(f"失败  新旧实现在以下页面上选中的容器不同: {mismatches}", file=sys.stderr)
+        return 1
+    print("通过  新旧实现在所有样本页面上选中同一个容器", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
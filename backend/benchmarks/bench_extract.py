@@ -0,0 +1,202 @@
+"""
+正文提取基准测试
+
+在 corpus/ 下的样本页面（中文新闻、技术博客、公众号文章、普通论坛帖子、
+几千楼的超长论坛帖子等）上运行 extract_main_content()，对每个页面报告：
+
+- 每页耗时的 p50 / p99 / 平均值，每秒处理的页面数和MB数
+- 单次提取的 Python 内存分配峰值（tracemalloc，单独一轮测量，不影响计时）
+- 提取结果与 golden 标准结果是否一致，不一致时附带差异的前几行
+
+以及整个语料库的总吞吐量（每个页面各处理一次）和进程峰值常驻内存。
+结果可以写入 JSON 文件，并与之前保存的结果比较，用于跟踪性能回退：
+
+    python benchmarks/bench_extract.py --json results.json
+    python benchmarks/bench_extract.py --baseline results.json --max-regression 0.2
+
+golden 结果不一致、或 p50 比基准结果慢超过 --max-regression 时以非0状态码退出。
+修改提取算法并确认新结果正确后，用 --update-golden 重新生成 golden 结果。
+
+所有输入都来自本地文件，可离线运行。
+"""
+
+import argparse
+import difflib
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import common  # noqa: F401  (设置 sys.path)
+from common import BACKEND_DIR, load_corpus, load_golden, peak_rss_mb, save_golden, summarize
+
+from config import settings
+from extractor import extract_main_content
+from parsers import resolve_backend
+
+# golden 差异最多显示的行数
+MAX_DIFF_LINES = 20
+
+
+def golden_diff(expected: str, actual: str) -> List[str]:
+    """返回 golden 结果与实际结果的差异（unified diff 的前几行）"""
+    diff = difflib.unified_diff(expected.splitlines(), actual.splitlines(),
+                                fromfile="golden", tofile="actual", lineterm="", n=1)
+    lines = []
+    for line in diff:
+        if len(lines) >= MAX_DIFF_LINES:
+            lines.append("...")
+            break
+        lines.append(line if len(line) <= 200 else line[:200] + "...")
+    return lines
+
+
+def time_page(html: str, parser: str, mode: str, min_runs: int, min_time: float) -> List[float]:
+    """重复提取同一页面，至少 min_runs 次且总时长至少 min_time 秒，返回每次的耗时"""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    while len(latencies) < min_runs or time.perf_counter() - started < min_time:
+        start = time.perf_counter()
+        extract_main_content(html, parser, mode)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def peak_alloc_mb(html: str, parser: str, mode: str) -> float:
+    """单次提取过程中 Python 内存分配的峰值（MB）"""
+    tracemalloc.start()
+    try:
+        extract_main_content(html, parser, mode)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024 / 1024, 2)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pages: Dict[str, str], parser: str, mode: str, min_runs: int, min_time: float,
+        measure_memory: bool) -> dict:
+    results = {}
+    for name, html in pages.items():
+        size = len(html.encode("utf-8"))
+        # 第一次提取同时用于检查 golden 结果和预热
+        output = extract_main_content(html, parser, mode)
+        golden = load_golden(name)
+        page = {"bytes": size, "output_chars": len(output)}
+        if golden is None:
+            page["golden"] = "missing"
+        elif golden == output:
+            page["golden"] = "match"
+        else:
+            page["golden"] = "mismatch"
+            page["diff"] = golden_diff(golden, output)
+
+        latencies = time_page(html, parser, mode, min_runs, min_time)
+        stats = summarize(latencies)
+        mean = stats["mean_ms"] / 1000
+        page.update(stats)
+        page["runs"] = len(latencies)
+        page["pages_per_sec"] = round(1 / mean, 2) if mean else None
+        page["mb_per_sec"] = round(size / 1024 / 1024 / mean, 2) if mean else None
+        if measure_memory:
+            page["peak_alloc_mb"] = peak_alloc_mb(html, parser, mode)
+        results[name] = page
+        print(f"{name:24s} {size / 1024:9.1f} KB  p50 {stats['p50_ms']:9.2f} ms  p99 {stats['p99_ms']:9.2f} ms"
+              f"  golden {page['golden']}", file=sys.stderr)
+
+    total_seconds = sum(page["mean_ms"] for page in results.values()) / 1000
+    total_bytes = sum(page["bytes"] for page in results.values())
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parser": parser,
+            "paragraph_mode": mode,
+        },
+        "pages": results,
+        "totals": {
+            "pages": len(results),
+            "corpus_bytes": total_bytes,
+            "pages_per_sec": round(len(results) / total_seconds, 2) if total_seconds else None,
+            "mb_per_sec": round(total_bytes / 1024 / 1024 / total_seconds, 2) if total_seconds else None,
+            "golden_mismatches": [name for name, page in results.items() if page["golden"] == "mismatch"],
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> List[dict]:
+    """与基准结果比较每个页面的 p50，返回变慢超过 max_regression 的页面"""
+    regressions = []
+    for name, page in report["pages"].items():
+        before = baseline.get("pages", {}).get(name)
+        if not before or not before.get("p50_ms"):
+            continue
+        change = page["p50_ms"] / before["p50_ms"] - 1
+        page["p50_change"] = round(change, 3)
+        if change > max_regression:
+            regressions.append({"page": name, "baseline_p50_ms": before["p50_ms"],
+                                "p50_ms": page["p50_ms"], "change": round(change, 3)})
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parser", default=None, help="HTML解析器，默认使用配置项 html_parser")
+    parser.add_argument("--paragraph-mode", default=None, help="段落模式，默认使用配置项 extract_paragraph_mode")
+    parser.add_argument("--pages", nargs="*", help="只测试指定的页面（页面名不含扩展名）")
+    parser.add_argument("--min-runs", type=int, default=5, help="每个页面至少重复的次数")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每个页面至少重复的总秒数")
+    parser.add_argument("--no-memory", action="store_true", help="跳过 tracemalloc 内存测量")
+    parser.add_argument("--json", help="把结果写入该 JSON 文件")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果比较")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="p50 允许变慢的比例")
+    parser.add_argument("--update-golden", action="store_true", help="用当前的提取结果重新生成 golden 结果")
+    args = parser.parse_args()
+
+    backend = resolve_backend(args.parser)
+    mode = args.paragraph_mode or settings.extract_paragraph_mode
+    pages = load_corpus()
+    if args.pages:
+        missing = set(args.pages) - set(pages)
+        if missing:
+            parser.error(f"样本页面不存在: {', '.join(sorted(missing))}")
+        pages = {name: html for name, html in pages.items() if name in args.pages}
+
+    if args.update_golden:
+        for name, html in pages.items():
+            save_golden(name, extract_main_content(html, backend, mode))
+        print(f"已更新 {len(pages)} 个页面的 golden 结果（parser={backend}, paragraph_mode={mode}）")
+        return 0
+
+    report = run(pages, backend, mode, args.min_runs, args.min_time, not args.no_memory)
+    failed = bool(report["totals"]["golden_mismatches"])
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        report["regressions"] = regressions
+        failed |= bool(regressions)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
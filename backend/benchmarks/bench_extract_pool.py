@@ -0,0 +1,99 @@
+"""
+提取执行池负载测试
+
+模拟若干个并发的大HTML文件上传（/process_html_file），同时持续请求轻量接口
+/preset_prompts，比较不同执行池类型下轻量接口的延迟：
+
+- inline:  旧实现，提取直接在事件循环中执行，会阻塞其它请求
+- thread:  线程池
+- process: 进程池
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_extract_pool.py --uploads 8 --paragraphs 20000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import summarize
+
+import httpx
+
+import main
+from workers import ExtractionPool
+
+
+# 轻量请求之间的间隔（秒）
+LIGHT_INTERVAL = 0.01
+
+
+def build_page(paragraphs: int) -> bytes:
+    body = "".join(
+        f"<div class='post'><p>第{i}段：这是一段用于负载测试的较长正文内容，包含足够多的文字。</p></div>"
+        for i in range(paragraphs)
+    )
+    return f"<html><body><article>{body}</article></body></html>".encode("utf-8")
+
+
+async def run_scenario(kind: str, page: bytes, uploads: int, workers: int) -> dict:
+    pool = ExtractionPool(kind=kind, workers=workers, max_queue=uploads)
+    main.extraction_pool = pool
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        upload_done = asyncio.Event()
+        light_latencies = []
+
+        async def upload():
+            response = await client.post(
+                "/process_html_file",
+                files={"file": ("page.html", page, "text/html")},
+                data={"prompt": "总结"},
+            )
+            response.raise_for_status()
+
+        async def light():
+            # 延迟从“计划发出请求的时刻”算起，这样事件循环被阻塞的时间也会计入
+            scheduled = time.perf_counter()
+            while True:
+                response = await client.get("/preset_prompts")
+                response.raise_for_status()
+                now = time.perf_counter()
+                light_latencies.append(now - scheduled)
+                if upload_done.is_set():
+                    break
+                scheduled = now + LIGHT_INTERVAL
+                await asyncio.sleep(LIGHT_INTERVAL)
+
+        start = time.perf_counter()
+        light_task = asyncio.create_task(light())
+        await asyncio.gather(*(upload() for _ in range(uploads)))
+        elapsed = time.perf_counter() - start
+        upload_done.set()
+        await light_task
+    pool.shutdown()
+    return {
+        "uploads_total_s": round(elapsed, 2),
+        "preset_prompts_requests": len(light_latencies),
+        **{f"preset_prompts_{k}": v for k, v in summarize(light_latencies).items()},
+    }
+
+
+async def main_async(uploads: int, paragraphs: int, workers: int) -> None:
+    page = build_page(paragraphs)
+    results = {"page_bytes": len(page)}
+    for kind in ("inline", "thread", "process"):
+        results[kind] = await run_scenario(kind, page, uploads, workers)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=8, help="并发上传数")
+    parser.add_argument("--paragraphs", type=int, default=20000, help="测试页面的段落数")
+    parser.add_argument("--workers", type=int, default=4, help="执行池工作线程/进程数")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.uploads, args.paragraphs, args.workers))
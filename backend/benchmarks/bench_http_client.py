@@ -0,0 +1,75 @@
+"""
+共享HTTP客户端基准测试
+
+对比两种抓取方式访问本地桩服务器时的连接（握手）次数与 p50/p99 延迟：
+- per_request: 旧实现，每次请求都新建一个 httpx.AsyncClient
+- shared:      新实现，整个应用共享一个带连接池的客户端
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_http_client.py --requests 500 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import StubServer, summarize
+
+import httpx
+
+import http_client
+from fetcher import fetch_url_with_retry
+
+PAGE = ("<html><body><article>" + "<p>这是一段用于基准测试的正文内容。</p>" * 50 + "</article></body></html>").encode("utf-8")
+
+
+async def _run(fetch, url: str, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(url)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, time.perf_counter() - start
+
+
+async def fetch_per_request(url: str) -> str:
+    """旧实现：每次请求新建客户端"""
+    async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
+        response = await client.get(url, headers=http_client.DEFAULT_HEADERS)
+        response.raise_for_status()
+        return response.text
+
+
+async def main(total: int, concurrency: int) -> None:
+    routes = {"/page": (200, {"Content-Type": "text/html; charset=utf-8"}, PAGE)}
+    results = {}
+    with StubServer(routes) as server:
+        url = server.url("/page")
+        for name, fetch in (("per_request", fetch_per_request), ("shared", fetch_url_with_retry)):
+            server.reset_counters()
+            latencies, elapsed = await _run(fetch, url, total, concurrency)
+            results[name] = {
+                "connections": server.connections,
+                "requests": server.requests,
+                "req_per_sec": round(total / elapsed, 1),
+                **summarize(latencies),
+            }
+        await http_client.close_client()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="总请求数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发数")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
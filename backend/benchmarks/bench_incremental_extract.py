@@ -0,0 +1,162 @@
+"""
+增量提取基准测试
+
+用 make_huge_forum.py 生成约 10MB 的超长帖子页面（以及把楼层列表标记为内容容器的变体），比较：
+- dom:         先用 BeautifulSoup 建立完整文档树再提取（html.parser / lxml）
+- incremental: 边解析边打分，不建立文档树（不设预算，读完整个页面）
+- incremental + 预算: 正文达到 --max-chars 个字符后停止解析
+
+报告每种方式的耗时、tracemalloc 统计的内存峰值、输出字符数，以及停止解析前读取的HTML比例
+（按 64KB 分块喂入，模拟边下载边解析）。
+
+dom 方式默认只用 lxml 测量 10MB 页面：BeautifulSoup 的 html.parser 构建器用列表记录已关闭的空元素，
+<br> 很多的页面上耗时随页面大小平方增长，10MB 页面要一百多秒；需要时用 --dom-parsers html.parser,lxml。
+
+并验证（任一检查失败时以非0状态码退出）：
+- 不设预算时，增量提取的结果与 flat 段落模式的 dom 提取完全相同（样本页面使用每种可用的解析器，10MB 页面使用 --dom-parsers）
+- 设置预算时，输出不超过预算，且等于完整结果按预算截断后的内容
+- 设置预算时，10MB 页面只读取了开头的一小部分
+- 配置 extract_engine=incremental 后，extract_main_content() 改用增量提取
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_incremental_extract.py --posts 13000 --max-chars 4000 --dom-parsers lxml
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+import time
+import tracemalloc
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus
+
+import extractor
+import incremental_extractor
+from extractor import apply_output_budget, extract_main_content
+from incremental_extractor import CHUNK_CHARS, extract_incremental
+from make_huge_forum import build_page
+from parsers import available_backends
+
+PARSERS = [name for name in ("html.parser", "lxml") if name in available_backends()]
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message, file=sys.stderr)
+    return condition
+
+
+class CountingChunks:
+    """按块产生页面内容，并记录实际被读取的字符数"""
+
+    def __init__(self, html: str):
+        self.html = html
+        self.consumed = 0
+
+    def __iter__(self):
+        for start in range(0, len(self.html), CHUNK_CHARS):
+            chunk = self.html[start:start + CHUNK_CHARS]
+            self.consumed += len(chunk)
+            yield chunk
+
+
+def build_pages(posts: int) -> dict:
+    forum = build_page(posts, 20240518)
+    # 楼层列表带上 post-list 类名后会被识别为内容容器，覆盖按容器提前停止的情况
+    container = forum.replace('<div id="postlist" class="pl">', '<div id="postlist" class="pl post-list">', 1)
+    return {"forum_fallback": forum, "forum_container": container}
+
+
+def measure(run, repeat: int) -> tuple:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return output, best, peak
+
+
+def bench_page(html: str, max_chars: int, repeat: int, dom_parsers: list) -> dict:
+    report = {"html_mb": round(len(html.encode("utf-8")) / 1e6, 1)}
+    for parser in PARSERS:
+        runs = {"incremental": lambda: extract_incremental(html, parser, 0, 0)}
+        if parser in dom_parsers:
+            runs["dom"] = lambda: extract_main_content(html, parser, "flat")
+        for name, run in runs.items():
+            output, elapsed, peak = measure(run, repeat)
+            report[f"{name}[{parser}]"] = {"ms": round(elapsed * 1000, 1), "peak_mb": round(peak / 1e6, 1),
+                                           "output_chars": len(output)}
+
+        chunks = CountingChunks(html)
+        output, elapsed, peak = measure(lambda: extract_incremental(chunks, parser, max_chars, 0), repeat)
+        # measure() 会多次读取同一个 chunks，读取比例按单次计算
+        chunks.consumed //= repeat + 1
+        report[f"incremental+budget[{parser}]"] = {
+            "ms": round(elapsed * 1000, 1), "peak_mb": round(peak / 1e6, 1), "output_chars": len(output),
+            "html_read": f"{chunks.consumed / len(html):.1%}",
+        }
+    return report
+
+
+def verify_equal(pages: dict, parsers: list) -> bool:
+    ok = True
+    for parser in parsers:
+        mismatched = [name for name, html in pages.items()
+                      if extract_incremental(html, parser, 0, 0) != extract_main_content(html, parser, "flat")]
+        ok &= check(not mismatched, f"{parser}: 不设预算时 {len(pages)} 个页面的增量提取结果与 dom (flat) 相同"
+                                    + (f"，不同: {mismatched}" if mismatched else ""))
+    return ok
+
+
+def verify_budget(pages: dict, max_chars: int) -> bool:
+    ok = True
+    for name, html in pages.items():
+        for parser in PARSERS:
+            full = extract_incremental(html, parser, 0, 0).split("\n")
+            chunks = CountingChunks(html)
+            budgeted = extract_incremental(chunks, parser, max_chars, 0)
+            ok &= check(len(budgeted) <= max_chars and budgeted == "\n".join(apply_output_budget(full, max_chars)),
+                        f"{name} [{parser}]: 预算 {max_chars} 字符，输出 {len(budgeted)} 字符，等于完整结果截断后的内容")
+            ok &= check(chunks.consumed < len(html) / 10,
+                        f"{name} [{parser}]: 达到预算后停止解析，只读取了 {chunks.consumed / len(html):.1%} 的HTML")
+            paragraphs = extract_incremental(html, parser, 0, 5)
+            ok &= check(paragraphs.split("\n") == full[:5], f"{name} [{parser}]: 段落预算 5 段")
+    return ok
+
+
+def verify_engine_setting(html: str, max_chars: int) -> bool:
+    original = extractor.settings
+    try:
+        extractor.settings = dataclasses.replace(original, extract_engine="incremental")
+        incremental_extractor.settings = dataclasses.replace(original, extract_max_chars=max_chars)
+        content = extract_main_content(html)
+    finally:
+        extractor.settings = incremental_extractor.settings = original
+    return check(content == extract_incremental(html, None, max_chars, 0),
+                 "配置 extract_engine=incremental 后 extract_main_content() 使用增量提取和配置的预算")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=13000, help="超长帖子的楼层数（13000 楼约 10MB）")
+    parser.add_argument("--max-chars", type=int, default=4000, help="输出预算（字符数）")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--dom-parsers", default="lxml", help="在 10MB 页面上测量和对比 dom 方式时使用的解析器，逗号分隔")
+    args = parser.parse_args()
+    dom_parsers = [name for name in args.dom_parsers.split(",") if name in PARSERS]
+
+    huge = build_pages(args.posts)
+    ok = verify_equal(load_corpus(), PARSERS)
+    ok &= verify_equal(huge, dom_parsers)
+    ok &= verify_budget(huge, args.max_chars)
+    ok &= verify_engine_setting(huge["forum_container"], args.max_chars)
+    report = {name: bench_page(html, args.max_chars, args.repeat, dom_parsers) for name, html in huge.items()}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if ok else 1)
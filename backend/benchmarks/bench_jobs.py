@@ -0,0 +1,172 @@
+"""
+异步任务验证脚本
+
+源站有较长延迟时，比较同步接口与异步任务接口占用HTTP连接的时间，并验证 sqlite 持久化：
+
+1. 同步 /process_content 的耗时（连接一直被占用）与 POST /jobs 的返回耗时
+2. 轮询 /jobs/{id}/result 直到完成，结果与同步接口一致
+3. 提交若干任务后在执行前“重启”（重新创建任务队列），使用 sqlite 存储的任务全部继续完成
+4. 任务完成后超过 job_ttl 即不再可查（404）
+5. 两个任务队列共用同一个 sqlite 文件（模拟多个工作进程）：崩溃的执行者留下的任务（租约已过期）被其中一个接手，
+   另一个队列启动和定期检查时不会把正在执行、租约有效的任务重新放入队列，任务只执行一次；
+   正常停止时执行到一半的任务改回排队中
+
+任一检查失败时以非0状态码退出。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_jobs.py --delay 2
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import os
+import sys
+import tempfile
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import StubServer, load_corpus
+
+import httpx
+
+import jobs
+import main
+import pipeline
+from config import settings
+
+PAGE = load_corpus()["news_zh"].encode("utf-8")
+
+
+def make_handler(delay: float):
+    def handler(request) -> None:
+        time.sleep(delay)
+        request.send_response(200)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(PAGE)))
+        request.end_headers()
+        request.wfile.write(PAGE)
+    return handler
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message)
+    return condition
+
+
+async def wait_result(client: httpx.AsyncClient, job_id: str, timeout: float = 30) -> httpx.Response:
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get(f"/jobs/{job_id}/result")
+        if response.status_code != 202 or time.perf_counter() > deadline:
+            return response
+        await asyncio.sleep(0.1)
+
+
+async def wait_status(store: jobs.JobStore, job_id: str, status: str, timeout: float = 30) -> jobs.Job:
+    deadline = time.perf_counter() + timeout
+    while True:
+        job = store.get(job_id)
+        if job.status == status or time.perf_counter() > deadline:
+            return job
+        await asyncio.sleep(0.05)
+
+
+async def verify_leases(server: StubServer, cfg) -> bool:
+    ok = True
+    executions = []
+    original = jobs.process_item
+
+    async def counting_process_item(item, prompt):
+        executions.append(item.url)
+        return await original(item, prompt)
+
+    jobs.process_item = counting_process_item
+    cfg = dataclasses.replace(cfg, job_sqlite_path=cfg.job_sqlite_path + ".lease", job_workers=1, job_lease=0.6)
+    try:
+        # 崩溃的执行者留下的 running 任务：租约已过期
+        seed = jobs.create_job_queue(dataclasses.replace(cfg, job_workers=0))
+        orphan = seed.submit(jobs.JobRequest(url=server.url("/lease/orphan"), prompt="总结"))
+        seed.store.claim(orphan.id, time.time() - 10, "crashed", time.time() - 5)
+        seed.store.close()
+
+        queue_a = jobs.create_job_queue(cfg)
+        await queue_a.start()
+        running = await wait_status(queue_a.store, orphan.id, jobs.RUNNING)
+        ok &= check(running.claimed_by == queue_a.owner, "租约过期的任务由启动的队列 A 接手")
+
+        # 源站延迟大于租约，A 执行期间需要续约；B 启动和定期检查都不能再次执行该任务
+        queue_b = jobs.create_job_queue(cfg)
+        await queue_b.start()
+        done = await wait_status(queue_b.store, orphan.id, jobs.SUCCEEDED)
+        ok &= check(done.status == jobs.SUCCEEDED and executions.count(server.url("/lease/orphan")) == 1,
+                    f"队列 B 启动时 A 正在执行的任务只执行了 {executions.count(server.url('/lease/orphan'))} 次")
+
+        stopped = queue_b.submit(jobs.JobRequest(url=server.url("/lease/stopped"), prompt="总结"))
+        job = await wait_status(queue_a.store, stopped.id, jobs.RUNNING)
+        owner = queue_a if job.claimed_by == queue_a.owner else queue_b
+        other = queue_b if owner is queue_a else queue_a
+        await owner.stop()
+        released = await wait_status(other.store, stopped.id, jobs.QUEUED, timeout=1)
+        ok &= check(released.status == jobs.QUEUED and released.claimed_by is None,
+                    "正常停止时执行到一半的任务改回排队中")
+        done = await wait_status(other.store, stopped.id, jobs.SUCCEEDED)
+        ok &= check(done.status == jobs.SUCCEEDED, "交还的任务由另一个队列继续执行")
+        await other.stop()
+    finally:
+        jobs.process_item = original
+    return ok
+
+
+async def run(delay: float) -> bool:
+    pipeline.content_cache = None
+    ok = True
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+    cfg = dataclasses.replace(settings, job_store="sqlite", job_sqlite_path=db_path, job_ttl=1.0)
+    transport = httpx.ASGITransport(app=main.app)
+
+    with StubServer(handler=make_handler(delay)) as server:
+        main.job_queue = jobs.create_job_queue(cfg)
+        async with main.lifespan(main.app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            body = {"url": server.url("/sync"), "prompt": "总结"}
+            start = time.perf_counter()
+            sync = await client.post("/process_content", json=body)
+            sync_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            submitted = await client.post("/jobs", json={**body, "url": server.url("/async")})
+            submit_elapsed = time.perf_counter() - start
+            ok &= check(submitted.status_code == 202 and submit_elapsed < 0.1,
+                        f"同步接口占用连接 {sync_elapsed:.2f} 秒，提交任务只需 {submit_elapsed * 1000:.1f} ms")
+
+            result = await wait_result(client, submitted.json()["job_id"])
+            ok &= check(result.status_code == 200 and result.json()["result"] == sync.json()["result"],
+                        "轮询得到的结果与同步接口一致")
+
+        # 不启动执行协程，模拟任务提交后、执行前服务被重启
+        main.job_queue = jobs.create_job_queue(dataclasses.replace(cfg, job_workers=0))
+        async with main.lifespan(main.app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            job_ids = [(await client.post("/jobs", json={"url": server.url(f"/restart/{i}"), "prompt": "总结"}))
+                       .json()["job_id"] for i in range(5)]
+
+        main.job_queue = jobs.create_job_queue(cfg)
+        async with main.lifespan(main.app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            results = [await wait_result(client, job_id) for job_id in job_ids]
+            ok &= check(all(r.status_code == 200 for r in results),
+                        f"重启后恢复的 {len(job_ids)} 个任务全部完成")
+            await asyncio.sleep(cfg.job_ttl)
+            expired = await client.get(f"/jobs/{job_ids[0]}")
+            ok &= check(expired.status_code == 404, f"超过 job_ttl 后任务不再可查（{expired.status_code}）")
+        ok &= await verify_leases(server, cfg)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=2.0, help="源站响应延迟（秒）")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.delay)) else 1)
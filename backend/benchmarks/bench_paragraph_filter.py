@@ -0,0 +1,113 @@
+"""
+段落过滤阶段基准测试
+
+对比正文提取最后一步（过滤段落、内容过少时改用全文文本）的两种实现：
+- legacy: 旧实现，每个段落调用 re.match(字符串模式)，为判断长度先拼接一遍全部结果，
+          回退时先把 stripped_strings 全部放进列表再过滤
+- stream: 新实现 extractor.select_content_texts()，预编译正则、生成器逐个过滤、
+          累计长度代替拼接
+
+对每个样本页面（nested / flat 两种段落模式）报告两种实现的耗时和
+tracemalloc 内存分配峰值，并检查输出完全一致（不一致时以非0状态码退出）。
+只计时过滤阶段本身，段落文本提前准备好。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_paragraph_filter.py --repeat 20
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import tracemalloc
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus
+
+from extractor import (CONTAINER_BLOCK_TAGS, FALLBACK_BLOCK_TAGS, PARAGRAPH_MODES, find_main_container,
+                       iter_block_texts, select_content_texts)
+from parsers import parse_html
+
+
+def legacy_select_content_texts(paragraph_texts, soup):
+    """旧实现（与修改前的 extract_main_content() 中的代码相同）"""
+    content_texts = []
+    for text in paragraph_texts:
+        if len(text) > 15 and '广告' not in text and not re.match(r'^[0-9.]*$', text):
+            content_texts.append(text)
+
+    if len('\n'.join(content_texts)) < 100:
+        texts = [node.strip() for node in soup.stripped_strings]
+        content_texts = [t for t in texts if len(t) > 15 and not re.match(r'^[0-9.]*$', t)]
+    return content_texts
+
+
+def build_fallback_page(lines: int) -> str:
+    """没有内容容器、段落也都很短的页面：必然走全文文本回退"""
+    rows = "".join(f"<tr><td>{i}</td><td>第{i}行表格数据，没有放在段落里的一整句说明文字</td></tr>"
+                   for i in range(lines))
+    return f"<html><body><p>短段落</p><table>{rows}</table></body></html>"
+
+
+def prepare(html: str, mode: str):
+    """与 extract_main_content() 相同地准备好 soup 和段落文本列表"""
+    soup = parse_html(html)
+    for tag in soup.find_all(['script', 'style', 'iframe', 'nav', 'footer', 'ads', 'header']):
+        tag.decompose()
+    container = find_main_container(soup)
+    root, block_tags = (container, CONTAINER_BLOCK_TAGS) if container is not None else (soup, FALLBACK_BLOCK_TAGS)
+    if mode == 'flat':
+        paragraphs = list(iter_block_texts(root, block_tags))
+    else:
+        paragraphs = [p.get_text(strip=True) for p in root.find_all(block_tags)]
+    return soup, paragraphs
+
+
+def measure(func, soup, paragraphs, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(paragraphs, soup)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    try:
+        func(paragraphs, soup)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(elapsed * 1000, 3), round(peak / 1024, 1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="每个页面的重复次数")
+    parser.add_argument("--fallback-lines", type=int, default=5000, help="回退页面的表格行数")
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    pages["fallback_table"] = build_fallback_page(args.fallback_lines)
+
+    results, mismatches = {}, []
+    for name, html in pages.items():
+        for mode in PARAGRAPH_MODES:
+            soup, paragraphs = prepare(html, mode)
+            if legacy_select_content_texts(paragraphs, soup) != select_content_texts(paragraphs, soup):
+                mismatches.append(f"{name}/{mode}")
+            repeat = max(1, args.repeat // 10) if len(paragraphs) > 10000 else args.repeat
+            legacy_ms, legacy_kb = measure(legacy_select_content_texts, soup, paragraphs, repeat)
+            stream_ms, stream_kb = measure(select_content_texts, soup, paragraphs, repeat)
+            results[f"{name}/{mode}"] = {
+                "paragraphs": len(paragraphs),
+                "legacy_ms": legacy_ms,
+                "stream_ms": stream_ms,
+                "legacy_peak_kb": legacy_kb,
+                "stream_peak_kb": stream_kb,
+            }
+
+    print(json.dumps({"mismatches": mismatches, "pages": results}, ensure_ascii=False, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
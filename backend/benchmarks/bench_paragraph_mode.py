@@ -0,0 +1,62 @@
+"""
+段落切分模式基准测试
+
+在样本页面和一个深度嵌套的合成页面上，比较两种段落切分模式的CPU耗时与输出大小：
+- nested: 对每个块级元素调用 get_text()，嵌套的块会重复输出（原有行为）
+- flat:   每个文本节点只输出一次
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_paragraph_mode.py
+"""
+
+import argparse
+import json
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus
+
+from extractor import PARAGRAPH_MODES, extract_main_content
+
+
+def build_nested_page(depth: int, width: int) -> str:
+    """生成正文区域由多层 div 嵌套组成的页面"""
+    html = ""
+    for level in range(depth):
+        paragraphs = "".join(f"<p>第{level}层第{i}段，这是一段嵌套在多层容器中的正文内容。</p>" for i in range(width))
+        html = f"<div class='section'>{paragraphs}{html}</div>"
+    return f"<html><body><article>{html}</article></body></html>"
+
+
+def measure(pages: dict, mode: str, repeat: int) -> dict:
+    output_chars = 0
+    start = time.process_time()
+    for _ in range(repeat):
+        output_chars = sum(len(extract_main_content(html, paragraph_mode=mode)) for html in pages.values())
+    cpu = (time.process_time() - start) / repeat
+    return {"cpu_ms": round(cpu * 1000, 2), "output_chars": output_chars}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=30, help="合成页面的嵌套层数")
+    parser.add_argument("--width", type=int, default=5, help="合成页面每层的段落数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    suites = {
+        "corpus": load_corpus(),
+        "nested": {"nested": build_nested_page(args.depth, args.width)},
+    }
+    results = {}
+    for suite, pages in suites.items():
+        results[suite] = {mode: measure(pages, mode, args.repeat) for mode in PARAGRAPH_MODES}
+        nested, flat = results[suite]["nested"], results[suite]["flat"]
+        results[suite]["cpu_saving"] = f"{1 - flat['cpu_ms'] / nested['cpu_ms']:.0%}"
+        results[suite]["output_saving"] = f"{1 - flat['output_chars'] / nested['output_chars']:.0%}"
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+HTML解析器后端基准测试
+
+对每个可用的解析器（见 parsers.py）：
+- 在样本页面上检查提取结果是否与 golden 标准结果一致
+- 测量每秒处理的页面数（样本页面 + 一个合成的大页面）
+- 在独立子进程中运行，报告峰值常驻内存（RSS）
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_parsers.py
+    # 修改提取算法并确认结果正确后，重新生成 golden 标准结果
+    python benchmarks/bench_parsers.py --update-golden
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus, load_golden, peak_rss_mb, save_golden
+
+from extractor import extract_main_content
+from parsers import DEFAULT_BACKEND, PARSER_BACKENDS, available_backends, parse_html
+
+# 参与重复计时的样本页面的字符数上限
+SMALL_PAGE_CHARS = 256 * 1024
+
+
+def build_large_page(paragraphs: int) -> str:
+    body = "".join(
+        f"<div class='item'><h3>第{i}楼</h3><p>这是合成大页面中的一段回复内容，用来模拟很长的论坛帖子。</p></div>"
+        for i in range(paragraphs)
+    )
+    return f"<html><body><div id='content'>{body}</div></body></html>"
+
+
+def run_backend(backend: str, iterations: int, large_paragraphs: int) -> dict:
+    """在当前进程中测试一个解析器"""
+    corpus = load_corpus()
+    mismatches = [
+        name for name, html in corpus.items()
+        if load_golden(name) is not None and extract_main_content(html, backend) != load_golden(name)
+    ]
+
+    # 超长论坛帖子等大页面只检查 golden，不参与重复计时（单独的大页面计时见下方）
+    small_pages = [html for html in corpus.values() if len(html) < SMALL_PAGE_CHARS]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for html in small_pages:
+            extract_main_content(html, backend)
+    corpus_elapsed = time.perf_counter() - start
+
+    large_page = build_large_page(large_paragraphs)
+    start = time.perf_counter()
+    parse_html(large_page, backend)
+    parse_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    extract_main_content(large_page, backend)
+    large_elapsed = time.perf_counter() - start
+
+    return {
+        "golden_mismatches": mismatches,
+        "corpus_pages_per_sec": round(iterations * len(small_pages) / corpus_elapsed, 1),
+        "large_page_mb": round(len(large_page.encode("utf-8")) / 1024 / 1024, 2),
+        "large_page_parse_sec": round(parse_elapsed, 3),
+        "large_page_extract_sec": round(large_elapsed, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20, help="样本页面重复处理的轮数")
+    parser.add_argument("--large-paragraphs", type=int, default=30000, help="合成大页面的段落数")
+    parser.add_argument("--update-golden", action="store_true", help=f"用 {DEFAULT_BACKEND} 重新生成 golden 结果")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.iterations, args.large_paragraphs)))
+        return
+
+    if args.update_golden:
+        for name, html in load_corpus().items():
+            save_golden(name, extract_main_content(html, DEFAULT_BACKEND))
+        print("golden 结果已更新")
+        return
+
+    results = {}
+    usable = available_backends()
+    for backend in PARSER_BACKENDS:
+        if backend not in usable:
+            results[backend] = "未安装，跳过"
+            continue
+        # 每个解析器在独立子进程中运行，峰值内存互不影响
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", backend,
+             "--iterations", str(args.iterations), "--large-paragraphs", str(args.large_paragraphs)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[backend] = json.loads(output)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+预设提示词引用验证脚本
+
+比较每生成一张卡片的传输字节数：
+- 请求：prompt 携带提示词全文，与 prompt_id + prompt_version 引用预设提示词
+- 响应：result 中包含提示词全文，与 ?response=split 只返回提示词ID、版本和正文（分别统计不压缩和 gzip）
+
+并验证（任一检查失败时以非0状态码退出）：
+- 引用预设提示词得到的 result 与发送全文时完全相同；split 响应按 "[提示词] 请参考以下内容：正文" 拼接后也相同
+- prompt_version 过期返回 409，提示词不存在返回 404，prompt 和 prompt_id 都没有或都提供时返回 400
+- 上传文件（表单字段）、批量处理、流式响应和异步任务同样支持 prompt_id 和 split 模式
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_prompt_refs.py
+"""
+
+import asyncio
+import json
+import sys
+
+import common  # noqa: F401  (设置 sys.path)
+from common import load_corpus
+
+import httpx
+
+import cards
+import main
+from pipeline import render_result
+from prompts import prompt_store
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message, file=sys.stderr)
+    return condition
+
+
+def request_bytes(request: httpx.Request) -> int:
+    return len(request.content)
+
+
+async def measure(client: httpx.AsyncClient, body: dict, split: bool, encoding: str) -> tuple:
+    params = {"response": "split"} if split else {}
+    response = await client.post("/process_text_input", json=body, params=params,
+                                 headers={"Accept-Encoding": encoding})
+    return response, request_bytes(response.request), response.num_bytes_downloaded
+
+
+async def run() -> bool:
+    ok = True
+    # 只比较传输字节数，不需要保存卡片
+    cards.card_store = None
+    template = prompt_store.list()[0]
+    text = load_corpus()["news_zh"][:4000]
+    inline = {"text": text, "prompt": template.body}
+    reference = {"text": text, "prompt_id": template.id, "prompt_version": template.hash[:12]}
+    sizes = {"prompt_bytes": template.size}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for encoding in ("identity", "gzip"):
+            full, sizes["request_inline"], sizes[f"response_result_{encoding}"] = \
+                await measure(client, inline, False, encoding)
+            referenced, sizes["request_prompt_id"], _ = await measure(client, reference, False, encoding)
+            split, _, sizes[f"response_split_{encoding}"] = await measure(client, reference, True, encoding)
+        expected = full.json()["result"]
+        ok &= check(referenced.json()["result"] == expected, "用 prompt_id 引用预设提示词的结果与发送全文时相同")
+        ok &= check(split.json()["prompt_id"] == template.id and split.json()["prompt_version"] == template.hash
+                    and render_result(template.body, split.json()["content"]) == expected,
+                    "split 响应拼接提示词后与 result 相同")
+
+        stale = await client.post("/process_text_input", json={**reference, "prompt_version": "0" * 12})
+        missing = await client.post("/process_text_input", json={"text": text, "prompt_id": "no-such-prompt"})
+        both = await client.post("/process_text_input", json={**inline, "prompt_id": template.id})
+        neither = await client.post("/process_text_input", json={"text": text})
+        ok &= check([stale.status_code, missing.status_code, both.status_code, neither.status_code]
+                    == [409, 404, 400, 400],
+                    f"过期版本 / 不存在 / 同时提供 / 都未提供: {stale.status_code} {missing.status_code} "
+                    f"{both.status_code} {neither.status_code}")
+
+        page = load_corpus()["news_zh"].encode("utf-8")
+        upload_inline = await client.post("/process_html_file", files={"file": ("a.html", page, "text/html")},
+                                          data={"prompt": template.body})
+        upload_split = await client.post("/process_html_file", params={"response": "split"},
+                                         files={"file": ("a.html", page, "text/html")},
+                                         data={"prompt_id": template.id})
+        ok &= check(render_result(template.body, upload_split.json()["content"]) == upload_inline.json()["result"],
+                    "上传文件时 prompt_id 表单字段和 split 模式")
+
+        batch = {"prompt_id": template.id, "items": [{"text": text}, {"html": page.decode("utf-8")}]}
+        batch_full = (await client.post("/process_batch", json=batch)).json()
+        batch_split = (await client.post("/process_batch", json=batch, params={"response": "split"})).json()
+        ok &= check(batch_split["prompt_id"] == template.id
+                    and [render_result(template.body, item["content"]) for item in batch_split["results"]]
+                    == [item["result"] for item in batch_full["results"]],
+                    "批量处理的 split 模式：提示词只返回一次，各条目拼接后与 result 相同")
+
+        stream = await client.post("/process_text_input", json=reference,
+                                   params={"stream": "ndjson", "response": "split"})
+        events = [json.loads(line) for line in stream.text.splitlines()]
+        rebuilt = render_result(template.body, "\n".join(e["text"] for e in events if e["event"] == "paragraph"))
+        ok &= check(events[0] == {"event": "prompt", "prompt_id": template.id, "prompt_version": template.hash}
+                    and rebuilt == expected, "流式 split 模式的 prompt 事件只包含ID和版本")
+
+    async with main.lifespan(main.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+        job_id = (await client.post("/jobs", json=reference)).json()["job_id"]
+        for _ in range(100):
+            result = await client.get(f"/jobs/{job_id}/result")
+            if result.status_code != 202:
+                break
+            await asyncio.sleep(0.05)
+        job_split = await client.get(f"/jobs/{job_id}/result", params={"response": "split"})
+        ok &= check(result.json()["result"] == expected and job_split.json()["prompt_id"] == template.id
+                    and render_result(template.body, job_split.json()["content"]) == expected,
+                    "异步任务支持 prompt_id，结果支持 split 模式")
+
+    print(json.dumps(sizes, indent=2))
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run()) else 1)
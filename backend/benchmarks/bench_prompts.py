@@ -0,0 +1,92 @@
+"""
+预设提示词接口验证脚本
+
+1. 打开页面时传输的字节数：旧接口 /preset_prompts（全部全文）与新接口 /prompts（只含标题等信息），
+   以及 gzip 压缩和 ETag 重新验证（304）后的字节数
+2. /prompts/{id} 返回的全文与模板文件一致，带相同 ETag 重新请求时返回 304
+3. 热加载：修改、新增、删除模板文件后，无需重启即可在接口中看到变化
+
+任一检查失败时以非0状态码退出。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_prompts.py
+"""
+
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import common  # noqa: F401  (设置 sys.path)
+
+import httpx
+
+import main
+from prompts import DEFAULT_PROMPT_DIR, PromptStore
+
+RELOAD_INTERVAL = 0.2
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message)
+    return condition
+
+
+async def run() -> bool:
+    ok = True
+    template_dir = Path(tempfile.mkdtemp())
+    for path in DEFAULT_PROMPT_DIR.glob("*.md"):
+        shutil.copy(path, template_dir)
+    main.prompt_store = PromptStore(template_dir, RELOAD_INTERVAL)
+    transport = httpx.ASGITransport(app=main.app)
+    sizes = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        legacy = await client.get("/preset_prompts", headers={"Accept-Encoding": "identity"})
+        legacy_gzip = await client.get("/preset_prompts", headers={"Accept-Encoding": "gzip"})
+        listing = await client.get("/prompts", headers={"Accept-Encoding": "gzip"})
+        revalidated = await client.get("/prompts", headers={"If-None-Match": listing.headers["etag"]})
+        sizes = {
+            "preset_prompts_identity": legacy.num_bytes_downloaded,
+            "preset_prompts_gzip": legacy_gzip.num_bytes_downloaded,
+            "prompts_listing": listing.num_bytes_downloaded,
+            "prompts_listing_revalidated": revalidated.num_bytes_downloaded,
+        }
+        ok &= check(legacy_gzip.json() == legacy.json(), "gzip 压缩后的 /preset_prompts 内容不变")
+        ok &= check(revalidated.status_code == 304, f"带 If-None-Match 重新请求列表返回 {revalidated.status_code}")
+
+        first = listing.json()["prompts"][0]
+        body = await client.get(f"/prompts/{first['id']}", headers={"Accept-Encoding": "gzip"})
+        sizes["prompt_body_gzip"] = body.num_bytes_downloaded
+        expected = (template_dir / f"{first['id']}.md").read_text(encoding="utf-8")
+        ok &= check(body.json()["prompt"] == expected and body.json()["hash"] == first["hash"],
+                    f"/prompts/{first['id']} 的全文与模板文件一致")
+        again = await client.get(f"/prompts/{first['id']}", headers={"If-None-Match": body.headers["etag"]})
+        ok &= check(again.status_code == 304, f"带 If-None-Match 重新请求全文返回 {again.status_code}")
+
+        # 热加载
+        path = template_dir / f"{first['id']}.md"
+        path.write_text(expected + "\n补充说明：输出前检查所有文字是否完整显示。\n", encoding="utf-8")
+        (template_dir / "new-template.md").write_text("# 新增的提示词\n\n把内容整理成三条要点。\n", encoding="utf-8")
+        (template_dir / f"{listing.json()['prompts'][-1]['id']}.md").unlink()
+        time.sleep(RELOAD_INTERVAL)
+        reloaded = await client.get("/prompts", headers={"If-None-Match": listing.headers["etag"]})
+        ids = [item["id"] for item in reloaded.json()["prompts"]] if reloaded.status_code == 200 else []
+        ok &= check(reloaded.status_code == 200 and "new-template" in ids
+                    and listing.json()["prompts"][-1]["id"] not in ids,
+                    "新增和删除模板文件后列表随之变化，旧 ETag 不再命中")
+        changed = await client.get(f"/prompts/{first['id']}", headers={"If-None-Match": body.headers["etag"]})
+        ok &= check(changed.status_code == 200 and changed.json()["prompt"].endswith("完整显示。\n"),
+                    "修改模板文件后无需重启即返回新内容")
+
+    print(json.dumps(sizes, indent=2))
+    shutil.rmtree(template_dir, ignore_errors=True)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run()) else 1)
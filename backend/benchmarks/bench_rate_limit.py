@@ -0,0 +1,224 @@
+"""
+限流验证脚本
+
+验证 rate_limit.py 中按客户端的限流（任一检查失败时以非0状态码退出）：
+1. 同一客户端突发请求超过 burst 后返回 429，带 Retry-After；等待后恢复
+2. rate_limit_api_keys 中配置的 X-API-Key 使用各自的令牌桶；未配置的 Key 按IP计数，每次换一个随机 Key 仍然返回 429
+   开启 rate_limit_trust_forwarded 时按 X-Forwarded-For 最右边的地址计数，伪造左边的地址仍然返回 429
+3. 重量级接口的令牌用完后，轻量接口不受影响
+4. 同一客户端同时进行的重量级请求超过 rate_limit_client_concurrency 时返回 429（换随机 API Key 同样）
+5. 所有客户端同时进行的重量级请求达到 rate_limit_global_concurrency 后排队，等待超时返回 503
+6. 多个进程共用同一个 sqlite 令牌桶文件时，总共只放行 burst 个请求
+7. 用 start.py --production 启动两个工作进程（sqlite 存储），突发请求总共只放行 burst 个
+
+最后报告 memory / sqlite 两种存储单次取令牌的耗时。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_rate_limit.py
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import multiprocessing
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import StubServer, load_corpus
+
+import httpx
+
+import main
+import rate_limit
+from bench_server_scaling import free_port, start_server, stop_server, wait_ready
+from config import settings
+from rate_limit import MemoryRateLimitStore, RateLimiter, SqliteRateLimitStore
+
+PAGE = load_corpus()["news_zh"].encode("utf-8")
+ORIGIN_DELAY = 0.5
+# 配置为已知 API Key 的客户端（"other" 以哈希形式配置）
+KNOWN_KEYS = ["heavy", "c"] + [f"{prefix}{i}" for prefix in ("g", "q") for i in range(4)]
+
+
+def check(condition: bool, message: str) -> bool:
+    print(("通过  " if condition else "失败  ") + message, file=sys.stderr)
+    return condition
+
+
+def slow_handler(request) -> None:
+    time.sleep(ORIGIN_DELAY)
+    request.send_response(200)
+    request.send_header("Content-Type", "text/html; charset=utf-8")
+    request.send_header("Content-Length", str(len(PAGE)))
+    request.end_headers()
+    request.wfile.write(PAGE)
+
+
+def install_limiter(**overrides) -> RateLimiter:
+    api_keys = ",".join(KNOWN_KEYS + ["sha256:" + hashlib.sha256(b"other").hexdigest()])
+    cfg = dataclasses.replace(settings, rate_limit_enabled=True, rate_limit_api_keys=api_keys, **overrides)
+    rate_limit.rate_limiter = RateLimiter(cfg, MemoryRateLimitStore())
+    return rate_limit.rate_limiter
+
+
+async def verify_buckets() -> bool:
+    ok = True
+    install_limiter(rate_limit_light_rate=5.0, rate_limit_light_burst=5,
+                    rate_limit_heavy_rate=0.01, rate_limit_heavy_burst=2)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        statuses = [(await client.get("/prompts")).status_code for _ in range(8)]
+        ok &= check(statuses == [200] * 5 + [429] * 3, f"突发 8 个轻量请求（burst=5）: {statuses}")
+        response = await client.get("/prompts")
+        ok &= check(response.headers.get("retry-after") == "1" and "detail" in response.json(),
+                    f"429 响应带 Retry-After: {response.headers.get('retry-after')}")
+        await asyncio.sleep(0.25)
+        ok &= check((await client.get("/prompts")).status_code == 200, "等待补充令牌后恢复")
+
+        other = (await client.get("/prompts", headers={"X-API-Key": "other"})).status_code
+        ok &= check(other == 200, f"另一个已知的 API Key 使用独立的令牌桶: {other}")
+        await asyncio.sleep(1.0)
+        rotating = [(await client.get("/prompts", headers={"X-API-Key": secrets.token_hex(16)})).status_code
+                    for _ in range(8)]
+        ok &= check(rotating == [200] * 5 + [429] * 3,
+                    f"每次换一个未配置的随机 API Key 仍按IP计数（burst=5）: {rotating}")
+        ok &= check((await client.get("/")).status_code == 200, "健康检查不限流")
+
+        # 反向代理把对端地址追加在 X-Forwarded-For 末尾，客户端只能伪造左边的地址
+        install_limiter(rate_limit_light_rate=0.01, rate_limit_light_burst=5, rate_limit_trust_forwarded=True)
+        spoofed = [(await client.get("/prompts", headers={"X-Forwarded-For": f"10.0.{i}.1, 203.0.113.7"}))
+                   .status_code for i in range(8)]
+        ok &= check(spoofed == [200] * 5 + [429] * 3,
+                    f"X-Forwarded-For 中每次伪造一个不同的客户端地址仍按代理写入的地址计数（burst=5）: {spoofed}")
+        proxied = (await client.get("/prompts", headers={"X-Forwarded-For": "203.0.113.8"})).status_code
+        ok &= check(proxied == 200, f"代理写入的另一个地址使用独立的令牌桶: {proxied}")
+        install_limiter(rate_limit_light_rate=5.0, rate_limit_light_burst=5,
+                        rate_limit_heavy_rate=0.01, rate_limit_heavy_burst=2)
+
+        body = {"text": "<p>" + "正文内容" * 10 + "</p>", "prompt": "总结"}
+        headers = {"X-API-Key": "heavy"}
+        heavy = [(await client.post("/process_html_file", headers=headers,
+                                    files={"file": ("a.html", PAGE, "text/html")},
+                                    data={"prompt": "总结"})).status_code for _ in range(3)]
+        ok &= check(heavy == [200, 200, 429], f"重量级接口（burst=2）: {heavy}")
+        response = await client.post("/process_html_file", headers=headers,
+                                     files={"file": ("a.html", PAGE, "text/html")}, data={"prompt": "总结"})
+        ok &= check(int(response.headers.get("retry-after", 0)) >= 50,
+                    f"重量级接口的 Retry-After 按补充速度计算: {response.headers.get('retry-after')} 秒")
+        light = (await client.post("/process_text_input", headers=headers, json=body)).status_code
+        ok &= check(light == 200, f"重量级令牌用完后轻量接口不受影响: {light}")
+
+        text = (await client.get("/metrics")).text
+        ok &= check('make_card_rate_limited_total{bucket="light",reason="rate"}' in text,
+                    "/metrics 中包含限流计数")
+    return ok
+
+
+async def verify_concurrency() -> bool:
+    ok = True
+    transport = httpx.ASGITransport(app=main.app)
+    with StubServer(handler=slow_handler) as origin:
+        async with main.lifespan(main.app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            async def fetch(i: int, api_key: str) -> httpx.Response:
+                return await client.post("/process_content", headers={"X-API-Key": api_key},
+                                         json={"url": origin.url(f"/page/{api_key}/{i}"), "prompt": "总结"})
+
+            limiter = install_limiter(rate_limit_client_concurrency=2, rate_limit_global_concurrency=0)
+            responses = await asyncio.gather(*(fetch(i, "c") for i in range(4)))
+            statuses = sorted(r.status_code for r in responses)
+            ok &= check(statuses == [200, 200, 429, 429], f"单个客户端同时 4 个请求（上限 2）: {statuses}")
+            ok &= check(limiter.stats()["active_heavy_requests"] == 0, "请求结束后释放并发名额")
+            responses = await asyncio.gather(*(fetch(i, secrets.token_hex(16)) for i in range(4, 8)))
+            statuses = sorted(r.status_code for r in responses)
+            ok &= check(statuses == [200, 200, 429, 429], f"同时 4 个请求各带一个未配置的随机 API Key（上限 2）: {statuses}")
+
+            limiter = install_limiter(rate_limit_client_concurrency=0, rate_limit_global_concurrency=2,
+                                      rate_limit_global_wait=ORIGIN_DELAY / 2)
+            responses = await asyncio.gather(*(fetch(0, f"g{i}") for i in range(4)))
+            statuses = sorted(r.status_code for r in responses)
+            ok &= check(statuses == [200, 200, 503, 503],
+                        f"4 个客户端同时请求（全局上限 2，排队 {ORIGIN_DELAY / 2} 秒）: {statuses}")
+
+            limiter = install_limiter(rate_limit_client_concurrency=0, rate_limit_global_concurrency=2,
+                                      rate_limit_global_wait=ORIGIN_DELAY * 4)
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(fetch(1, f"q{i}") for i in range(4)))
+            elapsed = time.perf_counter() - started
+            statuses = sorted(r.status_code for r in responses)
+            ok &= check(statuses == [200] * 4 and elapsed >= ORIGIN_DELAY * 2,
+                        f"排队时间足够时全部完成: {statuses}，耗时 {elapsed:.2f} 秒")
+            ok &= check(limiter.stats()["active_heavy_requests"] == 0, "请求结束后释放全局名额")
+    return ok
+
+
+def _take_many(path: str, attempts: int, queue) -> None:
+    store = SqliteRateLimitStore(path)
+    allowed = sum(1 for _ in range(attempts) if store.take("shared", 0.001, 20, time.time()) == 0)
+    store.close()
+    queue.put(allowed)
+
+
+def verify_shared_store(processes: int = 4, attempts: int = 20) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ratelimit.sqlite3")
+        SqliteRateLimitStore(path).close()
+        queue = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_take_many, args=(path, attempts, queue))
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        allowed = [queue.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+    return check(sum(allowed) == 20,
+                 f"{processes} 个进程共用 sqlite 令牌桶（burst=20）各请求 {attempts} 次: 放行 {allowed}，共 {sum(allowed)}")
+
+
+def verify_workers(workers: int = 2, burst: int = 10, requests: int = 30) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        process = start_server(workers, port, MAKE_CARD_RATE_LIMIT_ENABLED="true",
+                               MAKE_CARD_RATE_LIMIT_STORE="sqlite",
+                               MAKE_CARD_RATE_LIMIT_SQLITE_PATH=os.path.join(tmp, "ratelimit.sqlite3"),
+                               MAKE_CARD_RATE_LIMIT_LIGHT_RATE="0.01",
+                               MAKE_CARD_RATE_LIMIT_LIGHT_BURST=str(burst))
+        try:
+            wait_ready(port)
+            # 每个请求使用新连接，使请求分散到各个工作进程
+            statuses = [httpx.get(f"http://127.0.0.1:{port}/prompts").status_code for _ in range(requests)]
+        finally:
+            stop_server(process)
+    allowed = statuses.count(200)
+    return check(allowed == burst and statuses.count(429) == requests - burst,
+                 f"{workers} 个工作进程共用 sqlite 令牌桶（burst={burst}）突发 {requests} 个请求: 放行 {allowed}")
+
+
+def bench_take(runs: int = 20000) -> dict:
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {"memory": MemoryRateLimitStore(),
+                  "sqlite": SqliteRateLimitStore(os.path.join(tmp, "ratelimit.sqlite3"))}
+        for name, store in stores.items():
+            count = runs if name == "memory" else runs // 10
+            start = time.perf_counter()
+            for i in range(count):
+                store.take(f"light:ip:10.0.{i % 256}.{i % 100}", 20.0, 60, time.time())
+            report[name] = {"takes": count, "us_per_take": round((time.perf_counter() - start) / count * 1e6, 2)}
+            store.close()
+    return report
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(verify_buckets())
+    ok &= asyncio.run(verify_concurrency())
+    ok &= verify_shared_store()
+    ok &= verify_workers()
+    print(json.dumps(bench_take(), indent=2))
+    sys.exit(0 if ok else 1)
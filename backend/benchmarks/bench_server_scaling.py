@@ -0,0 +1,179 @@
+"""
+生产模式压力测试
+
+用 start.py --production 分别以不同的工作进程数启动服务，在固定时长内用多个并发连接
+上传HTML文件（/process_html_file，关闭上传缓存，每个请求都真正执行正文提取），
+报告每秒请求数、p50/p99 延迟，以及相对单进程的吞吐量倍数。
+正文提取是CPU密集的纯Python计算，单个进程受GIL限制最多用满一个核，
+多个工作进程才能利用多核；工作进程数超过CPU核数后吞吐量不再增加。
+
+最后验证平滑关闭：在慢速源站上发起若干 /process_content 请求，请求进行中向服务发送 SIGTERM，
+所有请求都应正常完成（失败时以非0状态码退出）。
+
+注意压测客户端与服务运行在同一台机器上，会占用一部分CPU。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_server_scaling.py --workers 1 2 4 --duration 10 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import List
+
+import common  # noqa: F401  (设置 sys.path)
+from common import BACKEND_DIR, StubServer, load_corpus, summarize
+
+import httpx
+
+PAGE = load_corpus()["news_zh"].encode("utf-8")
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, **env: str) -> subprocess.Popen:
+    environ = {
+        **os.environ,
+        # 每个请求都执行正文提取，不命中缓存
+        "MAKE_CARD_UPLOAD_CACHE_MAX_BYTES": "0",
+        "MAKE_CARD_CACHE_BACKEND": "none",
+        "MAKE_CARD_COMPRESSION_CODECS": "",
+        "MAKE_CARD_FETCH_PER_HOST_CONCURRENCY": "0",
+        "MAKE_CARD_CARD_STORE": "none",
+        **env,
+    }
+    return subprocess.Popen(
+        [sys.executable, "start.py", "--production", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=environ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"服务在 {timeout} 秒内没有启动")
+
+
+def stop_server(process: subprocess.Popen, timeout: float = 60.0) -> int:
+    process.send_signal(signal.SIGTERM)
+    try:
+        return process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        return process.wait()
+
+
+async def load(port: int, concurrency: int, duration: float, warmup: float) -> dict:
+    url = f"http://127.0.0.1:{port}/process_html_file"
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def one() -> None:
+            nonlocal errors
+            start = time.perf_counter()
+            response = await client.post(url, files={"file": ("page.html", PAGE, "text/html")},
+                                         data={"prompt": "总结"})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+        async def worker(stop_at: float) -> None:
+            while time.perf_counter() < stop_at:
+                await one()
+
+        await asyncio.gather(*(worker(time.perf_counter() + warmup) for _ in range(concurrency)))
+        latencies.clear()
+        errors = 0
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(started + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests": len(latencies), "errors": errors,
+            "requests_per_sec": round(len(latencies) / elapsed, 1), **summarize(latencies)}
+
+
+def slow_handler(request) -> None:
+    time.sleep(2.0)
+    request.send_response(200)
+    request.send_header("Content-Type", "text/html; charset=utf-8")
+    request.send_header("Content-Length", str(len(PAGE)))
+    request.end_headers()
+    request.wfile.write(PAGE)
+
+
+async def check_graceful_shutdown(workers: int, requests: int = 8) -> bool:
+    port = free_port()
+    with StubServer(handler=slow_handler) as origin:
+        process = start_server(workers, port)
+        try:
+            wait_ready(port)
+            async with httpx.AsyncClient(timeout=30) as client:
+                pending = [asyncio.create_task(client.post(f"http://127.0.0.1:{port}/process_content",
+                                                           json={"url": origin.url(f"/slow/{i}"), "prompt": "总结"}))
+                           for i in range(requests)]
+                await asyncio.sleep(0.5)
+                process.send_signal(signal.SIGTERM)
+                responses = await asyncio.gather(*pending, return_exceptions=True)
+            exit_code = process.wait(30)
+        finally:
+            if process.poll() is None:
+                process.kill()
+    completed = sum(1 for r in responses if isinstance(r, httpx.Response) and r.status_code == 200)
+    ok = completed == requests and exit_code == 0
+    print(("通过  " if ok else "失败  ") +
+          f"请求进行中发送 SIGTERM：{completed}/{requests} 个请求正常完成，服务退出码 {exit_code}", file=sys.stderr)
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}),
+                        help="依次测试的工作进程数")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发连接数")
+    parser.add_argument("--duration", type=float, default=10.0, help="每轮压测的秒数")
+    parser.add_argument("--warmup", type=float, default=1.0, help="每轮开始前的预热秒数")
+    args = parser.parse_args()
+
+    report = {"cpu_count": os.cpu_count(), "page_bytes": len(PAGE), "concurrency": args.concurrency, "runs": {}}
+    for workers in args.workers:
+        port = free_port()
+        process = start_server(workers, port)
+        try:
+            wait_ready(port)
+            report["runs"][workers] = asyncio.run(load(port, args.concurrency, args.duration, args.warmup))
+        finally:
+            stop_server(process)
+        print(f"workers={workers}: {report['runs'][workers]['requests_per_sec']} req/s", file=sys.stderr)
+
+    baseline = report["runs"][args.workers[0]]["requests_per_sec"]
+    for run in report["runs"].values():
+        run["speedup"] = round(run["requests_per_sec"] / baseline, 2) if baseline else None
+
+    ok = asyncio.run(check_graceful_shutdown(min(2, max(args.workers))))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+流式响应首字节时间基准测试
+
+通过真实的 uvicorn 服务（httpx.ASGITransport 会先收齐整个响应体，无法测量首字节），
+比较普通 JSON 响应与 NDJSON 流式响应：
+
+1. 单个URL：源站有固定延迟、页面较大（多段落论坛长帖），测量首字节时间和总耗时
+2. 批量请求：各条目的源站延迟不同，测量收到第一个条目结果的时间和总耗时
+
+同时检查流式结果拼接后与普通响应的 result 完全一致，不一致时以非0状态码退出。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_streaming_response.py --delay 0.3 --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import AppServer, StubServer, load_corpus
+
+import httpx
+
+import main
+import pipeline
+
+# 论坛长帖页面，重复多次得到一个段落很多的大页面
+PAGE = load_corpus()["forum_thread"].replace("</body>", "").replace("</html>", "")
+BIG_PAGE = (PAGE * 20 + "</body></html>").encode("utf-8")
+
+
+def make_handler(delay: float):
+    def handler(request) -> None:
+        # /page/<延迟倍数>/<序号>
+        factor = float(request.path.split("/")[2])
+        time.sleep(delay * factor)
+        request.send_response(200)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(BIG_PAGE)))
+        request.end_headers()
+        request.wfile.write(BIG_PAGE)
+    return handler
+
+
+def timed_post(client: httpx.Client, url: str, body: dict, first_marker: bytes = b"") -> tuple:
+    """返回 (首字节时间, 首个包含 first_marker 的数据块时间, 总耗时, 响应体)"""
+    start = time.perf_counter()
+    first_byte = first_marker_at = None
+    chunks = []
+    with client.stream("POST", url, json=body) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            now = time.perf_counter() - start
+            if first_byte is None:
+                first_byte = now
+            chunks.append(chunk)
+            if first_marker_at is None and first_marker in chunk:
+                first_marker_at = now
+    total = time.perf_counter() - start
+    return first_byte, first_marker_at, total, b"".join(chunks)
+
+
+def ms(values) -> float:
+    return round(statistics.median(values) * 1000, 1)
+
+
+def main_bench(delay: float, repeat: int) -> int:
+    # 关闭缓存，每次都真正抓取和提取
+    pipeline.content_cache = None
+    ok = True
+    report = {"delay_ms": delay * 1000, "page_bytes": len(BIG_PAGE)}
+
+    # 读取原始字节计时，不让服务端压缩响应
+    with StubServer(handler=make_handler(delay)) as origin, AppServer(main.app) as app, \
+            httpx.Client(timeout=120, headers={"Accept-Encoding": "identity"}) as client:
+        single = {"plain": ([], []), "ndjson": ([], [])}
+        for i in range(repeat):
+            body = {"url": origin.url(f"/page/1/{i}"), "prompt": "总结"}
+            first, _, total, raw = timed_post(client, app.url("/process_content"), body)
+            single["plain"][0].append(first)
+            single["plain"][1].append(total)
+            expected = json.loads(raw)["result"]
+
+            first, _, total, raw = timed_post(client, app.url("/process_content?stream=ndjson"), body)
+            single["ndjson"][0].append(first)
+            single["ndjson"][1].append(total)
+            events = [json.loads(line) for line in raw.decode("utf-8").splitlines()]
+            rebuilt = events[0]["text"] + "\n".join(e["text"] for e in events if e["event"] == "paragraph")
+            if rebuilt != expected:
+                ok = False
+        report["single"] = {mode: {"ttfb_ms": ms(firsts), "total_ms": ms(totals)}
+                            for mode, (firsts, totals) in single.items()}
+        report["single"]["result_chars"] = len(expected)
+
+        # 批量：延迟倍数 1..8，最快的条目远早于最慢的条目完成
+        factors = [1, 2, 4, 8]
+        batch = {"plain": ([], []), "ndjson": ([], [])}
+        for i in range(repeat):
+            body = {"items": [{"url": origin.url(f"/page/{f}/b{i}")} for f in factors], "prompt": "总结"}
+            _, first, total, _ = timed_post(client, app.url("/process_batch"), body)
+            batch["plain"][0].append(first)
+            batch["plain"][1].append(total)
+            _, first, total, raw = timed_post(client, app.url("/process_batch?stream=ndjson"), body, b'"event": "item"')
+            batch["ndjson"][0].append(first)
+            batch["ndjson"][1].append(total)
+            if json.loads(raw.decode("utf-8").splitlines()[-1])["succeeded"] != len(factors):
+                ok = False
+        report["batch"] = {mode: {"first_item_ms": ms(firsts), "total_ms": ms(totals)}
+                           for mode, (firsts, totals) in batch.items()}
+
+    report["ok"] = ok
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=0.3, help="源站响应延迟（秒）")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取中位数")
+    args = parser.parse_args()
+    sys.exit(main_bench(args.delay, args.repeat))
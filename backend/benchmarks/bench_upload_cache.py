@@ -0,0 +1,60 @@
+"""
+上传文件缓存基准测试
+
+通过 /process_html_file 多次上传同一个HTML文件，比较首次上传与重复上传的延迟，
+并输出上传缓存的命中统计。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_upload_cache.py --paragraphs 5000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import common  # noqa: F401  (设置 sys.path)
+from common import summarize
+
+import httpx
+
+import main
+import pipeline
+
+
+def build_page(paragraphs: int) -> bytes:
+    body = "".join(f"<p>第{i}段：用于测试重复上传的正文内容，包含足够多的文字。</p>" for i in range(paragraphs))
+    return f"<html><body><article>{body}</article></body></html>".encode("utf-8")
+
+
+async def run(paragraphs: int, repeat: int) -> None:
+    page = build_page(paragraphs)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        async def upload() -> float:
+            start = time.perf_counter()
+            response = await client.post(
+                "/process_html_file",
+                files={"file": ("page.html", page, "text/html")},
+                data={"prompt": "总结"},
+            )
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        first = await upload()
+        repeats = [await upload() for _ in range(repeat)]
+    print(json.dumps({
+        "page_bytes": len(page),
+        "first_upload_ms": round(first * 1000, 2),
+        "repeat_upload": summarize(repeats),
+        "upload_cache": pipeline.upload_cache.stats() if pipeline.upload_cache else None,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=5000, help="测试页面的段落数")
+    parser.add_argument("--repeat", type=int, default=20, help="重复上传次数")
+    args = parser.parse_args()
+    asyncio.run(run(args.paragraphs, args.repeat))
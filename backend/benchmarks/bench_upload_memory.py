@@ -0,0 +1,79 @@
+"""
+上传文件读取内存基准测试（tracemalloc）
+
+对同一个大HTML文件，比较两种读取方式的Python堆内存峰值：
+- read_all: 旧实现，await file.read() 读出全部字节后再整体 decode('utf-8')
+- chunked:  新实现，uploads.hash_upload() + uploads.decode_upload() 按块读取、增量解码
+
+上传文件与 FastAPI 实际使用的一样，存放在超过 1MB 即写入磁盘的 SpooledTemporaryFile 中。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/bench_upload_memory.py --mb 50
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import tracemalloc
+
+import common  # noqa: F401  (设置 sys.path)
+
+from fastapi import UploadFile
+
+from uploads import decode_upload, hash_upload
+
+# 与 starlette 解析 multipart 时使用的阈值一致
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def make_upload(size_mb: int) -> UploadFile:
+    paragraph = "<p>这是一段用于测试上传内存占用的正文内容，中英文混排 mixed text。</p>\n".encode("utf-8")
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    spooled.write(b"<html><head><meta charset='utf-8'></head><body><article>")
+    written = 0
+    while written < size_mb * 1024 * 1024:
+        spooled.write(paragraph * 100)
+        written += len(paragraph) * 100
+    spooled.write(b"</article></body></html>")
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename="big.html")
+
+
+async def read_all(file: UploadFile) -> str:
+    await file.seek(0)
+    data = await file.read()
+    return data.decode('utf-8', errors='ignore')
+
+
+async def chunked(file: UploadFile) -> str:
+    await hash_upload(file, max_bytes=1 << 40)
+    return await decode_upload(file)
+
+
+async def measure(func, file: UploadFile) -> dict:
+    tracemalloc.start()
+    text = await func(file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 解码后字符串本身占用的内存，峰值与它的比值即“同时存在几份副本”
+    text_size = sys.getsizeof(text)
+    return {"peak_mb": round(peak / 1024 / 1024, 1), "peak_vs_decoded_text": round(peak / text_size, 2)}
+
+
+async def main(size_mb: int) -> None:
+    file = make_upload(size_mb)
+    results = {"file_mb": size_mb}
+    for name, func in (("read_all", read_all), ("chunked", chunked)):
+        results[name] = await measure(func, file)
+    await file.close()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=50, help="测试文件大小（MB）")
+    args = parser.parse_args()
+    asyncio.run(main(args.mb))
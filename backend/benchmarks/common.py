@@ -0,0 +1,212 @@
+"""
+基准测试公共工具
+
+- 把 backend 目录加入 sys.path，使脚本可以直接 import 后端模块
+- 提供一个在后台线程运行的本地桩服务器（stub server），统计建立的TCP连接数
+- 提供在后台线程运行的真实 uvicorn 服务（AppServer），用于测量首字节时间等需要真实网络的指标
+- 提供百分位数等统计函数
+
+所有基准测试脚本都只访问本机，不依赖外网。
+"""
+
+import gzip
+import statistics
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+# 样本页面目录，golden 子目录下保存每个页面的标准提取结果
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+GOLDEN_DIR = CORPUS_DIR / "golden"
+
+# 路由表: 路径 -> (状态码, 响应头, 响应体)
+Route = Tuple[int, Dict[str, str], bytes]
+
+
+def load_corpus() -> Dict[str, str]:
+    """
+    读取全部样本页面，返回 {页面名: HTML文本}
+
+    较大的页面以 .html.gz 形式保存（例如 forum_thread_huge.html.gz），页面名不含扩展名。
+    """
+    pages = {path.stem: path.read_text(encoding="utf-8") for path in CORPUS_DIR.glob("*.html")}
+    for path in CORPUS_DIR.glob("*.html.gz"):
+        pages[path.name[:-len(".html.gz")]] = gzip.decompress(path.read_bytes()).decode("utf-8")
+    return dict(sorted(pages.items()))
+
+
+# 超过该字节数的 golden 结果以 gzip 压缩保存
+GOLDEN_GZIP_BYTES = 256 * 1024
+
+
+def load_golden(name: str) -> Optional[str]:
+    """读取页面的标准提取结果，不存在时返回 None"""
+    path = GOLDEN_DIR / f"{name}.txt"
+    if path.exists():
+        return path.read_text(encoding="utf-8")
+    gz_path = GOLDEN_DIR / f"{name}.txt.gz"
+    if gz_path.exists():
+        return gzip.decompress(gz_path.read_bytes()).decode("utf-8")
+    return None
+
+
+def save_golden(name: str, text: str) -> None:
+    GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+    data = text.encode("utf-8")
+    path, stale = GOLDEN_DIR / f"{name}.txt", GOLDEN_DIR / f"{name}.txt.gz"
+    if len(data) > GOLDEN_GZIP_BYTES:
+        path, stale = stale, path
+        data = gzip.compress(data, mtime=0)
+    path.write_bytes(data)
+    stale.unlink(missing_ok=True)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB）；不支持的平台（Windows）返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage / divisor, 1)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数（线性插值），pct 取值 0~100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """返回以毫秒为单位的 p50/p99/平均延迟"""
+    ms = [x * 1000 for x in latencies]
+    return {
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+    }
+
+
+class StubServer:
+    """
+    本地桩HTTP服务器
+
+    用法::
+
+        with StubServer({"/page": (200, {"Content-Type": "text/html"}, b"<html>...")}) as server:
+            url = server.url("/page")
+
+    handler 参数可以替换默认的路由处理逻辑，用于模拟慢速、故障等场景。
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Route]] = None,
+                 handler: Optional[Callable[[BaseHTTPRequestHandler], None]] = None):
+        self.routes = routes or {}
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if handler is not None:
+                    handler(self)
+                    return
+                status, headers, body = stub.routes.get(self.path, (404, {}, b"not found"))
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, path: str = "/") -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class AppServer:
+    """
+    在后台线程中用 uvicorn 运行 ASGI 应用
+
+    httpx.ASGITransport 会先收齐整个响应体再返回，无法测量流式响应的首字节时间，
+    这类测试需要通过真实的 TCP 连接访问服务。用法::
+
+        with AppServer(main.app) as server:
+            url = server.url("/process_content")
+    """
+
+    def __init__(self, app, **config):
+        import socket
+
+        import uvicorn
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        self.port = sock.getsockname()[1]
+        sock.close()
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port,
+                                                     log_level="warning", **config))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def url(self, path: str = "/") -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def __enter__(self) -> "AppServer":
+        import time
+
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
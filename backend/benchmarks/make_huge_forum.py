@@ -0,0 +1,100 @@
+"""
+生成样本语料中的超长论坛帖子（corpus/forum_thread_huge.html.gz）
+
+真实的热门帖子动辄几千楼，页面有好几兆，是正文提取最慢的一类输入。
+这里用固定随机种子把一组句子组合成 Discuz 风格的帖子页面：
+每楼包含作者信息、引用、签名档、楼层广告，夹杂“顶”“666”之类的短回复，
+结果以 gzip 压缩后提交到仓库，重新运行本脚本会得到完全相同的文件。
+
+运行方式（在 backend 目录下）::
+
+    python benchmarks/make_huge_forum.py --posts 3000
+"""
+
+import argparse
+import gzip
+import html
+import random
+
+from common import CORPUS_DIR
+
+OUTPUT = CORPUS_DIR / "forum_thread_huge.html.gz"
+
+SENTENCES = [
+    "我觉得关键还是要坚持，每天哪怕只读二十页，一年下来也很可观",
+    "以前总想着一次读完一整本书，后来发现分章节读、读完一章就写几句总结效果更好",
+    "推荐大家试试把书里的观点和自己的经历联系起来，这样记得特别牢",
+    "纸质书和电子书各有优点，通勤路上用手机看，周末在家读纸质书",
+    "做笔记的时候不要照抄原文，尽量用自己的话复述一遍",
+    "楼主说的这个问题我也遇到过，读完就忘其实很正常，重要的是定期回顾",
+    "我现在用卡片记录，每张卡片只写一个观点，积累多了再按主题整理",
+    "读书小组也是个好办法，几个人读同一本书，每周讨论一次",
+    "有些书值得反复读，第二遍往往能看到第一遍没注意到的东西",
+    "别给自己太大压力，读书本来应该是一件愉快的事情",
+    "建议先读目录和序言，对整本书的结构有个印象再开始细读",
+    "我习惯在每章结尾写三个问题，下次翻开时先试着回答",
+    "思维导图适合结构清晰的书，小说之类的还是写读后感比较合适",
+    "最近在读一本关于城市发展的书，作者对老旧社区改造的分析很有意思",
+    "图书馆的借阅期限反而逼着我按时读完，买回来的书常常一直放着",
+    "可以试试番茄工作法，二十五分钟专注阅读，然后休息五分钟",
+]
+SHORT_REPLIES = ["顶一下", "666", "mark", "1", "支持楼主", "学习了", "2.0", "同问"]
+USERS = ["书虫小李", "夜读人", "Momo", "阿哲", "路过", "青衫", "小鹿乱撞", "老王读书", "晴天", "木子"]
+ADS = ["广告：名师读书课限时特惠，点击领取优惠券", "广告：电子书阅读器年中大促，下单立减", "广告：加入会员免费畅读十万本好书"]
+
+
+def build_post(rng: random.Random, index: int) -> str:
+    user = rng.choice(USERS)
+    if rng.random() < 0.2:
+        message = html.escape(rng.choice(SHORT_REPLIES))
+    else:
+        parts = []
+        if index > 1 and rng.random() < 0.3:
+            quoted = "，".join(rng.sample(SENTENCES, 2))
+            parts.append(f'<div class="quote"><blockquote><font color="#999">{rng.choice(USERS)} 发表于 '
+                         f'2024-5-{rng.randint(1, 28)} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}</font><br>'
+                         f'{quoted}</blockquote></div>')
+        for _ in range(rng.randint(1, 4)):
+            parts.append("，".join(rng.sample(SENTENCES, rng.randint(1, 3))) + "。<br>")
+        message = "\n        ".join(parts)
+    sign = f'<div class="sign">{html.escape(rng.choice(SENTENCES))}</div>' if rng.random() < 0.3 else ""
+    ad = f'<div class="a_pr">{rng.choice(ADS)}</div>' if index % 10 == 0 else ""
+    return (
+        f'    <table class="plhin" id="pid{1000 + index}"><tr><td class="pls"><div class="authi">'
+        f'<a href="/u/{rng.randint(1, 99999)}">{user}</a></div><div>{index}#</div></td>\n'
+        f'      <td class="plc"><div class="pct"><div class="t_fsz"><table><tr>'
+        f'<td class="t_f" id="postmessage_{1000 + index}">\n        {message}\n      </td></tr></table>'
+        f'{sign}</div></div>{ad}</td></tr></table>\n'
+    )
+
+
+def build_page(posts: int, seed: int) -> str:
+    rng = random.Random(seed)
+    body = "".join(build_post(rng, i) for i in range(1, posts + 1))
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        "<title>【千楼长帖】分享你的读书方法 - 读书交流区 - 书友论坛</title>\n</head>\n<body>\n"
+        '<div id="hd"><div class="wp"><a href="/" class="logo">书友论坛</a>'
+        '<div class="nav"><a href="/forum">版块</a><a href="/search">搜索</a></div></div></div>\n'
+        '<div id="wp" class="wp">\n'
+        '  <div id="pt" class="bm"><a href="/">首页</a> › <a href="/f/12">读书交流区</a> › 【千楼长帖】分享你的读书方法</div>\n'
+        f'  <div id="postlist" class="pl">\n{body}  </div>\n'
+        '  <div class="pgs"><a href="?page=1">1</a><a href="?page=2">2</a><a href="?page=2">下一页</a></div>\n'
+        '</div>\n<div id="ft">Powered by Discuz! © 2001-2024 书友论坛</div>\n</body>\n</html>\n'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=3000, help="楼层数")
+    parser.add_argument("--seed", type=int, default=20240518, help="随机种子")
+    args = parser.parse_args()
+    page = build_page(args.posts, args.seed).encode("utf-8")
+    # mtime 固定为 0，保证相同参数生成的压缩文件逐字节相同
+    with open(OUTPUT, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0, filename="") as gz:
+        gz.write(page)
+    print(f"{OUTPUT.name}: {len(page) / 1024 / 1024:.2f} MB（压缩后 {OUTPUT.stat().st_size / 1024:.0f} KB）")
+
+
+if __name__ == "__main__":
+    main()
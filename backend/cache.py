@@ -0,0 +1,341 @@
+"""
+内容缓存模块
+
+很多用户会把同一篇文章制作成卡片，缓存可以避免重复下载和重复解析。
+缓存以规范化后的URL为键，保存提取出的正文内容：
+
+- TTL 过期：条目超过有效期后不再直接使用
+- 条件请求：过期条目如果保存了 ETag / Last-Modified，会先向源站确认，
+  源站返回 304 时直接延长有效期，无需重新下载和解析
+- 按字节数限制总大小，超出时淘汰最久未使用的条目（LRU）
+- 统计命中、未命中、重新验证和淘汰次数
+
+提供两种存储后端，均无需外部服务：
+- MemoryCacheBackend: 进程内存，速度最快，重启后清空
+- SqliteCacheBackend: 本地 sqlite 文件，重启后仍然有效
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化URL，使指向同一页面的不同写法得到相同的缓存键
+
+    协议和域名转小写、去掉默认端口和 #锚点、查询参数按名称排序、空路径补为 /。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else '')
+        host = f"{userinfo}@{host}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目"""
+    content: str
+    stored_at: float
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        """条目占用的字节数（按UTF-8编码计算）"""
+        return len(self.content.encode('utf-8'))
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) >= self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """向源站确认内容是否变化时使用的条件请求头"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class CacheBackend:
+    """缓存存储后端接口"""
+
+    max_bytes: int
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry) -> int:
+        """写入条目，返回因超出容量而被淘汰的条目数"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def total_bytes(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内存后端：OrderedDict 实现的按字节数限制的 LRU"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> int:
+        size = entry.size
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return 0
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._total += size
+            evicted = 0
+            while self._total > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total = 0
+
+    def _remove(self, key: str) -> None:
+        if key in self._entries:
+            del self._entries[key]
+            self._total -= self._sizes.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    本地 sqlite 文件后端：重启后缓存仍然有效，按最近访问时间淘汰
+
+    多个工作进程可以共用同一个文件：总大小不在进程内记录，每次写入时在同一个写事务中重新统计，
+    各进程写入的条目都计入 max_bytes。
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " size INTEGER NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at)")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, stored_at, expires_at, etag, last_modified FROM cache_entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(content=row[0], stored_at=row[1], expires_at=row[2], etag=row[3], last_modified=row[4])
+
+    def set(self, key: str, entry: CacheEntry) -> int:
+        size = entry.size
+        with self._lock:
+            # BEGIN IMMEDIATE 立即取得写锁：统计总大小到淘汰完成之间其他进程不能写入
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                evicted = 0
+                if size <= self.max_bytes:
+                    self._conn.execute(
+                        "INSERT INTO cache_entries"
+                        " (key, content, stored_at, expires_at, etag, last_modified, size, accessed_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, entry.content, entry.stored_at, entry.expires_at, entry.etag, entry.last_modified,
+                         size, time.time()),
+                    )
+                    total = self._total_bytes()
+                    if total > self.max_bytes:
+                        oldest = self._conn.execute(
+                            "SELECT key, size FROM cache_entries ORDER BY accessed_at").fetchall()
+                        for old_key, old_size in oldest:
+                            if total <= self.max_bytes:
+                                break
+                            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (old_key,))
+                            total -= old_size
+                            evicted += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return evicted
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ContentCache:
+    """
+    带TTL和命中统计的内容缓存
+
+    key_func 用于把调用方传入的键转换为存储键，默认对URL做规范化；
+    键本身已经是规范形式（例如内容哈希）时可以传入 str。
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, key_func: Callable[[str], str] = normalize_url):
+        self.backend = backend
+        self.ttl = ttl
+        self.key_func = key_func
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """
+        查找缓存条目（包括已过期的条目）
+
+        未过期的条目计为命中；过期条目仍然返回，调用方可以用它的
+        ETag / Last-Modified 向源站发起条件请求。
+        """
+        entry = self.backend.get(self.key_func(key))
+        if entry is not None and not entry.is_expired():
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def store(self, key: str, content: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> CacheEntry:
+        now = time.time()
+        entry = CacheEntry(content=content, stored_at=now, expires_at=now + self.ttl,
+                           etag=etag, last_modified=last_modified)
+        self.evictions += self.backend.set(self.key_func(key), entry)
+        return entry
+
+    def revalidated(self, key: str, entry: CacheEntry) -> CacheEntry:
+        """源站确认内容未变化（304），延长条目有效期"""
+        self.revalidations += 1
+        return self.store(key, entry.content, entry.etag, entry.last_modified)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "bytes": self.backend.total_bytes,
+            "max_bytes": self.backend.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def create_cache(cfg: Settings = settings) -> Optional[ContentCache]:
+    """按配置创建缓存；cache_backend 为 none 时返回 None（不使用缓存）"""
+    if cfg.cache_backend == 'none':
+        return None
+    if cfg.cache_backend == 'sqlite':
+        backend = SqliteCacheBackend(cfg.cache_sqlite_path, cfg.cache_max_bytes)
+    elif cfg.cache_backend == 'memory':
+        backend = MemoryCacheBackend(cfg.cache_max_bytes)
+    else:
+        raise ValueError(f"未知的缓存后端: {cfg.cache_backend}，可选值: memory, sqlite, none")
+    logger.info("内容缓存已启用: backend=%s ttl=%ss max_bytes=%d",
+                cfg.cache_backend, cfg.cache_ttl, cfg.cache_max_bytes)
+    return ContentCache(backend, cfg.cache_ttl)
+
+
+def create_upload_cache(cfg: Settings = settings) -> Optional[ContentCache]:
+    """创建上传文件的内容哈希缓存；upload_cache_max_bytes 为 0 时返回 None"""
+    if cfg.upload_cache_max_bytes <= 0:
+        return None
+    return ContentCache(MemoryCacheBackend(cfg.upload_cache_max_bytes), cfg.upload_cache_ttl, key_func=str)
@@ -0,0 +1,293 @@
+"""
+卡片存储模块
+
+生成的结果（提示词 + 提取出的正文）保存到本地 sqlite 文件中，
+用户重新打开或分享卡片时按卡片ID直接读取，无需再次抓取和提取：
+
+- 卡片ID是完整结果的 SHA-256（前32位十六进制），相同的结果只保存一次
+- 提示词和正文分别按内容哈希保存在 blobs 表中，卡片只引用哈希：
+  预设提示词被成千上万张卡片使用时只存一份，同一网页配不同提示词时正文也只存一份
+- blob 使用 zstd（需要安装 zstandard）或 zlib 压缩，压缩算法按行记录，切换配置后旧数据仍可读取
+- 列表按保存顺序倒序分页，使用游标（上一页最后一张卡片的序号），翻页代价与页码无关
+
+删除卡片时，不再被任何卡片引用的提示词和正文一并删除。
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Settings, settings
+from pipeline import render_result, result_content
+
+logger = logging.getLogger(__name__)
+
+# 小于该字节数的 blob 不压缩
+MIN_COMPRESS_BYTES = 64
+# 列表中提示词和正文预览的字符数
+PREVIEW_CHARS = 40
+# 每页最多返回的卡片数
+MAX_PAGE_SIZE = 100
+
+SOURCE_TYPES = ("url", "html", "text")
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def card_id_for(result: str) -> str:
+    """卡片ID：完整结果的内容哈希"""
+    return _hash(result.encode("utf-8"))
+
+
+def _preview(text: str) -> str:
+    line = text.strip().split("\n", 1)[0].strip()
+    return line[:PREVIEW_CHARS] + ("…" if len(line) > PREVIEW_CHARS else "")
+
+
+def _zstd_codec(level: int) -> Optional[Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    # ZstdCompressor / ZstdDecompressor 不是线程安全的，每次新建
+    return (lambda data: zstandard.ZstdCompressor(level=level).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+
+def _zlib_codec(level: int) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    return (lambda data: zlib.compress(data, level), zlib.decompress)
+
+
+@dataclass
+class Card:
+    """一张卡片：提示词和正文，result 与生成时接口返回的结果完全相同"""
+    id: str
+    seq: int
+    created_at: float
+    source_type: str
+    source: Optional[str]
+    prompt: str
+    content: str
+
+    @property
+    def result(self) -> str:
+        return render_result(self.prompt, self.content)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "source_type": self.source_type,
+            "source": self.source,
+            "prompt": self.prompt,
+            "result": self.result,
+        }
+
+
+class CardStore:
+    """sqlite 卡片存储，提示词和正文按内容哈希去重并压缩保存"""
+
+    def __init__(self, path: str, codec: str = "zstd", level: int = 3, clock: Callable[[], float] = time.time):
+        if codec not in ("zstd", "zlib"):
+            raise ValueError(f"未知的卡片压缩算法: {codec}，可选值: zstd, zlib")
+        self.path = path
+        self._decoders: Dict[str, Callable[[bytes], bytes]] = {"none": bytes, "zlib": zlib.decompress}
+        zstd = _zstd_codec(level)
+        if zstd is not None:
+            self._decoders["zstd"] = zstd[1]
+        if codec == "zstd" and zstd is None:
+            logger.warning("未安装 zstandard，卡片存储改用 zlib 压缩（可执行 pip install zstandard）")
+            codec = "zlib"
+        self.codec = codec
+        self._compress = zstd[0] if codec == "zstd" else _zlib_codec(level)[0]
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " hash TEXT PRIMARY KEY,"
+            " codec TEXT NOT NULL,"
+            " data BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " preview TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cards ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id TEXT NOT NULL UNIQUE,"
+            " prompt_hash TEXT NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " source_type TEXT NOT NULL,"
+            " source TEXT,"
+            " length INTEGER NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_prompt ON cards (prompt_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_content ON cards (content_hash)")
+
+    def _put_blob(self, text: str) -> str:
+        data = text.encode("utf-8")
+        digest = _hash(data)
+        exists = self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if exists is None:
+            codec, stored = "none", data
+            if len(data) >= MIN_COMPRESS_BYTES:
+                compressed = self._compress(data)
+                if len(compressed) < len(data):
+                    codec, stored = self.codec, compressed
+            self._conn.execute("INSERT INTO blobs (hash, codec, data, size, preview) VALUES (?, ?, ?, ?, ?)",
+                               (digest, codec, stored, len(data), _preview(text)))
+        return digest
+
+    def _get_blob(self, digest: str) -> str:
+        codec, data = self._conn.execute("SELECT codec, data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if codec not in self._decoders:
+            raise RuntimeError(f"读取卡片需要 {codec} 解压，但未安装对应的库")
+        return self._decoders[codec](data).decode("utf-8")
+
+    def save(self, prompt: str, result: str, source_type: str, source: Optional[str] = None) -> str:
+        """
+        保存一张卡片，返回卡片ID；相同的结果已经保存过时直接返回已有的ID
+
+        result 必须是 render_result(prompt, 正文) 的返回值，这里只保存其中的正文部分。
+        """
+        if source_type not in SOURCE_TYPES:
+            raise ValueError(f"未知的来源类型: {source_type}")
+        if not result.startswith(render_result(prompt, "")):
+            raise ValueError("结果不是由该提示词生成的")
+        card_id = card_id_for(result)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM cards WHERE id = ?", (card_id,)).fetchone() is not None:
+                return card_id
+            self._conn.execute("BEGIN")
+            try:
+                prompt_hash = self._put_blob(prompt)
+                content_hash = self._put_blob(result_content(prompt, result))
+                self._conn.execute(
+                    "INSERT INTO cards (id, prompt_hash, content_hash, source_type, source, length, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (card_id, prompt_hash, content_hash, source_type, source, len(result), self._clock()),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return card_id
+
+    async def save_async(self, prompt: str, result: str, source_type: str, source: Optional[str] = None) -> str:
+        """在线程中压缩和写入（每次都是一个 sqlite 事务并写 WAL），不阻塞事件循环"""
+        return await asyncio.to_thread(self.save, prompt, result, source_type, source)
+
+    def get(self, card_id: str) -> Optional[Card]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq, created_at, source_type, source, prompt_hash, content_hash FROM cards WHERE id = ?",
+                (card_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            prompt, content = self._get_blob(row[4]), self._get_blob(row[5])
+        return Card(id=card_id, seq=row[0], created_at=row[1], source_type=row[2], source=row[3],
+                    prompt=prompt, content=content)
+
+    def list(self, limit: int = 20, before: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        按保存顺序倒序列出卡片摘要（不解压正文），返回 (摘要列表, 下一页的游标)
+
+        before 为上一页返回的游标；没有更多卡片时游标为 None。
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.seq, c.id, c.created_at, c.source_type, c.source, c.length, p.preview, t.preview"
+                " FROM cards c JOIN blobs p ON p.hash = c.prompt_hash JOIN blobs t ON t.hash = c.content_hash"
+                " WHERE c.seq < ? ORDER BY c.seq DESC LIMIT ?",
+                (before if before is not None else 2 ** 63 - 1, limit + 1),
+            ).fetchall()
+        items = [{
+            "id": row[1],
+            "created_at": row[2],
+            "source_type": row[3],
+            "source": row[4],
+            "length": row[5],
+            "prompt_preview": row[6],
+            "content_preview": row[7],
+        } for row in rows[:limit]]
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return items, next_cursor
+
+    def delete(self, card_id: str) -> bool:
+        """删除卡片，以及不再被引用的提示词和正文；卡片不存在时返回 False"""
+        with self._lock:
+            row = self._conn.execute("SELECT prompt_hash, content_hash FROM cards WHERE id = ?",
+                                     (card_id,)).fetchone()
+            if row is None:
+                return False
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM cards WHERE id = ?", (card_id,))
+                for digest in set(row):
+                    self._conn.execute(
+                        "DELETE FROM blobs WHERE hash = ? AND NOT EXISTS"
+                        " (SELECT 1 FROM cards WHERE prompt_hash = ? OR content_hash = ?)",
+                        (digest, digest, digest),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cards, total_chars = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM cards").fetchone()
+            blobs, raw_bytes, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+        return {
+            "enabled": True,
+            "codec": self.codec,
+            "cards": cards,
+            "result_chars": total_chars,
+            "blobs": blobs,
+            "blob_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "file_bytes": sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p)),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_card_store(cfg: Settings = settings) -> Optional[CardStore]:
+    """按配置创建卡片存储；card_store 为 none 时返回 None（不保存卡片）"""
+    if cfg.card_store == "none":
+        return None
+    if cfg.card_store != "sqlite":
+        raise ValueError(f"未知的卡片存储: {cfg.card_store}，可选值: sqlite, none")
+    return CardStore(cfg.card_sqlite_path, cfg.card_codec, cfg.card_compression_level)
+
+
+# 全局卡片存储，card_store 配置为 none 时为 None
+card_store: Optional[CardStore] = create_card_store()
+
+
+async def save_card(prompt: str, result: str, source_type: str, source: Optional[str] = None) -> Optional[str]:
+    """保存卡片并返回卡片ID；未启用卡片存储或保存失败时返回 None（不影响接口返回结果）"""
+    if card_store is None:
+        return None
+    try:
+        return await card_store.save_async(prompt, result, source_type, source)
+    except Exception:
+        logger.exception("保存卡片失败")
+        return None
@@ -0,0 +1,63 @@
+"""
+字符编码识别模块
+
+上传的HTML文件和抓取的网页都不一定是 UTF-8 编码（很多中文网站使用 GBK）。
+这里根据字节顺序标记（BOM）或页面中的 <meta charset> 声明识别编码。
+"""
+
+import codecs
+import re
+from typing import Optional, Tuple
+
+# 识别 <meta charset> 时只检查文件开头的这部分字节
+CHARSET_SNIFF_BYTES = 4096
+
+# 字节顺序标记（BOM）与对应的编码，较长的 BOM 必须排在前面
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# 同时匹配 <meta charset="gbk"> 和 <meta http-equiv="Content-Type" content="text/html; charset=gbk">
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+
+
+def normalize_encoding(name: str) -> Optional[str]:
+    """把编码名称规范为 Python 编解码器名称，无法识别时返回 None"""
+    try:
+        encoding = codecs.lookup(name.strip().strip('"\'')).name
+    except LookupError:
+        return None
+    # 按照 HTML 规范，声明为 gb2312 的页面实际上应按其超集 gbk 解码
+    return 'gbk' if encoding == 'gb2312' else encoding
+
+
+def detect_charset(head: bytes, default: str = 'utf-8') -> Tuple[str, int]:
+    """
+    根据文件开头的字节识别编码
+
+    返回 (编码名称, BOM长度)，解码时需要跳过 BOM。
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+
+    match = _META_CHARSET_RE.search(head[:CHARSET_SNIFF_BYTES])
+    if match:
+        encoding = normalize_encoding(match.group(1).decode('ascii', errors='ignore'))
+        return encoding or default, 0
+    return default, 0
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """从 Content-Type 响应头中取出 charset 参数，无法识别时返回 None"""
+    if not content_type:
+        return None
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            return normalize_encoding(value)
+    return None
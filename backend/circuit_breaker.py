@@ -0,0 +1,133 @@
+"""
+按域名的熔断器模块
+
+某个网站宕机或持续出错时，每个请求都要经过多次重试和超时才会失败，
+既拖慢接口响应，又会继续给已经出问题的源站施压。熔断器按域名记录连续失败次数：
+
+- closed:    正常状态，请求照常发出
+- open:      连续失败达到 breaker_failure_threshold 次后进入，
+             在 breaker_recovery_timeout 秒内对该域名的请求直接失败（503），不再访问源站
+- half_open: 打开时间到期后，只放行一个探测请求；成功则恢复为 closed，失败则重新打开
+
+只有连接错误、超时和 5xx/429 等说明源站不健康的结果才计为失败，
+404 之类的客户端错误说明源站工作正常，不影响熔断状态。
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(HTTPException):
+    """域名处于熔断状态，请求未发出即失败"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"目标网站 {host} 暂时无法访问，请稍后重试",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+@dataclass
+class _HostState:
+    state: str = CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    # 半开状态下探测请求的开始时间；探测请求被取消时超过 recovery_timeout 后允许新的探测
+    probe_started: Optional[float] = None
+    rejected: int = 0
+    last_error: Optional[str] = None
+
+
+class CircuitBreakers:
+    """
+    一组按域名区分的熔断器
+
+    调用方在每次请求前调用 before_request()，请求结束后调用 record_success()
+    或 record_failure()。状态只在事件循环线程中修改，无需加锁。
+    最多记录 max_hosts 个域名，超出时丢弃最早出现失败的域名。
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float, max_hosts: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_hosts = max_hosts
+        self._clock = clock
+        self._hosts: Dict[str, _HostState] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def before_request(self, host: str) -> None:
+        """请求发出前检查熔断状态；熔断中时抛出 CircuitOpenError"""
+        if not self.enabled:
+            return
+        state = self._hosts.get(host)
+        if state is None or state.state == CLOSED:
+            return
+        if state.state == OPEN:
+            remaining = state.opened_at + self.recovery_timeout - self._clock()
+            if remaining > 0:
+                state.rejected += 1
+                raise CircuitOpenError(host, remaining)
+            state.state = HALF_OPEN
+        # half_open：只放行一个探测请求
+        now = self._clock()
+        if state.probe_started is not None and now - state.probe_started < self.recovery_timeout:
+            state.rejected += 1
+            raise CircuitOpenError(host, self.recovery_timeout)
+        state.probe_started = now
+
+    def record_success(self, host: str) -> None:
+        """请求成功，域名恢复正常，不再保留它的状态"""
+        self._hosts.pop(host, None)
+
+    def record_failure(self, host: str, error: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= self.max_hosts:
+                del self._hosts[next(iter(self._hosts))]
+            state = self._hosts[host] = _HostState()
+        state.failures += 1
+        state.last_error = error
+        if state.state == HALF_OPEN or state.failures >= self.failure_threshold:
+            state.state = OPEN
+            state.opened_at = self._clock()
+            state.probe_started = None
+
+    def state(self, host: str) -> str:
+        state = self._hosts.get(host)
+        return CLOSED if state is None else state.state
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """各域名的熔断状态，供监控接口使用；只包含最近一次请求失败的域名"""
+        now = self._clock()
+        result = {}
+        for host, state in self._hosts.items():
+            info = {
+                "state": state.state,
+                "consecutive_failures": state.failures,
+                "rejected": state.rejected,
+                "last_error": state.last_error,
+            }
+            if state.state == OPEN:
+                info["retry_after"] = round(max(0.0, state.opened_at + self.recovery_timeout - now), 3)
+            result[host] = info
+        return result
+
+
+# 全局的按域名熔断器
+circuit_breakers = CircuitBreakers(settings.breaker_failure_threshold, settings.breaker_recovery_timeout)
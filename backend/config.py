@@ -0,0 +1,274 @@
+"""
+配置模块
+
+集中管理后端的所有可调参数，避免在代码中到处硬编码数字。
+
+每个配置项都可以通过环境变量覆盖，环境变量名为 ``MAKE_CARD_`` 前缀
+加上大写的配置项名称，例如::
+
+    MAKE_CARD_HTTP_MAX_CONNECTIONS=200
+    MAKE_CARD_HTTP2=true
+
+布尔值支持 1/0、true/false、yes/no、on/off（不区分大小写）。
+
+也可以把配置写在文件中，用环境变量 ``MAKE_CARD_CONFIG_FILE`` 指定文件路径
+（或 ``python start.py --config 文件``）。文件每行一个 ``名称=值``，名称可以是
+环境变量名，也可以是不带前缀的配置项名称，``#`` 开头的行是注释::
+
+    # 生产环境
+    server_workers = 4
+    MAKE_CARD_CACHE_BACKEND = sqlite
+
+同一配置项同时出现在环境变量和配置文件中时，以环境变量为准。
+"""
+
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Mapping, Optional
+
+ENV_PREFIX = "MAKE_CARD_"
+# 指定配置文件路径的环境变量
+CONFIG_FILE_ENV = ENV_PREFIX + "CONFIG_FILE"
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+_FALSE_VALUES = {"0", "false", "no", "off", ""}
+
+
+def _convert(raw: str, target_type: Any, name: str) -> Any:
+    """把环境变量中的字符串转换为配置项声明的类型"""
+    if target_type is bool:
+        value = raw.strip().lower()
+        if value in _TRUE_VALUES:
+            return True
+        if value in _FALSE_VALUES:
+            return False
+        raise ValueError(f"配置项 {name} 需要布尔值，实际为: {raw!r}")
+    if target_type in (int, float):
+        try:
+            return target_type(raw)
+        except ValueError:
+            raise ValueError(f"配置项 {name} 需要{target_type.__name__}类型，实际为: {raw!r}") from None
+    return raw
+
+
+@dataclass(frozen=True)
+class Settings:
+    """后端运行参数"""
+
+    # ---- 生产模式服务（python start.py --production） ----
+    # 监听地址和端口
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    # 工作进程数，0 表示与CPU核数相同
+    server_workers: int = 1
+    # 事件循环: auto（安装了 uvloop 时使用 uvloop）/ asyncio / uvloop
+    server_loop: str = "auto"
+    # HTTP协议实现: auto（安装了 httptools 时使用 httptools）/ h11 / httptools
+    server_http: str = "auto"
+    # keep-alive 连接的空闲超时（秒）
+    server_keepalive_timeout: int = 5
+    # 监听队列长度（等待 accept 的连接数上限）
+    server_backlog: int = 2048
+    # 收到停止信号后等待进行中的请求完成的最长秒数，超过后强制关闭连接
+    server_graceful_timeout: int = 30
+    # 每个工作进程同时处理的最大连接数，超过时返回503（0 表示不限制）
+    server_limit_concurrency: int = 0
+
+    # ---- 出站HTTP客户端（抓取URL内容） ----
+    # 连接池允许的最大并发连接数
+    http_max_connections: int = 100
+    # 连接池中保持空闲（keep-alive）的最大连接数
+    http_max_keepalive_connections: int = 20
+    # 空闲连接保留的秒数，超过后关闭
+    http_keepalive_expiry: float = 30.0
+    # 是否启用HTTP/2（需要安装 h2，未安装时自动回退到HTTP/1.1）
+    http2: bool = False
+    # 单次请求的超时时间（秒）
+    http_timeout: float = 10.0
+
+    # ---- 网页下载限制 ----
+    # 单个网页最多下载的字节数（解压后），超过时中止
+    fetch_max_bytes: int = 10 * 1024 * 1024
+    # 单次下载的总时长上限（秒），防止源站慢速发送
+    fetch_download_timeout: float = 30.0
+    # 允许处理的内容类型（逗号分隔），响应没有 Content-Type 时不检查
+    fetch_allowed_content_types: str = "text/html,application/xhtml+xml,text/plain"
+    # 读到 </body> 后是否提前结束下载
+    fetch_stop_at_body_end: bool = False
+    # 同一域名同时进行的最大下载数（0 表示不限制）
+    fetch_per_host_concurrency: int = 4
+
+    # ---- 重试与熔断 ----
+    # 单个URL最多尝试的次数（含第一次）
+    fetch_max_attempts: int = 3
+    # 指数退避的基础等待秒数，第 n 次重试前最多等待 base * 2^(n-1) 秒（随机抖动）
+    fetch_backoff_base: float = 0.5
+    # 单次退避等待的上限（秒）
+    fetch_backoff_max: float = 8.0
+    # 单个URL抓取（含所有重试和等待）的总时限（秒）
+    fetch_deadline: float = 45.0
+    # 同一域名连续失败多少次后熔断（0 表示不使用熔断）
+    breaker_failure_threshold: int = 5
+    # 熔断持续的秒数，之后放行一个探测请求
+    breaker_recovery_timeout: float = 30.0
+
+    # ---- 批量处理 ----
+    # 单次批量请求最多包含的条目数
+    batch_max_items: int = 200
+    # 单次批量请求内同时处理的条目数
+    batch_concurrency: int = 8
+
+    # ---- 异步任务 ----
+    # 任务存储: memory（进程内存）/ sqlite（本地文件，重启后未完成的任务继续执行）
+    job_store: str = "memory"
+    # sqlite 任务存储的数据库文件路径
+    job_sqlite_path: str = "jobs.sqlite3"
+    # 同时执行的任务数
+    job_workers: int = 4
+    # 最多允许排队的任务数，超过后返回503
+    job_max_queue: int = 100
+    # 任务完成后结果保留的秒数
+    job_ttl: float = 3600.0
+    # 执行中任务的租约秒数：执行期间定期续约，执行者崩溃后超过该时长任务才由其他进程重新执行
+    job_lease: float = 60.0
+
+    # ---- 正文提取执行池 ----
+    # 执行池类型: thread（线程池）/ process（进程池）/ inline（直接在事件循环中执行）
+    extract_executor: str = "thread"
+    # 执行池的工作线程/进程数
+    extract_workers: int = 4
+    # 除正在执行的任务外，最多允许排队的任务数，超过后返回503
+    extract_max_queue: int = 32
+
+    # ---- 正文提取 ----
+    # HTML解析器: html.parser / lxml / html5-parser，缺少依赖时回退到 html.parser
+    html_parser: str = "html.parser"
+    # 内容容器中链接文字占比的上限，超过的容器不参与评选（1.0 表示不过滤）
+    extract_max_link_density: float = 1.0
+    # 段落切分方式: nested（嵌套的块会重复输出，原有行为）/ flat（每段文字只输出一次）
+    extract_paragraph_mode: str = "nested"
+    # 提取引擎: dom（先解析成完整文档树）/ incremental（边解析边打分，见 incremental_extractor.py）
+    extract_engine: str = "dom"
+    # 输出正文的字符数上限（0 表示不限）；incremental 引擎达到上限后停止解析页面剩余部分
+    extract_max_chars: int = 0
+    # 输出正文的段落数上限（0 表示不限），规则同上
+    extract_max_paragraphs: int = 0
+    # 广告和无关内容过滤规则文件（JSON，可按域名覆盖，见 boilerplate.py）；为空时使用内置规则
+    extract_boilerplate_rules: str = ""
+
+    # ---- URL内容缓存 ----
+    # 缓存后端: memory（进程内存）/ sqlite（本地文件，重启后保留）/ none（不缓存）
+    cache_backend: str = "memory"
+    # 缓存有效期（秒），过期后通过 ETag/Last-Modified 向源站重新验证
+    cache_ttl: float = 600.0
+    # 缓存内容的总字节数上限，超出时淘汰最久未使用的条目
+    cache_max_bytes: int = 64 * 1024 * 1024
+    # sqlite 后端的数据库文件路径
+    cache_sqlite_path: str = "content_cache.sqlite3"
+
+    # ---- 上传文件 ----
+    # 上传HTML文件（以及批量请求和异步任务中直接提交的 html）的最大字节数，超过时返回413
+    upload_max_bytes: int = 20 * 1024 * 1024
+    # 上传文件缓存（按文件内容哈希）的总字节数上限，0 表示不缓存
+    upload_cache_max_bytes: int = 16 * 1024 * 1024
+    # 上传文件缓存有效期（秒）
+    upload_cache_ttl: float = 3600.0
+
+    # ---- 预设提示词 ----
+    # 提示词模板目录（每个 .md 文件是一个提示词），为空时使用内置的 prompt_templates 目录
+    prompt_dir: str = ""
+    # 检查模板文件是否有变化的最小间隔（秒），0 表示不检查（只在启动后首次访问时读取）
+    prompt_reload_interval: float = 2.0
+
+    # ---- 响应压缩 ----
+    # 按 Accept-Encoding 协商的压缩算法，按优先级排列，为空时不压缩
+    # （br 需要安装 brotli，zstd 需要安装 zstandard，未安装时跳过）
+    compression_codecs: str = "zstd,br,gzip"
+    # 响应体小于该字节数时不压缩
+    compression_min_bytes: int = 1024
+    # gzip 压缩级别（1-9）
+    compression_gzip_level: int = 6
+    # brotli 压缩质量（0-11），动态内容不宜过高
+    compression_brotli_quality: int = 4
+    # zstd 压缩级别（1-22）
+    compression_zstd_level: int = 3
+
+    # ---- 卡片存储（见 cards.py） ----
+    # 存储: none（不保存，默认）/ sqlite（本地文件，按卡片ID重新打开生成过的结果）
+    # 开启后用户提交的内容会写入本地文件，且 /cards 接口不做鉴权，只应在可信环境中开启
+    card_store: str = "none"
+    # sqlite 卡片存储的数据库文件路径
+    card_sqlite_path: str = "cards.sqlite3"
+    # 提示词和正文的压缩算法: zstd（需要安装 zstandard，未安装时回退到 zlib）/ zlib
+    card_codec: str = "zstd"
+    # 压缩级别（zstd 1-22，zlib 1-9）
+    card_compression_level: int = 3
+
+    # ---- 限流（见 rate_limit.py） ----
+    # 是否启用按客户端的限流
+    rate_limit_enabled: bool = False
+    # 令牌桶存储: memory（每个工作进程单独计数）/ sqlite（本地文件，同一台机器上的工作进程共享）
+    rate_limit_store: str = "memory"
+    # sqlite 存储的数据库文件路径
+    rate_limit_sqlite_path: str = "ratelimit.sqlite3"
+    # 抓取和正文提取接口：每个客户端每秒补充的请求数（0 表示不限制）和最多积累的请求数
+    rate_limit_heavy_rate: float = 2.0
+    rate_limit_heavy_burst: int = 10
+    # 其他接口：每个客户端每秒补充的请求数（0 表示不限制）和最多积累的请求数
+    rate_limit_light_rate: float = 20.0
+    rate_limit_light_burst: int = 60
+    # 每个客户端同时进行的抓取和正文提取请求数上限，超过时返回429（0 表示不限制）
+    rate_limit_client_concurrency: int = 4
+    # 每个工作进程同时进行的抓取和正文提取请求数上限，超过时排队（0 表示不限制）
+    rate_limit_global_concurrency: int = 64
+    # 排队等待的最长秒数，超过后返回503
+    rate_limit_global_wait: float = 5.0
+    # 是否按 X-Forwarded-For 识别客户端IP（仅在可信的反向代理后开启）
+    rate_limit_trust_forwarded: bool = False
+    # 可信的反向代理层数：客户端IP取 X-Forwarded-For 中从右数第几个地址（最左边的地址可由客户端任意伪造）
+    rate_limit_trusted_hops: int = 1
+    # 已知的 API Key（逗号分隔，原文或 sha256:十六进制哈希）；只有这些 Key 单独计数，其他请求按IP计数
+    rate_limit_api_keys: str = ""
+    # memory 存储最多记录的客户端数，超出时丢弃最久未访问的
+    rate_limit_max_clients: int = 10000
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """从环境变量（以及 MAKE_CARD_CONFIG_FILE 指定的配置文件）读取配置，未设置的项使用默认值"""
+        environ = os.environ if environ is None else environ
+        if environ.get(CONFIG_FILE_ENV):
+            environ = {**load_config_file(environ[CONFIG_FILE_ENV]), **environ}
+        values = {}
+        for f in fields(cls):
+            raw = environ.get(ENV_PREFIX + f.name.upper())
+            if raw is not None:
+                values[f.name] = _convert(raw, f.type, f.name)
+        return cls(**values)
+
+
+def load_config_file(path: str) -> Dict[str, str]:
+    """读取配置文件，返回 {环境变量名: 值}；未知的配置项视为错误，避免拼写错误被静默忽略"""
+    known = {ENV_PREFIX + f.name.upper() for f in fields(Settings)}
+    values = {}
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, sep, value = line.partition("=")
+            if not sep:
+                raise ValueError(f"配置文件 {path} 第{lineno}行格式错误，应为 名称=值")
+            name = name.strip().upper()
+            if not name.startswith(ENV_PREFIX):
+                name = ENV_PREFIX + name
+            if name not in known:
+                raise ValueError(f"配置文件 {path} 第{lineno}行: 未知的配置项 {name}")
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+                value = value[1:-1]
+            values[name] = value
+    return values
+
+
+# 全局配置实例，应用启动时读取一次
+settings = Settings.from_env()
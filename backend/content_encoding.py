@@ -0,0 +1,265 @@
+"""
+响应压缩与条件请求模块
+
+接口返回的结果和提示词模板都是大段中文或 Markdown/HTML 文本，压缩率很高。
+CompressionMiddleware 按客户端的 Accept-Encoding 协商压缩算法：
+
+- 支持 gzip（标准库）、br（需要安装 brotli 或 brotlicffi）、zstd（需要安装 zstandard），
+  未安装的算法自动跳过；多个算法的 q 值相同时按配置项 compression_codecs 的顺序选择
+- 只压缩一次性返回、不小于 compression_min_bytes 的文本类响应；
+  NDJSON/SSE 等流式响应逐块发送，不压缩，以免影响首字节时间
+- 已经设置了 Content-Encoding 或 Cache-Control: no-transform 的响应保持原样
+
+可缓存的 GET 接口（预设提示词、已完成的异步任务结果）使用 EncodedBody 和 cached_json_response()：
+响应体只序列化一次，各压缩版本按需生成并缓存，带强 ETag，客户端重新验证时返回 304。
+同一内容的不同压缩版本使用不同的 ETag（后缀 -gzip / -br / -zstd），比较 If-None-Match 时忽略后缀。
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+
+import metrics
+from config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+# 超过该字节数的响应体在线程中压缩，避免阻塞事件循环
+THREAD_COMPRESS_BYTES = 256 * 1024
+
+# 可以压缩的内容类型（text/* 之外）
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json", "application/javascript", "application/xml", "application/xhtml+xml",
+    "image/svg+xml",
+})
+# 逐块发送的流式内容类型，不压缩
+STREAMING_TYPES = frozenset({"text/event-stream", "application/x-ndjson"})
+
+Compressor = Callable[[bytes], bytes]
+
+
+def _gzip_compressor(level: int) -> Compressor:
+    return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli_compressor(quality: int) -> Optional[Compressor]:
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+    return lambda data: brotli.compress(data, quality=quality)
+
+
+def _zstd_compressor(level: int) -> Optional[Compressor]:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    # ZstdCompressor 不是线程安全的，每次压缩时新建
+    return lambda data: zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def create_compressors(cfg: Settings = settings) -> Dict[str, Compressor]:
+    """按配置项 compression_codecs 的顺序返回可用的压缩算法"""
+    factories = {
+        "gzip": lambda: _gzip_compressor(cfg.compression_gzip_level),
+        "br": lambda: _brotli_compressor(cfg.compression_brotli_quality),
+        "zstd": lambda: _zstd_compressor(cfg.compression_zstd_level),
+    }
+    compressors = {}
+    for name in (item.strip().lower() for item in cfg.compression_codecs.split(",")):
+        if not name:
+            continue
+        if name not in factories:
+            raise ValueError(f"未知的压缩算法: {name}，可选值: {', '.join(factories)}")
+        compressor = factories[name]()
+        if compressor is None:
+            logger.warning("未安装 %s 压缩所需的库，跳过（br 需要 brotli，zstd 需要 zstandard）", name)
+            continue
+        compressors[name] = compressor
+    return compressors
+
+
+# 全局可用的压缩算法（按优先级排列）
+compressors = create_compressors()
+
+
+def parse_accept_encoding(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """解析 Accept-Encoding，返回 {算法: q值}"""
+    preferences = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences[coding] = quality
+    return preferences
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Optional[List[str]] = None) -> Optional[str]:
+    """选出客户端接受（q 值最高）的压缩算法，q 值相同时按服务端的优先级；都不接受时返回 None"""
+    preferences = parse_accept_encoding(accept_encoding)
+    default = preferences.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in (list(compressors) if available is None else available):
+        quality = preferences.get(name, default)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """同一内容的压缩版本使用的 ETag：在强 ETag 的引号内加上算法后缀"""
+    if not encoding or not etag.endswith('"') or etag.startswith("W/"):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _strip_etag(etag: str) -> str:
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for name in ("gzip", "br", "zstd"):
+        suffix = f'-{name}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，忽略 W/ 前缀和压缩算法后缀）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _strip_etag(etag)
+    return any(_strip_etag(candidate) == target for candidate in if_none_match.split(","))
+
+
+def is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", "").lower():
+        return False
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type in STREAMING_TYPES:
+        return False
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    """用指定算法压缩，耗时计入 compress 阶段"""
+    start = time.perf_counter()
+    try:
+        return compressors[encoding](data)
+    finally:
+        metrics.observe_stage("compress", time.perf_counter() - start)
+
+
+async def compress_async(encoding: str, data: bytes) -> bytes:
+    if len(data) >= THREAD_COMPRESS_BYTES:
+        return await asyncio.to_thread(compress, encoding, data)
+    return compress(encoding, data)
+
+
+class EncodedBody:
+    """序列化好的JSON响应体及其 ETag，各压缩版本在首次需要时生成并缓存"""
+
+    def __init__(self, payload: Any):
+        self.data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.data).hexdigest()[:32] + '"'
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding not in self._encoded:
+            self._encoded[encoding] = compress(encoding, self.data)
+        return self._encoded[encoding]
+
+
+def cached_json_response(request: Request, body: EncodedBody) -> Response:
+    """返回带 ETag 的JSON响应；命中 If-None-Match 时返回 304，按 Accept-Encoding 使用缓存的压缩版本"""
+    encoding = None
+    if compressors and len(body.data) >= settings.compression_min_bytes:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"ETag": encoded_etag(body.etag, encoding), "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), body.etag):
+        return Response(status_code=304, headers=headers)
+    content = body.data
+    if encoding is not None:
+        content = body.encoded(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+class CompressionMiddleware:
+    """
+    按 Accept-Encoding 压缩响应的 ASGI 中间件
+
+    等待响应的第一个 body 消息：如果它就是全部内容（more_body 为假）且满足压缩条件则压缩后发出，
+    否则（流式响应）原样转发。
+    """
+
+    def __init__(self, app, min_bytes: Optional[int] = None):
+        self.app = app
+        self.min_bytes = settings.compression_min_bytes if min_bytes is None else min_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not compressors:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (message.get("more_body", False) or len(body) < self.min_bytes
+                    or not is_compressible(headers)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = await compress_async(encoding, body)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            passthrough = True
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
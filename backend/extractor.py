@@ -0,0 +1,315 @@
+"""
+正文提取模块
+
+从HTML中提取文章主体内容。提取过程是纯CPU计算（HTML解析、文本遍历、正则过滤），
+不依赖事件循环，因此可以放到线程池或进程池中执行，见 workers.py。
+"""
+
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, Tag
+
+from boilerplate import BoilerplateRules, rules_for_url
+from config import settings
+from parsers import parse_html
+
+# 内容容器的匹配规则。数字是规则的优先级，与原先依次执行的CSS选择器顺序一致：
+#   article, main, .content, .article, .post, #content, #article, #main,
+#   [class*="article"], [class*="content"], [class*="post"], .post-content, .entry-content
+# 多个容器文本长度相同时，优先级小（选择器靠前）的胜出，其次是文档中靠前的。
+CONTAINER_TAG_RULES = {'article': 0, 'main': 1}
+CONTAINER_CLASS_RULES = {'content': 2, 'article': 3, 'post': 4, 'post-content': 11, 'entry-content': 12}
+CONTAINER_ID_RULES = {'content': 5, 'article': 6, 'main': 7}
+CONTAINER_CLASS_SUBSTRING_RULES = (('article', 8), ('content', 9), ('post', 10))
+
+# 从内容容器中提取段落时识别的块级元素；没有找到容器时只在 p/div 中提取
+CONTAINER_BLOCK_TAGS = ['p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']
+FALLBACK_BLOCK_TAGS = ['p', 'div']
+
+PARAGRAPH_MODES = ('nested', 'flat')
+
+# 段落至少要超过的字符数
+MIN_PARAGRAPH_CHARS = 15
+# 按段落提取的结果（以换行连接后）少于该字符数时，改用全文文本重新提取
+FALLBACK_MIN_CHARS = 100
+# 只由数字和小数点组成的文本（页码、日期、阅读数等）
+_NUMERIC_RE = re.compile(r'^[0-9.]*$')
+
+# get_text() 默认统计的字符串类型（不含注释、脚本等）
+_TEXT_STRING_TYPES = Tag.DEFAULT_INTERESTING_STRING_TYPES
+
+
+def _container_rule(tag: Tag) -> Optional[int]:
+    """返回标签命中的优先级最高的容器规则，未命中返回 None"""
+    return container_rank(tag.name, tag.get('id'), tag.get('class'))
+
+
+def container_rank(name: str, element_id, classes) -> Optional[int]:
+    """
+    按标签名、id 和 class 返回命中的优先级最高的容器规则，未命中返回 None
+
+    classes 可以是 class 属性的原始字符串，也可以是 BeautifulSoup 拆分后的列表。
+    """
+    ranks = []
+    if name in CONTAINER_TAG_RULES:
+        ranks.append(CONTAINER_TAG_RULES[name])
+
+    if isinstance(element_id, str) and element_id in CONTAINER_ID_RULES:
+        ranks.append(CONTAINER_ID_RULES[element_id])
+
+    if classes:
+        if isinstance(classes, str):
+            class_value, class_list = classes, classes.split()
+        else:
+            class_value, class_list = ' '.join(classes), classes
+        ranks.extend(CONTAINER_CLASS_RULES[c] for c in class_list if c in CONTAINER_CLASS_RULES)
+        ranks.extend(rank for keyword, rank in CONTAINER_CLASS_SUBSTRING_RULES if keyword in class_value)
+
+    return min(ranks) if ranks else None
+
+
+def find_main_container(soup: BeautifulSoup, max_link_density: Optional[float] = None) -> Optional[Tag]:
+    """
+    单次遍历文档树，找出文本最多的内容容器
+
+    自底向上为每个元素累计一次文本长度（等价于 len(tag.get_text(strip=True))）
+    和其中链接文字的长度，避免对嵌套容器反复调用 get_text()。
+
+    max_link_density 为链接文字占比的上限，超过的容器不参与评选
+    （默认使用配置项 extract_max_link_density，1.0 表示不过滤）。
+    """
+    if max_link_density is None:
+        max_link_density = settings.extract_max_link_density
+
+    nodes = list(soup.descendants)
+    text_len: Dict[int, int] = {}
+    link_len: Dict[int, int] = {}
+
+    # 逆序遍历时，每个元素的所有后代都先于它被处理，因此到达元素时其统计已完整
+    for node in reversed(nodes):
+        parent = node.parent
+        if isinstance(node, Tag):
+            length = text_len.get(id(node), 0)
+            links = length if node.name == 'a' else link_len.get(id(node), 0)
+            link_len[id(node)] = links
+            if parent is not None:
+                text_len[id(parent)] = text_len.get(id(parent), 0) + length
+                link_len[id(parent)] = link_len.get(id(parent), 0) + links
+        elif type(node) in _TEXT_STRING_TYPES and parent is not None:
+            length = len(node.strip())
+            if length:
+                text_len[id(parent)] = text_len.get(id(parent), 0) + length
+
+    best = None
+    best_key = None
+    for position, node in enumerate(nodes):
+        if not isinstance(node, Tag):
+            continue
+        rank = _container_rule(node)
+        if rank is None:
+            continue
+        if node.interesting_string_types is _TEXT_STRING_TYPES:
+            length = text_len.get(id(node), 0)
+        else:
+            # <template> 等特殊标签统计的字符串类型不同，直接计算
+            length = len(node.get_text(strip=True))
+        if length and link_len.get(id(node), 0) / length > max_link_density:
+            continue
+        key = (length, -rank, -position)
+        if best_key is None or key > best_key:
+            best, best_key = node, key
+    return best
+
+
+def iter_block_texts(root: Tag, block_tags: Iterable[str]) -> Iterator[str]:
+    """
+    按块级元素切分 root 下的文本，每个文本节点只输出一次
+
+    与“对每个块级元素调用 get_text()”不同，嵌套的块不会把子块的文字再输出一遍：
+    ``<div>导语<p>正文</p>结尾</div>`` 依次输出 "导语"、"正文"、"结尾"。
+    不在任何块级元素内的文字（例如容器本身的直接文字）不输出，与原有行为一致。
+    """
+    block_tags = frozenset(block_tags)
+    parts: List[str] = []
+    # 栈中保存 (子节点迭代器, 该层是否为块级元素)，用显式栈避免深层嵌套时递归过深
+    stack = [(iter(root.contents), False)]
+    depth = 0
+    while stack:
+        children, is_block = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if is_block:
+                depth -= 1
+                if parts:
+                    yield ''.join(parts)
+                    parts = []
+            continue
+        if isinstance(child, Tag):
+            is_child_block = child.name in block_tags
+            if is_child_block:
+                depth += 1
+                if parts:
+                    yield ''.join(parts)
+                    parts = []
+            stack.append((iter(child.contents), is_child_block))
+        elif depth and type(child) in _TEXT_STRING_TYPES:
+            text = child.strip()
+            if text:
+                parts.append(text)
+
+
+def remove_boilerplate(soup: BeautifulSoup, rules: BoilerplateRules) -> int:
+    """
+    单次遍历文档树，移除命中过滤规则（标签名、class/id）的元素，返回移除的元素数
+
+    命中的元素连同子元素一起移除，不再检查其中的元素。
+    """
+    is_boilerplate = rules.is_boilerplate_element
+    matched = []
+    stack = [soup]
+    while stack:
+        for child in stack.pop().contents:
+            if isinstance(child, Tag):
+                attrs = child.attrs
+                if is_boilerplate(child.name, attrs.get('id'), attrs.get('class')):
+                    matched.append(child)
+                elif child.contents:
+                    stack.append(child)
+    for tag in matched:
+        tag.decompose()
+    return len(matched)
+
+
+def filter_paragraphs(texts: Iterable[str], skip_ads: bool = True,
+                      rules: Optional[BoilerplateRules] = None) -> Iterator[str]:
+    """
+    逐个过滤段落文本，只保留可能是正文的段落
+
+    过滤掉不超过 MIN_PARAGRAPH_CHARS 个字符的短句、纯数字文本，
+    skip_ads 为真时还过滤掉包含过滤规则中关键词（默认为“广告”，见 boilerplate.py）的段落。
+    先做开销最小的长度判断，长度不够的段落不再执行正则匹配。
+    """
+    match_numeric = _NUMERIC_RE.match
+    is_boilerplate = (rules or rules_for_url()).is_boilerplate_text if skip_ads else None
+    for text in texts:
+        if len(text) > MIN_PARAGRAPH_CHARS and not (skip_ads and is_boilerplate(text)) and not match_numeric(text):
+            yield text
+
+
+def select_content_texts(paragraph_texts: Iterable[str], soup: BeautifulSoup,
+                         rules: Optional[BoilerplateRules] = None) -> List[str]:
+    """
+    过滤段落，返回作为正文输出的文本列表（以换行连接即为提取结果）
+
+    过滤的同时累计以换行连接后的长度，不必为判断是否过短先拼接一遍。
+    """
+    content_texts = []
+    joined_length = -1
+    for text in filter_paragraphs(paragraph_texts, rules=rules):
+        content_texts.append(text)
+        joined_length += len(text) + 1
+
+    # 如果上面方法提取的内容太少，尝试使用更宽松的方法：
+    # 在全部非空白文本（stripped_strings 已去除首尾空白）中过滤短句和特殊内容
+    if joined_length < FALLBACK_MIN_CHARS:
+        content_texts = list(filter_paragraphs(soup.stripped_strings, skip_ads=False))
+    return content_texts
+
+
+def apply_output_budget(texts: List[str], max_chars: int = 0, max_paragraphs: int = 0) -> List[str]:
+    """
+    按输出预算截断正文段落（0 表示不限）
+
+    最多保留 max_paragraphs 段，且以换行连接后不超过 max_chars 个字符，
+    超出字符预算的那一段截取到预算为止。
+    """
+    if max_paragraphs > 0:
+        texts = texts[:max_paragraphs]
+    if max_chars > 0:
+        budgeted = []
+        remaining = max_chars
+        for text in texts:
+            if remaining <= 0:
+                break
+            budgeted.append(text[:remaining])
+            remaining -= len(text) + 1
+        texts = budgeted
+    return texts
+
+
+def extract_main_content(html_content: str, parser: Optional[str] = None,
+                         paragraph_mode: Optional[str] = None, url: Optional[str] = None) -> str:
+    """增强版内容提取算法
+
+    parser 指定HTML解析器（见 parsers.py），默认使用配置项 html_parser。
+    paragraph_mode 指定段落切分方式，默认使用配置项 extract_paragraph_mode：
+    - nested: 对每个块级元素取全部文字，嵌套的块会重复输出（原有行为）
+    - flat:   每段文字只输出一次，见 iter_block_texts()
+
+    url 为页面地址时使用该站点的过滤规则（见 boilerplate.py），否则使用默认规则。
+
+    配置项 extract_engine 为 incremental 时改用 incremental_extractor.py 边解析边提取（总是 flat 方式）。
+    """
+    content, _ = extract_main_content_timed(html_content, parser, paragraph_mode, url)
+    return content
+
+
+def extract_main_content_timed(html_content: str, parser: Optional[str] = None, paragraph_mode: Optional[str] = None,
+                               url: Optional[str] = None) -> Tuple[str, Dict[str, float]]:
+    """
+    与 extract_main_content() 相同，同时返回各阶段的耗时（秒）
+
+    提取可能在进程池中执行，无法直接写入主进程的监控指标，
+    因此把耗时随结果一起返回，由调用方记录（见 pipeline.py 和 metrics.py）。
+    正文按配置项 extract_max_chars / extract_max_paragraphs 截断。
+    """
+    rules = rules_for_url(url)
+    if settings.extract_engine == 'incremental':
+        from incremental_extractor import extract_incremental_timed
+        return extract_incremental_timed(html_content, parser, rules=rules)
+    if settings.extract_engine != 'dom':
+        raise ValueError(f"未知的提取引擎: {settings.extract_engine}，可选值: dom, incremental")
+    paragraph_mode = paragraph_mode or settings.extract_paragraph_mode
+    if paragraph_mode not in PARAGRAPH_MODES:
+        raise ValueError(f"未知的段落模式: {paragraph_mode}，可选值: {', '.join(PARAGRAPH_MODES)}")
+    timings: Dict[str, float] = {}
+    last = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        timings[stage] = now - last
+        last = now
+
+    soup = parse_html(html_content, parser)
+    lap('extract_parse')
+
+    # 移除常见的广告和无关元素
+    remove_boilerplate(soup, rules)
+    lap('extract_cleanup')
+
+    # 1. 首先寻找最可能的内容容器（单次遍历完成打分）
+    main_container = find_main_container(soup)
+    lap('extract_container')
+
+    if main_container is not None:
+        # 提取段落
+        root, block_tags = main_container, CONTAINER_BLOCK_TAGS
+    else:
+        # 如果找不到明确的内容区域，就获取所有段落
+        root, block_tags = soup, FALLBACK_BLOCK_TAGS
+
+    if paragraph_mode == 'flat':
+        paragraph_texts = iter_block_texts(root, block_tags)
+    else:
+        paragraph_texts = (p.get_text(strip=True) for p in root.find_all(block_tags))
+
+    # 进一步过滤和提取内容
+    content_texts = select_content_texts(paragraph_texts, soup, rules)
+    content_texts = apply_output_budget(content_texts, settings.extract_max_chars, settings.extract_max_paragraphs)
+    content = '\n'.join(content_texts)
+    lap('extract_paragraphs')
+    return content, timings
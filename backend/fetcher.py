@@ -0,0 +1,335 @@
+"""
+网页抓取模块
+
+通过全局共享的HTTP客户端（见 http_client.py）获取网页内容，带重试机制。
+支持携带 If-None-Match / If-Modified-Since 条件请求头，
+用于缓存过期后向源站确认内容是否有变化（304 Not Modified）。
+
+响应体以流式方式读取，不会把任意大小的内容整个缓存在内存中：
+- 先检查 Content-Type 和 Content-Length，非网页内容或声明过大时直接放弃
+- 边下载边统计字节数，超过 fetch_max_bytes 立即中止
+- 整体下载时间超过 fetch_download_timeout 时中止（防止源站一点一点地慢速发送）
+- 边下载边增量解码，编码依次取自 BOM、响应头 charset、<meta charset>，默认 UTF-8
+- 可选：读到 </body> 后提前结束下载
+
+同一域名同时进行的下载数受 fetch_per_host_concurrency 限制，
+批量处理大量同站链接时不会对源站造成过大压力。
+
+失败时只重试可能成功的情况（连接错误、超时、5xx、429 等），按指数退避加随机抖动等待，
+遵守 Retry-After，并受单个URL的总时限约束；持续出错的域名会被熔断（见 circuit_breaker.py）。
+"""
+
+import asyncio
+import codecs
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException
+
+from charsets import CHARSET_SNIFF_BYTES, charset_from_content_type, detect_charset
+from circuit_breaker import CircuitOpenError, circuit_breakers
+from config import settings
+from http_client import get_client
+import metrics
+
+_BODY_END = b'</body'
+
+# 值得重试的状态码（源站暂时不可用或限流），其它 4xx/5xx 直接失败
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass
+class FetchResult:
+    """一次抓取的结果"""
+    url: str
+    status_code: int
+    text: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        """条件请求命中，源站内容没有变化"""
+        return self.status_code == 304
+
+
+class HostLimiter:
+    """
+    按域名限制并发下载数
+
+    每个域名对应一个信号量，按需创建，没有任务在使用时自动移除。
+    limit 为 0 表示不限制。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def acquire(self, host: str) -> AsyncIterator[None]:
+        if self.limit <= 0:
+            yield
+            return
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.limit))
+        self._users[host] = self._users.get(host, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._users[host] -= 1
+            if not self._users[host]:
+                del self._users[host]
+                del self._semaphores[host]
+
+
+# 全局的按域名并发限制
+host_limiter = HostLimiter(settings.fetch_per_host_concurrency)
+
+
+class FetchRejectedError(HTTPException):
+    """内容不符合抓取限制（类型、大小、下载时间），重试也不会成功"""
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=400, detail=detail)
+
+
+def _allowed_content_types() -> List[str]:
+    return [t.strip().lower() for t in settings.fetch_allowed_content_types.split(',') if t.strip()]
+
+
+def _check_response_headers(response: httpx.Response) -> None:
+    """在读取响应体之前检查内容类型和声明的大小"""
+    content_type = response.headers.get('Content-Type')
+    if content_type:
+        mime = content_type.split(';')[0].strip().lower()
+        if mime not in _allowed_content_types():
+            raise FetchRejectedError(f"不支持的内容类型: {mime}，只能处理网页")
+
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) > settings.fetch_max_bytes:
+        raise FetchRejectedError(f"网页内容过大（{content_length} 字节），最大支持 {settings.fetch_max_bytes} 字节")
+
+
+async def _read_text(response: httpx.Response) -> str:
+    """流式读取响应体并增量解码，超过大小限制时中止"""
+    declared = charset_from_content_type(response.headers.get('Content-Type'))
+
+    decoder = None
+    pending = bytearray()  # 识别编码之前暂存的开头部分
+    parts: List[str] = []
+    size = 0
+    tail = b''  # 上一块的结尾，用于识别跨块的 </body>
+
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > settings.fetch_max_bytes:
+            raise FetchRejectedError(f"网页内容过大，最大支持 {settings.fetch_max_bytes} 字节")
+
+        if decoder is None:
+            pending += chunk
+            if len(pending) >= CHARSET_SNIFF_BYTES:
+                decoder = _make_decoder(bytes(pending), declared, parts)
+        else:
+            parts.append(decoder.decode(chunk))
+
+        if settings.fetch_stop_at_body_end:
+            window = tail + chunk
+            if _BODY_END in window.lower():
+                break
+            tail = window[-len(_BODY_END):]
+
+    if decoder is None:
+        decoder = _make_decoder(bytes(pending), declared, parts)
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
+def _make_decoder(head: bytes, declared: Optional[str], parts: List[str]):
+    """根据开头的字节确定编码，创建增量解码器并解码开头部分"""
+    sniffed, bom_length = detect_charset(head)
+    # BOM 优先于响应头，响应头优先于 <meta charset>
+    encoding = sniffed if bom_length else (declared or sniffed)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    parts.append(decoder.decode(head[bom_length:]))
+    return decoder
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回需要等待的秒数；无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, retry_at.timestamp() - (time.time() if now is None else now))
+
+
+def backoff_delay(attempt: int) -> float:
+    """第 attempt 次失败后的退避等待秒数：指数增长、带随机抖动（full jitter）"""
+    ceiling = min(settings.fetch_backoff_max, settings.fetch_backoff_base * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+def _breaker_key(url: str) -> str:
+    """熔断器按 域名[:端口] 区分"""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    return f"{host}:{parts.port}" if parts.port else host
+
+
+class _StageTracer:
+    """
+    httpx 的 trace 回调：根据 httpcore 发出的事件统计建立连接、TLS握手、等待响应头的耗时
+
+    事件名形如 connection.connect_tcp.started / http11.receive_response_headers.complete。
+    连接池中的连接被复用时不会产生连接相关的事件。
+    """
+
+    # 阶段名 -> (开始事件, 结束事件)，事件名不含 connection. / http11. / http2. 前缀
+    STAGES = {
+        'fetch_connect': ('connect_tcp.started', 'connect_tcp.complete'),
+        'fetch_tls': ('start_tls.started', 'start_tls.complete'),
+        'fetch_wait': ('send_request_headers.started', 'receive_response_headers.complete'),
+    }
+
+    def __init__(self):
+        self._started: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: Dict) -> None:
+        event = event_name.split('.', 1)[-1]
+        for stage, (start_event, end_event) in self.STAGES.items():
+            if event == start_event:
+                self._started[stage] = time.perf_counter()
+            elif event == end_event and stage in self._started:
+                metrics.observe_stage(stage, time.perf_counter() - self._started.pop(stage))
+
+
+async def _fetch_once(url: str, host: str, timeout: float,
+                      headers: Optional[Dict[str, str]]) -> FetchResult:
+    """发出一次请求并读取响应；状态码错误以 httpx.HTTPStatusError 抛出"""
+    client = get_client()
+    async with host_limiter.acquire(host), client.stream('GET', url, timeout=timeout, headers=headers,
+                                                          extensions={'trace': _StageTracer()}) as response:
+        if response.status_code == 304:
+            text = ''
+        else:
+            response.raise_for_status()
+            _check_response_headers(response)
+            try:
+                with metrics.timed_stage('fetch_download'):
+                    text = await asyncio.wait_for(_read_text(response), settings.fetch_download_timeout)
+            except asyncio.TimeoutError:
+                raise FetchRejectedError(f"网页下载时间超过 {settings.fetch_download_timeout} 秒")
+            finally:
+                metrics.FETCH_BYTES.inc(response.num_bytes_downloaded)
+        return FetchResult(
+            url=url,
+            status_code=response.status_code,
+            text=text,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+
+
+async def fetch_page(url: str, max_retries: Optional[int] = None, timeout: Optional[float] = None,
+                     headers: Optional[Dict[str, str]] = None) -> FetchResult:
+    """
+    获取URL内容，带重试机制
+
+    headers 为额外的请求头（例如条件请求头）。源站返回 304 时不视为错误，
+    返回 not_modified 为 True 且 text 为空的结果。
+    内容类型、大小或下载时间不符合限制时抛出 FetchRejectedError，不再重试。
+
+    重试策略：
+    - max_retries 为最多尝试的次数（含第一次），默认使用配置项 fetch_max_attempts
+    - 只重试连接错误、超时和 RETRYABLE_STATUS_CODES 中的状态码，404 等直接失败
+    - 重试前按指数退避随机等待；源站返回 Retry-After 时至少等待该时长
+    - 所有尝试和等待的总时长不超过 fetch_deadline，等待会超过时限时不再重试
+    - 同一域名连续失败过多时熔断，熔断期间直接返回 503（见 circuit_breaker.py）
+    """
+    try:
+        result = await _fetch_with_retries(url, max_retries, timeout, headers)
+    except CircuitOpenError:
+        metrics.FETCH_RESULTS.inc(result='circuit_open')
+        raise
+    except FetchRejectedError:
+        metrics.FETCH_RESULTS.inc(result='rejected')
+        raise
+    except HTTPException:
+        metrics.FETCH_RESULTS.inc(result='failed')
+        raise
+    metrics.FETCH_RESULTS.inc(result='not_modified' if result.not_modified else 'ok')
+    return result
+
+
+async def _fetch_with_retries(url: str, max_retries: Optional[int], timeout: Optional[float],
+                              headers: Optional[Dict[str, str]]) -> FetchResult:
+    attempts = max_retries or settings.fetch_max_attempts
+    timeout = timeout or settings.http_timeout
+    host = (urlsplit(url).hostname or '').lower()
+    breaker_key = _breaker_key(url)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.fetch_deadline
+
+    for attempt in range(1, attempts + 1):
+        remaining = deadline - loop.time()
+        circuit_breakers.before_request(breaker_key)
+        retry_after = None
+        try:
+            result = await asyncio.wait_for(_fetch_once(url, host, min(timeout, remaining), headers), remaining)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in RETRYABLE_STATUS_CODES:
+                # 源站正常响应了，只是这个地址无法获取，重试也不会成功
+                circuit_breakers.record_success(breaker_key)
+                raise HTTPException(status_code=400, detail=f"获取URL内容失败: {str(e)}")
+            error, reason = str(e), 'status'
+            retry_after = parse_retry_after(e.response.headers.get('Retry-After'))
+        except httpx.TransportError as e:
+            error, reason = str(e) or type(e).__name__, 'transport'
+        except httpx.HTTPError as e:
+            # 重定向过多、解压失败等，重试也不会成功
+            raise HTTPException(status_code=400, detail=f"获取URL内容失败: {str(e)}")
+        except asyncio.TimeoutError:
+            circuit_breakers.record_failure(breaker_key, "timeout")
+            raise HTTPException(status_code=400, detail=f"获取URL内容失败: 超过总时限 {settings.fetch_deadline} 秒")
+        except FetchRejectedError:
+            circuit_breakers.record_success(breaker_key)
+            raise
+        else:
+            circuit_breakers.record_success(breaker_key)
+            return result
+
+        circuit_breakers.record_failure(breaker_key, error)
+        if attempt == attempts:
+            raise HTTPException(status_code=400, detail=f"获取URL内容失败: {error}")
+        delay = backoff_delay(attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if loop.time() + delay >= deadline:
+            raise HTTPException(status_code=400, detail=f"获取URL内容失败: {error}（重试等待将超过总时限）")
+        metrics.FETCH_RETRIES.inc(reason=reason)
+        with metrics.timed_stage('fetch_backoff'):
+            await asyncio.sleep(delay)
+
+
+async def fetch_url_with_retry(url: str, max_retries: int = 3, timeout: int = 10) -> str:
+    """尝试获取URL内容，带重试机制，增加超时时间到10秒
+
+    使用全局共享的HTTP客户端，连接在多次请求之间复用。
+    """
+    result = await fetch_page(url, max_retries=max_retries, timeout=timeout)
+    return result.text
@@ -0,0 +1,85 @@
+"""
+出站HTTP客户端模块
+
+整个应用共享同一个 httpx.AsyncClient，从而复用连接池、keep-alive 连接
+以及（可选的）HTTP/2 多路复用，避免每次抓取都重新进行 TCP/TLS 握手。
+
+客户端由 FastAPI 的 lifespan 负责创建和关闭：
+- 应用启动时调用 start_client()
+- 应用关闭时调用 close_client()，释放所有连接
+"""
+
+import logging
+from typing import Optional
+
+import httpx
+
+from config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+# 抓取网页时使用的默认请求头
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """检查是否安装了HTTP/2所需的 h2 库"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_client(cfg: Settings = settings) -> httpx.AsyncClient:
+    """按照配置创建一个新的 AsyncClient"""
+    http2 = cfg.http2
+    if http2 and not _http2_available():
+        logger.warning("已开启HTTP/2但未安装h2库，回退到HTTP/1.1（可执行 pip install httpx[http2]）")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=cfg.http_max_connections,
+        max_keepalive_connections=cfg.http_max_keepalive_connections,
+        keepalive_expiry=cfg.http_keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        limits=limits,
+        http2=http2,
+        timeout=cfg.http_timeout,
+        follow_redirects=True,
+    )
+
+
+async def start_client(cfg: Settings = settings) -> httpx.AsyncClient:
+    """创建全局共享客户端（应用启动时调用）"""
+    global _client
+    if _client is None:
+        _client = create_client(cfg)
+    return _client
+
+
+async def close_client() -> None:
+    """关闭全局共享客户端并释放连接（应用关闭时调用）"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    获取全局共享客户端
+
+    正常情况下客户端已由 lifespan 创建；在脚本或测试中直接调用抓取函数时，
+    这里会按需创建一个，之后仍需调用 close_client() 关闭。
+    """
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
@@ -0,0 +1,434 @@
+"""
+增量正文提取模块
+
+extractor.py 先把整个页面解析成 BeautifulSoup 文档树，再遍历文档树选择容器、切分段落。
+几MB的论坛长帖、聊天记录导出页面，光建树就要占用几百MB内存和数秒CPU，
+而生成卡片往往只需要开头的几千字。这里改为边解析边打分：
+
+- 用解析器的事件接口（html.parser 的 HTMLParser，或 lxml 的 target 解析器）按块喂入HTML，
+  不建立文档树；命中过滤规则的元素（script/style/nav、广告位等，见 boilerplate.py）在解析时直接跳过
+- 每个候选容器（规则与 extractor.py 相同）在解析过程中累计文本长度、链接文字长度，
+  以及按 flat 方式切分、过滤后的段落
+- 设置了输出预算（extract_max_chars / extract_max_paragraphs）时，
+  一旦某个容器的正文达到预算就停止解析，页面剩余部分不再读取
+
+不设预算时读完整个页面，按与 extractor.py 相同的规则选择容器，
+结果与 flat 段落模式下的 extract_main_content() 相同（使用同一种解析器时；
+<rt>、<template> 互相嵌套、HTML 中的 CDATA 段之类罕见的写法，BeautifulSoup 建树时的特殊处理没有全部模拟），
+可用 benchmarks/bench_incremental_extract.py 在样本页面上验证。
+设置预算并提前停止时，只在已经读到的部分中选择容器，页面后面更长的容器不再参与评选。
+"""
+
+import time
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from bs4.builder import HTMLTreeBuilder
+
+from boilerplate import BoilerplateRules, rules_for_url
+from config import settings
+from extractor import (CONTAINER_BLOCK_TAGS, FALLBACK_BLOCK_TAGS, FALLBACK_MIN_CHARS, apply_output_budget,
+                       container_rank, filter_paragraphs)
+from parsers import resolve_backend
+
+# 每次喂给解析器的字符数
+CHUNK_CHARS = 64 * 1024
+
+# 没有结束标签的元素
+VOID_TAGS = frozenset(HTMLTreeBuilder.empty_element_tags)
+# 其中的文字不算作正文的元素（BeautifulSoup 为其中的文字使用特殊的字符串类型，get_text() 不统计）
+NON_TEXT_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+
+_CONTAINER_BLOCKS = frozenset(CONTAINER_BLOCK_TAGS)
+_FALLBACK_BLOCKS = frozenset(FALLBACK_BLOCK_TAGS)
+
+
+class _BudgetReached(Exception):
+    """输出达到预算，停止解析"""
+
+
+class _Container:
+    """解析过程中的一个候选容器"""
+    __slots__ = ('rank', 'position', 'text_len', 'link_len', 'texts', 'joined_len')
+
+    def __init__(self, rank: int, position: int):
+        self.rank = rank
+        self.position = position
+        self.text_len = 0
+        self.link_len = 0
+        # 过滤后的段落，以及以换行连接后的长度
+        self.texts: List[str] = []
+        self.joined_len = -1
+
+    def key(self) -> tuple:
+        return (self.text_len, -self.rank, -self.position)
+
+    def link_density(self) -> float:
+        return self.link_len / self.text_len if self.text_len else 0.0
+
+
+class _Segmenter:
+    """
+    按块级元素切分文本，规则与 extractor.iter_block_texts() 相同
+
+    每个打开的块记录打开时已经打开的容器数，切出的段落只属于这些容器
+    （块在容器内部时，容器在块之前打开）；容器自身也是块级元素时，
+    它的直接文字不属于它自己，与 iter_block_texts() 不输出根元素直接文字一致。
+    """
+    __slots__ = ('blocks', 'parts', 'emit')
+
+    def __init__(self, emit: Callable[[str, int], None]):
+        self.blocks: List[int] = []
+        self.parts: List[str] = []
+        self.emit = emit
+
+    def flush(self) -> None:
+        if self.parts:
+            owners = self.blocks[-1]
+            text = ''.join(self.parts)
+            self.parts = []
+            self.emit(text, owners)
+
+    def open(self, owners: int) -> None:
+        self.flush()
+        self.blocks.append(owners)
+
+    def close(self) -> None:
+        self.flush()
+        self.blocks.pop()
+
+    def add(self, text: str) -> None:
+        if self.blocks:
+            self.parts.append(text)
+
+
+class IncrementalExtractor:
+    """
+    边解析边打分的正文提取器
+
+    解析器把开始标签、结束标签、文本和注释事件交给 start() / end() / data() / comment()，
+    喂完全部HTML（或预算已满抛出 _BudgetReached）后调用 result() 取得正文段落。
+    """
+
+    def __init__(self, max_chars: int = 0, max_paragraphs: int = 0, max_link_density: Optional[float] = None,
+                 rules: Optional[BoilerplateRules] = None):
+        # 解析时跳过的元素和过滤段落的关键词，与 extractor.py 清理的规则相同
+        self.rules = rules or rules_for_url()
+        self.max_chars = max_chars
+        self.max_paragraphs = max_paragraphs
+        self.max_link_density = settings.extract_max_link_density if max_link_density is None \
+            else max_link_density
+        self.budget = bool(max_chars or max_paragraphs)
+        # 元素栈: (标签名, 打开的容器, 是否容器块, 是否后备块)
+        self._stack: List[Tuple[str, Optional[_Container], bool, bool]] = []
+        self._skip_depth = 0
+        # 打开的 NON_TEXT_TAGS 元素（其本身是容器时记录容器）
+        self._non_text: List[Optional[_Container]] = []
+        self._link_depth = 0
+        self._position = 0
+        self._pending: List[str] = []
+        self._open: List[_Container] = []
+        self._containers: List[_Container] = []
+        self._blocks = _Segmenter(self._container_paragraph)
+        self._fallback = _Segmenter(self._fallback_paragraph)
+        self._fallback_texts: List[str] = []
+        self._fallback_len = -1
+        # 全文中过滤后的非空白文本（段落提取结果太少时使用）
+        self._strings: List[str] = []
+        self._strings_len = -1
+        self._selected: Optional[List[str]] = None
+        self.stopped_early = False
+
+    # ---- 解析事件 ----
+
+    def start(self, name: str, attrs: Dict[str, Optional[str]]) -> None:
+        self._flush_text()
+        self._position += 1
+        container = None
+        in_container_block = in_fallback_block = False
+        if self._skip_depth or self.rules.is_boilerplate_element(name, attrs.get('id'), attrs.get('class')):
+            self._skip_depth += 1
+        else:
+            # 先打开块再登记容器，容器自身的直接文字不计入它自己的段落
+            if name in _CONTAINER_BLOCKS:
+                self._blocks.open(len(self._open))
+                in_container_block = True
+            if name in _FALLBACK_BLOCKS:
+                self._fallback.open(0)
+                in_fallback_block = True
+            rank = container_rank(name, attrs.get('id'), attrs.get('class'))
+            if rank is not None:
+                container = _Container(rank, self._position)
+                self._open.append(container)
+                self._containers.append(container)
+            if name == 'a':
+                self._link_depth += 1
+            if name in NON_TEXT_TAGS:
+                self._non_text.append(container)
+        self._stack.append((name, container, in_container_block, in_fallback_block))
+
+    def end(self, name: str) -> None:
+        # 与 BeautifulSoup 相同，结束标签总会把前后的文字分成两个文本节点，
+        # 没有对应开始标签时不关闭任何元素
+        self._flush_text()
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == name:
+                self._pop(index)
+                return
+
+    def data(self, text: str) -> None:
+        if not self._skip_depth:
+            self._pending.append(text)
+
+    def cdata(self, text: str) -> None:
+        # CDATA 段是单独的文本节点，在 <template> 等元素中也按普通文字统计
+        self._flush_text()
+        text = text.strip()
+        if text and not self._skip_depth:
+            self._add_text(text)
+
+    def comment(self, text: str) -> None:
+        # 注释不计入正文，但会把前后的文字分成两个文本节点
+        self._flush_text()
+
+    def _pop(self, index: int) -> None:
+        while len(self._stack) > index:
+            name, container, in_container_block, in_fallback_block = self._stack.pop()
+            if self._skip_depth:
+                self._skip_depth -= 1
+                continue
+            if name == 'a':
+                self._link_depth -= 1
+            if name in NON_TEXT_TAGS:
+                self._non_text.pop()
+            if container is not None:
+                self._open.pop()
+            if in_fallback_block:
+                self._fallback.close()
+            if in_container_block:
+                self._blocks.close()
+
+    def _flush_text(self) -> None:
+        if not self._pending:
+            return
+        text = ''.join(self._pending).strip()
+        self._pending = []
+        if not text:
+            return
+        if self._non_text:
+            # 与 BeautifulSoup 相同：只计入最内层的 <template> 等元素自身的文本长度
+            owner = self._non_text[-1]
+            if owner is not None:
+                owner.text_len += len(text)
+            return
+        self._add_text(text)
+
+    def _add_text(self, text: str) -> None:
+        length = len(text)
+        for container in self._open:
+            container.text_len += length
+            if self._link_depth:
+                container.link_len += length
+        if not (self.budget and self._strings_len >= self.max_chars > 0):
+            for kept in filter_paragraphs((text,), skip_ads=False):
+                self._strings.append(kept)
+                self._strings_len += len(kept) + 1
+        self._blocks.add(text)
+        self._fallback.add(text)
+
+    # ---- 段落 ----
+
+    def _reached(self, texts: List[str], joined_len: int) -> bool:
+        return (self.max_chars > 0 and joined_len >= self.max_chars) or \
+            (self.max_paragraphs > 0 and len(texts) >= self.max_paragraphs)
+
+    def _container_paragraph(self, text: str, owners: int) -> None:
+        if not owners or not any(True for _ in filter_paragraphs((text,), rules=self.rules)):
+            return
+        full = []
+        for container in self._open[:owners]:
+            container.texts.append(text)
+            container.joined_len += len(text) + 1
+            if self.budget and self._reached(container.texts, container.joined_len) \
+                    and container.link_density() <= self.max_link_density:
+                full.append(container)
+        if full:
+            self._stop(max(full, key=_Container.key).texts)
+
+    def _fallback_paragraph(self, text: str, owners: int) -> None:
+        if not any(True for _ in filter_paragraphs((text,), rules=self.rules)):
+            return
+        self._fallback_texts.append(text)
+        self._fallback_len += len(text) + 1
+        # 还没有遇到任何容器时，才能按全文段落提前停止
+        if self.budget and not self._containers and self._reached(self._fallback_texts, self._fallback_len):
+            self._stop(self._fallback_texts)
+
+    def _stop(self, texts: List[str]) -> None:
+        self._selected = texts
+        self.stopped_early = True
+        raise _BudgetReached()
+
+    # ---- 结果 ----
+
+    def close(self) -> None:
+        """文档结束：处理最后的文字并关闭所有未闭合的元素"""
+        self._flush_text()
+        self._pop(0)
+
+    def result(self) -> List[str]:
+        """返回作为正文输出的段落列表（已按预算截断）"""
+        if self._selected is None:
+            best = None
+            for container in self._containers:
+                if container.text_len and container.link_density() > self.max_link_density:
+                    continue
+                if best is None or container.key() > best.key():
+                    best = container
+            if best is not None:
+                texts, joined_len = best.texts, best.joined_len
+            else:
+                texts, joined_len = self._fallback_texts, self._fallback_len
+            # 与 extractor.select_content_texts() 相同：段落提取的内容太少时改用全文文本
+            self._selected = texts if joined_len >= FALLBACK_MIN_CHARS else self._strings
+        return apply_output_budget(self._selected, self.max_chars, self.max_paragraphs)
+
+
+class _HTMLParserDriver(HTMLParser):
+    """
+    把 html.parser 的事件转交给 IncrementalExtractor
+
+    空元素的处理与 BeautifulSoup 的 html.parser 构建器相同：html.parser 不为 <br> 产生结束事件，
+    这里立即关闭它，并忽略之后对应的 </br>。BeautifulSoup 用列表记录这些空元素，
+    页面中有大量 <br> 时每个结束标签都要扫描整个列表，这里只记录每种标签的个数。
+    """
+
+    def __init__(self, extractor: IncrementalExtractor):
+        super().__init__(convert_charrefs=True)
+        self.extractor = extractor
+        self._already_closed: Counter = Counter()
+
+    def handle_starttag(self, tag, attrs):
+        self.extractor.start(tag, dict(attrs))
+        if tag in VOID_TAGS:
+            self.extractor.end(tag)
+            self._already_closed[tag] += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.extractor.start(tag, dict(attrs))
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._already_closed[tag]:
+            self._already_closed[tag] -= 1
+        else:
+            self.extractor.end(tag)
+
+    def handle_data(self, data):
+        self.extractor.data(data)
+
+    def handle_comment(self, data):
+        self.extractor.comment(data)
+
+    def handle_decl(self, decl):
+        self.extractor.comment(decl)
+
+    def handle_pi(self, data):
+        self.extractor.comment(data)
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> 与 BeautifulSoup 一样作为单独的文本节点
+        if data.startswith('CDATA['):
+            self.extractor.cdata(data[len('CDATA['):])
+        else:
+            self.extractor.comment(data)
+
+
+class _LxmlTarget:
+    """lxml target 解析器接口，把事件转交给 IncrementalExtractor"""
+
+    def __init__(self, extractor: IncrementalExtractor):
+        self.extractor = extractor
+
+    def start(self, tag, attrib):
+        self.extractor.start(tag, attrib)
+
+    def end(self, tag):
+        self.extractor.end(tag)
+
+    def data(self, data):
+        self.extractor.data(data)
+
+    def comment(self, text):
+        self.extractor.comment(text)
+
+    def doctype(self, name, pubid, system):
+        self.extractor.comment(name)
+
+    def pi(self, target, data=None):
+        self.extractor.comment(target)
+
+    def close(self):
+        return None
+
+
+def _feed_html_parser(extractor: IncrementalExtractor, chunks: Iterable[str]) -> None:
+    parser = _HTMLParserDriver(extractor)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+
+
+def _feed_lxml(extractor: IncrementalExtractor, chunks: Iterable[str]) -> None:
+    from lxml import etree
+    parser = etree.HTMLParser(target=_LxmlTarget(extractor))
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+
+
+def _iter_chunks(html: Union[str, Iterable[str]]) -> Iterable[str]:
+    if isinstance(html, str):
+        return (html[i:i + CHUNK_CHARS] for i in range(0, len(html), CHUNK_CHARS))
+    return html
+
+
+def extract_incremental_timed(html: Union[str, Iterable[str]], parser: Optional[str] = None,
+                              max_chars: Optional[int] = None,
+                              max_paragraphs: Optional[int] = None,
+                              rules: Optional[BoilerplateRules] = None) -> Tuple[str, Dict[str, float]]:
+    """
+    边解析边提取正文，返回 (正文, 各阶段耗时)
+
+    html 可以是完整的字符串，也可以是逐块产生字符串的可迭代对象（例如边下载边解码），
+    预算已满时不再从中读取。parser 为 lxml 时使用 lxml 的事件接口，其余解析器使用 html.parser。
+    max_chars / max_paragraphs 默认使用配置项 extract_max_chars / extract_max_paragraphs，0 表示不限。
+    rules 为过滤规则，默认使用 boilerplate.py 中的默认规则。
+    """
+    max_chars = settings.extract_max_chars if max_chars is None else max_chars
+    max_paragraphs = settings.extract_max_paragraphs if max_paragraphs is None else max_paragraphs
+    feed = _feed_lxml if resolve_backend(parser) == 'lxml' else _feed_html_parser
+
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    extractor = IncrementalExtractor(max_chars, max_paragraphs, rules=rules)
+    try:
+        feed(extractor, _iter_chunks(html))
+        extractor.close()
+    except _BudgetReached:
+        pass
+    parsed = time.perf_counter()
+    timings['extract_parse'] = parsed - start
+
+    content = '\n'.join(extractor.result())
+    timings['extract_paragraphs'] = time.perf_counter() - parsed
+    return content, timings
+
+
+def extract_incremental(html: Union[str, Iterable[str]], parser: Optional[str] = None,
+                        max_chars: Optional[int] = None, max_paragraphs: Optional[int] = None,
+                        rules: Optional[BoilerplateRules] = None) -> str:
+    """与 extract_incremental_timed() 相同，只返回正文"""
+    content, _ = extract_incremental_timed(html, parser, max_chars, max_paragraphs, rules)
+    return content
@@ -0,0 +1,490 @@
+"""
+异步任务模块
+
+网站较慢时，抓取加上重试可能要几十秒，同步接口会一直占着HTTP连接，
+前面的反向代理往往先超时。异步任务模式下：
+
+- POST /jobs 立即返回任务ID，任务进入有界队列（排队数达到 job_max_queue 时返回 503）
+- 固定数量（job_workers）的后台协程依次取出任务，执行与同步接口相同的抓取和提取流程
+- 通过 GET /jobs/{id} 查询状态，GET /jobs/{id}/result 获取结果
+- 任务完成后保留 job_ttl 秒，过期后自动清理
+- 与同步接口相同，成功的结果在启用了卡片存储时保存为卡片（见 cards.py），结果中附带卡片ID
+
+任务存储有两种后端：
+- MemoryJobStore: 进程内存，重启后任务丢失
+- SqliteJobStore: 本地 sqlite 文件，重启后未完成的任务（排队中和执行到一半的）重新进入队列；
+                  多个工作进程（start.py --production）可以共用同一个文件，任务状态在各进程间可见
+
+执行中的任务带有租约：取走任务的执行者（进程）记录在 claimed_by 中，执行期间每隔 job_lease / 3 秒
+把 lease_until 延后 job_lease 秒。只有租约已过期的 running 任务（执行者崩溃或被强制结束）才会重新进入队列，
+其他工作进程正在执行的任务不受影响，同一任务不会被执行两次。正常停止时，执行到一半的任务立即交还给队列。
+完成时以 claimed_by 为条件写入结果（JobStore.finish），租约失效后才完成的执行者不会覆盖接手者的结果。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+
+from batch import BatchItem, item_source, process_item, validate_item
+from cards import save_card
+from config import Settings, settings
+from prompts import PromptReference, prompt_fields
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# 清理过期任务的间隔（秒）
+SWEEP_INTERVAL = 60.0
+
+
+class JobRequest(BatchItem, PromptReference):
+    """异步任务的请求体：url / html / text 三者之一，加上提示词（prompt 全文或 prompt_id 引用的预设提示词）"""
+
+
+@dataclass
+class Job:
+    """一个异步任务"""
+    id: str
+    payload: Dict[str, Any]
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # 完成后的过期时间，未完成时为 None
+    expires_at: Optional[float] = None
+    result: Optional[str] = None
+    # 失败时为 {"status_code": ..., "detail": ...}
+    error: Optional[Dict[str, Any]] = None
+    # 执行中时为执行者ID和租约到期时间
+    claimed_by: Optional[str] = None
+    lease_until: Optional[float] = None
+    # 成功且启用了卡片存储时为保存的卡片ID
+    card_id: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return self.expires_at is not None and (time.time() if now is None else now) >= self.expires_at
+
+    def describe(self) -> Dict[str, Any]:
+        """状态查询接口返回的信息（不含结果正文）"""
+        info = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+        }
+        if self.error is not None:
+            info["error"] = self.error
+        return info
+
+
+class JobStore:
+    """任务存储后端接口"""
+
+    def save(self, job: Job) -> None:
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    def claim(self, job_id: str, started_at: float, owner: str, lease_until: float) -> Optional[Job]:
+        """把排队中的任务标记为由 owner 执行并返回；任务不存在或已被其他执行者取走时返回 None"""
+        raise NotImplementedError
+
+    def renew(self, job_id: str, owner: str, lease_until: float) -> bool:
+        """延长 owner 正在执行的任务的租约；任务已不属于 owner 时返回 False"""
+        raise NotImplementedError
+
+    def requeue_expired(self, now: float) -> int:
+        """把租约已过期的执行中任务改回排队中，返回改回的数量"""
+        raise NotImplementedError
+
+    def release(self, owner: str) -> int:
+        """把 owner 执行到一半的任务改回排队中（正常停止时调用），返回改回的数量"""
+        raise NotImplementedError
+
+    def finish(self, job: Job, owner: str) -> bool:
+        """
+        保存 owner 执行完成的任务；任务已不属于 owner 时（租约过期后被其他执行者接手）不保存并返回 False
+        """
+        raise NotImplementedError
+
+    def queued(self) -> List[Job]:
+        """排队中的任务，按创建时间排序"""
+        raise NotImplementedError
+
+    def purge_expired(self, now: float) -> int:
+        """删除已过期的任务，返回删除的数量"""
+        raise NotImplementedError
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """进程内存后端"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+
+    def save(self, job: Job) -> None:
+        self._jobs[job.id] = job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def claim(self, job_id: str, started_at: float, owner: str, lease_until: float) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status != QUEUED:
+            return None
+        job.status, job.started_at, job.claimed_by, job.lease_until = RUNNING, started_at, owner, lease_until
+        return job
+
+    def renew(self, job_id: str, owner: str, lease_until: float) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.status != RUNNING or job.claimed_by != owner:
+            return False
+        job.lease_until = lease_until
+        return True
+
+    def _requeue(self, matches) -> int:
+        jobs = [job for job in self._jobs.values() if job.status == RUNNING and matches(job)]
+        for job in jobs:
+            job.status, job.started_at, job.claimed_by, job.lease_until = QUEUED, None, None, None
+        return len(jobs)
+
+    def requeue_expired(self, now: float) -> int:
+        return self._requeue(lambda job: job.lease_until is None or job.lease_until <= now)
+
+    def release(self, owner: str) -> int:
+        return self._requeue(lambda job: job.claimed_by == owner)
+
+    def finish(self, job: Job, owner: str) -> bool:
+        current = self._jobs.get(job.id)
+        if current is None or current.status != RUNNING or current.claimed_by != owner:
+            return False
+        self._jobs[job.id] = job
+        return True
+
+    def queued(self) -> List[Job]:
+        return sorted((job for job in self._jobs.values() if job.status == QUEUED), key=lambda job: job.created_at)
+
+    def purge_expired(self, now: float) -> int:
+        expired = [job_id for job_id, job in self._jobs.items() if job.is_expired(now)]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+
+class SqliteJobStore(JobStore):
+    """本地 sqlite 文件后端：重启后未完成的任务仍然保留"""
+
+    _COLUMNS = ("id", "payload", "status", "created_at", "started_at", "finished_at", "expires_at", "result", "error",
+                "claimed_by", "lease_until", "card_id")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " expires_at REAL,"
+            " result TEXT,"
+            " error TEXT,"
+            " claimed_by TEXT,"
+            " lease_until REAL,"
+            " card_id TEXT)"
+        )
+        # 旧版本创建的数据库没有租约和卡片ID列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (("claimed_by", "TEXT"), ("lease_until", "REAL"), ("card_id", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (expires_at)")
+
+    def _to_row(self, job: Job) -> tuple:
+        return (job.id, json.dumps(job.payload, ensure_ascii=False), job.status, job.created_at, job.started_at,
+                job.finished_at, job.expires_at, job.result,
+                None if job.error is None else json.dumps(job.error, ensure_ascii=False), job.claimed_by, job.lease_until, job.card_id)
+
+    def _from_row(self, row: tuple) -> Job:
+        values = dict(zip(self._COLUMNS, row))
+        values["payload"] = json.loads(values["payload"])
+        values["error"] = None if values["error"] is None else json.loads(values["error"])
+        return Job(**values)
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                self._to_row(job),
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._from_row(row)
+
+    def claim(self, job_id: str, started_at: float, owner: str, lease_until: float) -> Optional[Job]:
+        # 多个工作进程共用同一个数据库时，以条件更新保证同一任务只被一个进程执行
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, claimed_by = ?, lease_until = ? WHERE id = ? AND status = ?",
+                (RUNNING, started_at, owner, lease_until, job_id, QUEUED),
+            ).rowcount
+        return self.get(job_id) if updated else None
+
+    def renew(self, job_id: str, owner: str, lease_until: float) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND claimed_by = ?",
+                (lease_until, job_id, RUNNING, owner),
+            ).rowcount > 0
+
+    def requeue_expired(self, now: float) -> int:
+        # 旧版本留下的 running 任务没有租约，视为已过期
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, claimed_by = NULL, lease_until = NULL"
+                " WHERE status = ? AND (lease_until IS NULL OR lease_until <= ?)",
+                (QUEUED, RUNNING, now),
+            ).rowcount
+
+    def release(self, owner: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, claimed_by = NULL, lease_until = NULL"
+                " WHERE status = ? AND claimed_by = ?",
+                (QUEUED, RUNNING, owner),
+            ).rowcount
+
+    def finish(self, job: Job, owner: str) -> bool:
+        # 只有仍由 owner 执行时才写入，不覆盖其他执行者接手后的结果
+        columns = self._COLUMNS[1:]
+        with self._lock:
+            return self._conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{column} = ?' for column in columns)}"
+                " WHERE id = ? AND status = ? AND claimed_by = ?",
+                (*self._to_row(job)[1:], job.id, RUNNING, owner),
+            ).rowcount > 0
+
+    def queued(self) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,),
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        with self._lock:
+            for status, count in self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                counts[status] = count
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    有界的异步任务队列
+
+    start() 启动 workers 个后台协程，并把存储中排队的任务和租约已过期的执行中任务放入队列；
+    stop() 取消后台协程，并把本执行者执行到一半的任务改回排队中，使用 sqlite 存储时由其他进程或下次启动继续执行。
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_queue: int, ttl: float, lease: float = 60.0):
+        self.store = store
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.lease = lease
+        # 执行者ID：多个工作进程共用 sqlite 存储时区分各自取走的任务
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        # 已在本进程队列中等待的任务ID，定期恢复时不重复放入
+        self._queued_ids: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def _put(self, job_id: str) -> None:
+        if job_id not in self._queued_ids:
+            self._queued_ids.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    def _enqueue_recovered(self) -> int:
+        """把租约已过期的任务改回排队中，并把所有排队中的任务放入本进程的队列，返回改回的任务数"""
+        requeued = self.store.requeue_expired(time.time())
+        queued = self.store.queued()
+        for job in queued:
+            # 已被其他进程取走的任务在 claim() 时跳过
+            self._put(job.id)
+        return requeued
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        requeued = self._enqueue_recovered()
+        if self._queue.qsize():
+            logger.info("恢复了 %d 个未完成的异步任务（其中 %d 个执行者已退出）", self._queue.qsize(), requeued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.store.release(self.owner)
+        self.store.close()
+
+    def submit(self, request: JobRequest) -> Job:
+        """创建任务并放入队列；请求无效时返回400，排队数达到上限时返回503"""
+        validate_item(request)
+        # 提交时就确定提示词全文，排队期间模板更新不影响已提交的任务
+        prompt, template = request.resolve()
+        if self._queue.qsize() >= self.max_queue:
+            raise HTTPException(status_code=503, detail="任务队列已满，请稍后重试", headers={"Retry-After": "5"})
+        payload = {**BatchItem(**request.dict()).dict(), "prompt": prompt, **prompt_fields(template)}
+        job = Job(id=uuid.uuid4().hex, payload=payload)
+        self.store.save(job)
+        self._put(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.store.get(job_id)
+        if job is None or job.is_expired():
+            return None
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "max_queue": self.max_queue, "ttl": self.ttl,
+                "queue_size": self._queue.qsize(), **self.store.counts()}
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            now = time.time()
+            try:
+                job = self.store.claim(job_id, now, self.owner, now + self.lease)
+            except Exception:
+                # 例如 sqlite 被其他进程锁住：任务仍是排队中，由下次定期恢复重新放入队列
+                logger.exception("取出异步任务 %s 失败", job_id)
+                continue
+            if job is None:
+                continue
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                await self._run(job)
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, job: Job) -> None:
+        """执行期间定期延长租约"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                renewed = self.store.renew(job.id, self.owner, time.time() + self.lease)
+            except Exception:
+                logger.exception("延长异步任务 %s 的租约失败", job.id)
+                continue
+            if not renewed:
+                logger.warning("异步任务 %s 的租约已失效", job.id)
+                return
+
+    async def _run(self, job: Job) -> None:
+        payload = job.payload
+        result = card_id = error = None
+        try:
+            item = BatchItem(**payload)
+            result = await process_item(item, payload["prompt"])
+            card_id = await save_card(payload["prompt"], result, *item_source(item))
+        except HTTPException as e:
+            error = {"status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            error = {"status_code": 500, "detail": f"处理失败: {str(e)}"}
+        # 内存存储中查询方拿到的是同一个对象：全部结果就绪后生成新的对象一次性替换，
+        # 不会查到已完成但缺少完成时间或卡片ID的任务
+        finished_at = time.time()
+        done = replace(job, status=SUCCEEDED if error is None else FAILED, result=result, card_id=card_id,
+                       error=error, finished_at=finished_at, expires_at=finished_at + self.ttl,
+                       claimed_by=None, lease_until=None)
+        try:
+            finished = self.store.finish(done, self.owner)
+        except Exception:
+            # 任务仍是执行中，租约过期后由其他执行者或定期恢复重新执行
+            logger.exception("保存异步任务 %s 的结果失败", job.id)
+            return
+        if not finished:
+            logger.warning("异步任务 %s 已由其他执行者接手，丢弃本次结果", job.id)
+
+    async def _sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(min(SWEEP_INTERVAL, self.ttl, self.lease))
+            purged = self.store.purge_expired(time.time())
+            if purged:
+                logger.info("清理了 %d 个过期的异步任务", purged)
+            # 其他工作进程崩溃后留下的任务由仍在运行的进程接手
+            requeued = self._enqueue_recovered()
+            if requeued:
+                logger.info("接手了 %d 个执行者已退出的异步任务", requeued)
+
+
+def create_job_queue(cfg: Settings = settings) -> JobQueue:
+    """按配置创建任务队列"""
+    if cfg.job_store == 'sqlite':
+        store = SqliteJobStore(cfg.job_sqlite_path)
+    elif cfg.job_store == 'memory':
+        store = MemoryJobStore()
+    else:
+        raise ValueError(f"未知的任务存储后端: {cfg.job_store}，可选值: memory, sqlite")
+    return JobQueue(store, workers=cfg.job_workers, max_queue=cfg.job_max_queue, ttl=cfg.job_ttl,
+                    lease=cfg.job_lease)
+
+
+# 全局任务队列
+job_queue = create_job_queue()
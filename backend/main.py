@@ -1,27 +1,113 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, validator
-import httpx
-from bs4 import BeautifulSoup
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
+from pydantic import validator
 import re
 from typing import Optional, Union, List
-import asyncio
-from prompts import PRESET_PROMPTS
+from contextlib import asynccontextmanager
+from prompts import PromptReference, PromptTemplate, prompt_fields, prompt_store, resolve_prompt, wants_split_response
+from content_encoding import CompressionMiddleware, EncodedBody, cached_json_response
+import rate_limit
+import cards
+from rate_limit import RateLimitMiddleware
+from config import settings
+from http_client import start_client, close_client
+from workers import extraction_pool
+from circuit_breaker import circuit_breakers
+import pipeline
+from pipeline import fetch_and_extract, extract_upload, read_upload, extract_uploaded_html, render_result, render_extracted, result_content
+from batch import BatchRequest, process_batch_items, iter_batch_events
+from streaming import negotiate_stream_format, iter_result_events, streaming_response
+from jobs import JobRequest, SUCCEEDED, FAILED, job_queue
+import metrics
+import time
 
-app = FastAPI(title="卡片制作工具 API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时创建共享HTTP客户端、提取执行池和异步任务队列，关闭时释放资源"""
+    await start_client()
+    extraction_pool.start()
+    await job_queue.start()
+    try:
+        yield
+    finally:
+        # 停止异步任务（执行到一半的任务在使用 sqlite 存储时下次启动会重新执行）
+        await job_queue.stop()
+        # 等待正在执行的提取任务完成后再退出
+        extraction_pool.shutdown(wait=True)
+        await close_client()
+        if pipeline.content_cache is not None:
+            pipeline.content_cache.close()
+        rate_limit.rate_limiter.store.close()
+        if cards.card_store is not None:
+            cards.card_store.close()
+
+app = FastAPI(title="卡片制作工具 API", lifespan=lifespan)
+
+# 按 Accept-Encoding 压缩响应；最先注册，位于最内层，压缩耗时计入 Server-Timing
+app.add_middleware(CompressionMiddleware)
+
+# 按客户端限流（rate_limit_enabled 开启时生效）；在统计指标的中间件之内，429/503 计入请求数
+app.add_middleware(RateLimitMiddleware)
 
-# 配置CORS
+# 上传请求中除文件本身外，multipart 边界和提示词等字段允许占用的额外字节数
+UPLOAD_OVERHEAD_BYTES = 1024 * 1024
+
+# 注意：该中间件必须在 CORS 之前注册，这样 413 响应也会带上 CORS 响应头
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """根据 Content-Length 提前拒绝过大的上传请求，避免先把整个请求体写入临时文件"""
+    if request.url.path == "/process_html_file":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and \
+                int(content_length) > settings.upload_max_bytes + UPLOAD_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"文件过大，最大支持 {settings.upload_max_bytes // (1024 * 1024)}MB"},
+            )
+    return await call_next(request)
+
+def _route_label(request: Request) -> str:
+    """请求对应的路由模板（如 /jobs/{job_id}），避免按实际路径产生过多的指标标签"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "other"
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """统计请求数、耗时和并发数，并通过 Server-Timing 响应头返回本次请求各阶段的耗时"""
+    route = _route_label(request)
+    metrics.IN_FLIGHT.inc(route=route)
+    token = metrics.begin_request_timings()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = metrics.end_request_timings(token)
+        metrics.IN_FLIGHT.dec(route=route)
+        metrics.REQUESTS.inc(route=route, method=request.method, status=str(status))
+        metrics.REQUEST_SECONDS.observe(elapsed, route=route)
+    response.headers["Server-Timing"] = metrics.server_timing_header(timings, elapsed)
+    return response
+
+# 配置CORS（Server-Timing 需要显式暴露，前端才能读取）
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # 在生产环境中应限制为前端域名
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-class ContentRequest(BaseModel):
+class ContentRequest(PromptReference):
     url: str
-    prompt: str
     
     @validator('url')
     def validate_url(cls, v):
@@ -31,141 +117,114 @@ class ContentRequest(BaseModel):
             raise ValueError('URL必须以http://或https://开头')
         return v
 
-class TextInputRequest(BaseModel):
+class TextInputRequest(PromptReference):
     text: str
-    prompt: str
 
-async def fetch_url_with_retry(url: str, max_retries: int = 3, timeout: int = 10):
-    """尝试获取URL内容，带重试机制，增加超时时间到10秒"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    }
-    for attempt in range(max_retries):
-        try:
-            async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                return response.text
-        except (httpx.HTTPError, httpx.TimeoutException) as e:
-            if attempt == max_retries - 1:
-                raise HTTPException(status_code=400, detail=f"获取URL内容失败: {str(e)}")
-            await asyncio.sleep(1)  # 重试前等待1秒
-
-def extract_main_content(html_content: str) -> str:
-    """增强版内容提取算法"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # 移除常见的广告和无关元素
-    for tag in soup.find_all(['script', 'style', 'iframe', 'nav', 'footer', 'ads', 'header']):
-        tag.decompose()
-    
-    # 提取正文内容 (使用更复杂的策略)
-    main_content = ""
-    
-    # 1. 首先尝试寻找最可能的内容容器
-    potential_containers = []
-    
-    # 尝试多种选择器寻找内容区域
-    selectors = [
-        'article', 'main', '.content', '.article', '.post', '#content', '#article', '#main',
-        '[class*="article"]', '[class*="content"]', '[class*="post"]', '.post-content', '.entry-content'
-    ]
-    
-    for selector in selectors:
-        try:
-            elements = soup.select(selector)
-            potential_containers.extend(elements)
-        except:
-            continue
-    
-    # 如果找到了潜在容器
-    if potential_containers:
-        # 选择内容最长的容器
-        main_container = max(potential_containers, key=lambda x: len(x.get_text(strip=True)))
-        # 提取段落
-        paragraphs = main_container.find_all(['p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li'])
+async def _card_response(request: Request, prompt: str, template: Optional[PromptTemplate], result: str,
+                         source_type: str, source: Optional[str] = None) -> dict:
+    """
+    返回 {"result": ...}；启用了卡片存储时保存结果，并附带可用于 GET /cards/{card_id} 的卡片ID
+
+    带 ?response=split 时不返回 result，改为返回正文 content，以及引用的预设提示词的 prompt_id 和 prompt_version，
+    客户端按 "[提示词] 请参考以下内容：正文" 拼接即可得到 result
+    """
+    if wants_split_response(request):
+        response = {**prompt_fields(template), "content": result_content(prompt, result)}
     else:
-        # 如果找不到明确的内容区域，就获取所有段落
-        paragraphs = soup.find_all(['p', 'div'])
-    
-    # 进一步过滤和提取内容
-    content_texts = []
-    for p in paragraphs:
-        text = p.get_text(strip=True)
-        if len(text) > 15 and '广告' not in text and not re.match(r'^[0-9.]*$', text):
-            content_texts.append(text)
-    
-    # 如果上面方法提取的内容太少，尝试使用更宽松的方法
-    if len('\n'.join(content_texts)) < 100:
-        # 移除所有空白文本
-        texts = [node.strip() for node in soup.stripped_strings]
-        # 过滤短句和特殊内容
-        content_texts = [t for t in texts if len(t) > 15 and not re.match(r'^[0-9.]*$', t)]
-    
-    return '\n'.join(content_texts)
+        response = {"result": result}
+    card_id = await cards.save_card(prompt, result, source_type, source)
+    if card_id is not None:
+        response["card_id"] = card_id
+    return response
+
+def _stream_prompt_ref(request: Request, template: Optional[PromptTemplate]) -> Optional[dict]:
+    """流式响应的 prompt 事件：split 模式下引用了预设提示词时只发送ID和版本"""
+    return prompt_fields(template) if wants_split_response(request) else None
 
 @app.post("/process_content")
-async def process_content(data: ContentRequest):
+async def process_content(data: ContentRequest, request: Request):
     """
     主要处理流程:
     1. 验证URL有效性
     2. 智能内容提取
     3. 拼接模板
+
+    提示词可以用 prompt 直接提供全文，或者用 prompt_id（和 prompt_version）引用预设提示词；
+    带 ?response=split 时正文和提示词分开返回，见 _card_response()。
+    带 ?stream=ndjson 或 ?stream=sse 时以流式返回，见 streaming.py
     """
     try:
-        # 获取URL内容
-        html_content = await fetch_url_with_retry(data.url)
-        
-        # 提取主要内容
-        main_content = extract_main_content(html_content)
-        
-        if not main_content or len(main_content.strip()) < 30:
-            return {"result": f"[{data.prompt}] 请参考以下内容：无法从该URL提取有效内容"}
+        prompt, template = data.resolve()
+        stream_format = negotiate_stream_format(request)
+        if stream_format is not None:
+            return streaming_response(
+                stream_format, iter_result_events(stream_format, prompt, fetch_and_extract(data.url), "URL",
+                                                  _stream_prompt_ref(request, template), ("url", data.url)))
+
+        # 获取URL内容并提取主要内容（优先使用缓存）
+        main_content = await fetch_and_extract(data.url)
         
-        # 拼接结果
-        result = f"[{data.prompt}] 请参考以下内容：{main_content}"
+        # 拼接结果（内容过短时提示无法提取）
+        result = render_extracted(prompt, main_content, "URL")
         
-        return {"result": result}
+        return await _card_response(request, prompt, template, result, "url", data.url)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理失败: {str(e)}")
 
 @app.post("/process_html_file")
 async def process_html_file(
+    request: Request,
     file: UploadFile = File(...),
-    prompt: str = Form(...)
+    prompt: Optional[str] = Form(None),
+    prompt_id: Optional[str] = Form(None),
+    prompt_version: Optional[str] = Form(None)
 ):
     """
     处理上传的HTML文件:
     1. 解析HTML文件内容
     2. 提取主要内容
     3. 拼接模板
+
+    提示词与 /process_content 相同，可以用 prompt 或 prompt_id（和 prompt_version）表单字段提供；
+    带 ?response=split 时正文和提示词分开返回。
+    带 ?stream=ndjson 或 ?stream=sse 时以流式返回，见 streaming.py
     """
     try:
         # 验证文件类型
         if not file.filename.endswith(('.html', '.htm')):
             raise HTTPException(status_code=400, detail="只支持HTML格式文件")
+        prompt, template = resolve_prompt(prompt, prompt_id, prompt_version)
         
-        # 读取文件内容
-        html_content = await file.read()
-        html_text = html_content.decode('utf-8', errors='ignore')
-        
-        # 提取主要内容
-        main_content = extract_main_content(html_text)
-        
-        if not main_content or len(main_content.strip()) < 30:
-            return {"result": f"[{prompt}] 请参考以下内容：无法从该HTML文件提取有效内容"}
+        stream_format = negotiate_stream_format(request)
+        if stream_format is not None:
+            # 先在响应开始前读完文件（大小超限等错误仍按普通状态码返回），提取在响应过程中进行
+            upload = await read_upload(file)
+            return streaming_response(
+                stream_format, iter_result_events(stream_format, prompt, extract_uploaded_html(*upload), "HTML文件",
+                                                  _stream_prompt_ref(request, template), ("html", file.filename)))
+
+        # 按块读取文件并提取主要内容（相同内容的文件直接使用缓存结果）
+        main_content = await extract_upload(file)
         
-        # 拼接结果
-        result = f"[{prompt}] 请参考以下内容：{main_content}"
+        # 拼接结果（内容过短时提示无法提取）
+        result = render_extracted(prompt, main_content, "HTML文件")
         
-        return {"result": result}
+        return await _card_response(request, prompt, template, result, "html", file.filename)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理HTML文件失败: {str(e)}")
 
+async def _completed(text: str) -> str:
+    """把已有的文本包装成协程，供流式响应统一处理"""
+    return text
+
 @app.post("/process_text_input")
-async def process_text_input(data: TextInputRequest):
+async def process_text_input(data: TextInputRequest, request: Request):
     """
     处理用户直接输入的文本:
     1. 验证文本内容
@@ -173,38 +232,303 @@ async def process_text_input(data: TextInputRequest):
     
     参数:
     - text: 用户输入的文本内容
-    - prompt: 提示词
+    - prompt: 提示词全文，或者用 prompt_id（和 prompt_version）引用预设提示词
     
     返回:
-    - 拼接后的结果
+    - 拼接后的结果，以及保存的卡片ID card_id（带 ?stream=ndjson 或 ?stream=sse 时以流式返回，card_id 在 done 事件中；
+      带 ?response=split 时正文和提示词分开返回）
     """
     try:
         # 验证文本内容
         if not data.text or len(data.text.strip()) < 5:
             raise HTTPException(status_code=400, detail="请输入有效的文本内容，至少5个字符")
+        prompt, template = data.resolve()
         
+        stream_format = negotiate_stream_format(request)
+        if stream_format is not None:
+            return streaming_response(
+                stream_format, iter_result_events(stream_format, prompt, _completed(data.text),
+                                                  prompt_ref=_stream_prompt_ref(request, template),
+                                                  card_source=("text", None)))
+
         # 拼接结果
-        result = f"[{data.prompt}] 请参考以下内容：{data.text}"
+        result = render_result(prompt, data.text)
         
-        return {"result": result}
+        return await _card_response(request, prompt, template, result, "text")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理文本失败: {str(e)}")
 
+@app.post("/process_batch")
+async def process_batch(data: BatchRequest, request: Request):
+    """
+    批量处理多个URL、HTML内容或文本:
+    1. 并发抓取和提取（同时处理的条目数和同一域名的并发下载数都有上限）
+    2. 每个条目分别拼接提示词
+    3. 单个条目失败不影响其它条目，错误信息按条目返回
+    
+    参数:
+    - items: 条目列表，每个条目为 {"url": ...}、{"html": ...} 或 {"text": ...} 之一
+    - prompt: 提示词全文，或者用 prompt_id（和 prompt_version）引用预设提示词
+    
+    返回:
+    - results: 与 items 顺序一致的结果列表，每项包含 index、ok，以及 result（和卡片ID card_id）或 error
+    - succeeded / failed: 成功和失败的条目数
+    - 带 ?response=split 时各条目返回正文 content 而不是 result，引用的预设提示词的 prompt_id、prompt_version 只返回一次
+
+    带 ?stream=ndjson 或 ?stream=sse 时，每个条目完成后立即发出一个 item 事件，
+    最后发出包含 succeeded / failed（split 模式下还有 prompt_id、prompt_version）的 done 事件
+    """
+    prompt, template = data.resolve()
+    split = wants_split_response(request)
+    fields = prompt_fields(template) if split else {}
+    stream_format = negotiate_stream_format(request)
+    if stream_format is not None:
+        return streaming_response(stream_format, iter_batch_events(stream_format, data.items, prompt, split, fields))
+    results = await process_batch_items(data.items, prompt, split)
+    succeeded = sum(1 for item in results if item["ok"])
+    return {**fields, "results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(data: JobRequest):
+    """
+    提交异步任务，立即返回任务ID，适合抓取较慢、同步接口容易超时的网站
+
+    参数:
+    - url / html / text: 三者之一，含义与 /process_batch 的条目相同
+    - prompt: 提示词全文，或者用 prompt_id（和 prompt_version）引用预设提示词
+
+    返回:
+    - job_id、status，以及查询状态和获取结果的地址；任务队列已满时返回 503
+    """
+    job = job_queue.submit(data)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result",
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    查询异步任务状态
+
+    返回:
+    - status: queued / running / succeeded / failed，以及各阶段的时间；失败时包含 error
+    - 任务不存在或已过期时返回 404
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return job.describe()
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, request: Request):
+    """
+    获取异步任务的结果
+
+    返回:
+    - 已完成: {"result": ...}，与同步接口相同（启用了卡片存储时附带 card_id）；结果不再变化，带 ETag，重新验证时返回 304；
+      带 ?response=split 时返回正文 content，以及提交时引用的预设提示词的 prompt_id、prompt_version
+    - 未完成: 202 和当前状态，带 Retry-After
+    - 失败: 与同步接口相同的错误状态码和错误信息
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    if job.status == SUCCEEDED:
+        card = {"card_id": job.card_id} if job.card_id is not None else {}
+        if wants_split_response(request):
+            fields = {name: job.payload[name] for name in ("prompt_id", "prompt_version") if name in job.payload}
+            return cached_json_response(request, EncodedBody(
+                {**fields, "content": result_content(job.payload["prompt"], job.result), **card}))
+        return cached_json_response(request, EncodedBody({"result": job.result, **card}))
+    if job.status == FAILED:
+        raise HTTPException(status_code=job.error["status_code"], detail=job.error["detail"])
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status},
+                        headers={"Retry-After": "2"})
+
+@app.get("/job_stats")
+async def get_job_stats():
+    """
+    获取异步任务队列的统计信息
+
+    返回:
+    - 执行协程数、排队上限、结果保留时间、当前排队数，以及各状态的任务数
+    """
+    return job_queue.stats()
+
+@app.get("/prompts")
+async def list_prompts(request: Request):
+    """
+    获取预设提示词列表（不含全文）
+
+    返回:
+    - 每个提示词的ID、标题、大小（字节）和内容哈希
+    - 带 ETag，内容未变时返回 304
+    """
+    return cached_json_response(request, prompt_store.listing())
+
+@app.get("/prompts/{prompt_id}")
+async def get_prompt(prompt_id: str, request: Request):
+    """
+    按ID获取单个预设提示词的全文
+
+    返回:
+    - ID、标题、大小、哈希和提示词全文
+    - 带 ETag，内容未变时返回 304
+    """
+    template = prompt_store.get(prompt_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail="提示词不存在")
+    return cached_json_response(request, template.encoded)
+
 @app.get("/preset_prompts")
-async def get_preset_prompts():
+async def get_preset_prompts(request: Request):
     """
-    获取预设提示词列表
+    获取全部预设提示词的全文（旧接口，新代码请使用 /prompts 和 /prompts/{id}）
     
     返回:
     - 预设提示词数组
     """
-    return {"prompts": PRESET_PROMPTS}
+    return cached_json_response(request, prompt_store.preset())
+
+@app.get("/cards")
+async def list_cards(limit: int = 20, cursor: Optional[int] = None):
+    """
+    按生成时间倒序列出保存的卡片（不含全文）
+
+    参数:
+    - limit: 每页数量（最多 100）
+    - cursor: 上一页返回的 next_cursor，不传时从最新的卡片开始
+
+    返回:
+    - cards: 每张卡片的ID、生成时间、来源、结果长度，以及提示词和正文开头的预览
+    - next_cursor: 下一页的游标，没有更多卡片时为 null
+    """
+    if cards.card_store is None:
+        raise HTTPException(status_code=404, detail="未启用卡片存储")
+    items, next_cursor = cards.card_store.list(limit, cursor)
+    return {"cards": items, "next_cursor": next_cursor}
+
+@app.get("/cards/{card_id}")
+async def get_card(card_id: str, request: Request):
+    """
+    按卡片ID获取之前生成的结果，result 与生成时接口返回的完全相同
+
+    卡片内容不会变化，带 ETag，重新验证时返回 304
+    """
+    card = cards.card_store.get(card_id) if cards.card_store is not None else None
+    if card is None:
+        raise HTTPException(status_code=404, detail="卡片不存在")
+    return cached_json_response(request, EncodedBody(card.describe()))
+
+@app.delete("/cards/{card_id}")
+async def delete_card(card_id: str):
+    """删除卡片；卡片不存在时返回 404"""
+    if cards.card_store is None or not cards.card_store.delete(card_id):
+        raise HTTPException(status_code=404, detail="卡片不存在")
+    return {"deleted": card_id}
+
+@app.get("/card_stats")
+async def get_card_stats():
+    """
+    获取卡片存储的统计信息
+
+    返回:
+    - 卡片数、去重后的提示词和正文数、原始字节数、压缩后字节数和数据库文件大小；未启用时 enabled 为 false
+    """
+    if cards.card_store is None:
+        return {"enabled": False}
+    return cards.card_store.stats()
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    """
+    获取URL内容缓存的统计信息
+
+    返回:
+    - 条目数、占用字节数、命中/未命中/重新验证/淘汰次数等；未启用缓存时 enabled 为 false
+    - singleflight: 正在进行的抓取数、实际执行次数、被合并的并发请求数
+    - upload: 上传文件内容哈希缓存的统计；未启用时 enabled 为 false
+    """
+    singleflight = pipeline.url_flights.stats()
+    upload = {"enabled": False} if pipeline.upload_cache is None else {"enabled": True, **pipeline.upload_cache.stats()}
+    if pipeline.content_cache is None:
+        return {"enabled": False, "singleflight": singleflight, "upload": upload}
+    return {"enabled": True, **pipeline.content_cache.stats(), "singleflight": singleflight, "upload": upload}
+
+@app.get("/circuit_breakers")
+async def get_circuit_breakers():
+    """
+    获取抓取网页时各域名的熔断状态
+
+    返回:
+    - threshold / recovery_timeout: 熔断阈值和持续时间
+    - hosts: 最近请求失败的域名及其状态（closed / open / half_open）、连续失败次数、
+      熔断期间被直接拒绝的请求数、最后一次错误，熔断中的域名还包括 retry_after
+    """
+    return {
+        "threshold": circuit_breakers.failure_threshold,
+        "recovery_timeout": circuit_breakers.recovery_timeout,
+        "hosts": circuit_breakers.snapshot(),
+    }
+
+def _collect_runtime_metrics():
+    """把缓存、执行池、任务队列、熔断器已有的统计转换为监控指标"""
+    cache_hits = metrics.Counter("make_card_cache_hits_total", "缓存命中次数", ("cache",))
+    cache_misses = metrics.Counter("make_card_cache_misses_total", "缓存未命中次数", ("cache",))
+    cache_bytes = metrics.Gauge("make_card_cache_bytes", "缓存占用的字节数", ("cache",))
+    for name, cache in (("url", pipeline.content_cache), ("upload", pipeline.upload_cache)):
+        if cache is not None:
+            cache_hits.inc(cache.hits, cache=name)
+            cache_misses.inc(cache.misses, cache=name)
+            cache_bytes.set(cache.backend.total_bytes, cache=name)
+    yield from (cache_hits, cache_misses, cache_bytes)
+
+    flights = pipeline.url_flights.stats()
+    inflight = metrics.Gauge("make_card_fetch_in_flight", "正在进行的URL抓取数（合并后）")
+    inflight.set(flights["inflight"])
+    coalesced = metrics.Counter("make_card_fetch_coalesced_total", "被合并到已有抓取中的并发请求数")
+    coalesced.inc(flights["coalesced"])
+    yield from (inflight, coalesced)
+
+    pool = metrics.Gauge("make_card_extract_pool_pending", "提取执行池中正在执行和排队的任务数")
+    pool.set(extraction_pool.pending)
+    job_counts = metrics.Gauge("make_card_jobs", "各状态的异步任务数", ("status",))
+    for status, count in job_queue.store.counts().items():
+        job_counts.set(count, status=status)
+    open_hosts = metrics.Gauge("make_card_circuit_open_hosts", "处于熔断状态的域名数")
+    open_hosts.set(sum(1 for host in circuit_breakers.snapshot().values() if host["state"] == "open"))
+    yield from (pool, job_counts, open_hosts)
+
+    limiter = rate_limit.rate_limiter.stats()
+    limited_clients = metrics.Gauge("make_card_rate_limit_active_clients", "有正在进行的抓取或正文提取请求的客户端数")
+    limited_clients.set(limiter["active_clients"])
+    limited_requests = metrics.Gauge("make_card_rate_limit_active_requests", "计入并发限制的正在进行的请求数")
+    limited_requests.set(limiter["active_heavy_requests"])
+    yield from (limited_clients, limited_requests)
+
+metrics.REGISTRY.register_collector(_collect_runtime_metrics)
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus 格式的监控指标
+
+    包括各接口的请求数、耗时和并发数，抓取和正文提取各阶段的耗时直方图，
+    下载字节数、HTML和正文大小、重试次数、缓存命中等
+    """
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/")
 def read_root():
     return {"message": "卡片制作工具API服务正常运行"}
 
 if __name__ == "__main__":
+    # 单进程运行；多工作进程的生产模式见 start.py --production
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host=settings.server_host, port=settings.server_port)
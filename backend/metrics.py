@@ -0,0 +1,275 @@
+"""
+监控指标模块
+
+提供 /metrics 接口使用的 Prometheus 文本格式指标，以及 Server-Timing 响应头使用的
+单个请求各阶段耗时。为了不引入额外依赖，这里实现了 Counter / Gauge / Histogram
+三种最基本的指标类型，输出格式与 prometheus_client 一致。
+
+各阶段耗时通过 observe_stage() 记录，同时写入：
+- make_card_stage_duration_seconds 直方图（按 stage 标签区分）
+- 当前请求的 Server-Timing 耗时表（由 main.py 中的中间件为每个请求创建）
+
+阶段名称：
+- fetch_connect:  建立TCP连接（含DNS解析，httpx 无法单独区分）
+- fetch_tls:      TLS握手
+- fetch_wait:     发出请求到收到响应头（服务器处理时间）
+- fetch_download: 读取响应体
+- fetch_backoff:  重试前的退避等待
+- extract_wait:   在提取执行池中排队、以及进程池传输数据的时间
+- extract_parse / extract_cleanup / extract_container / extract_paragraphs:
+                  HTML解析、移除无关元素、选择内容容器、切分和过滤段落
+                  （增量提取引擎边解析边打分，只记录 extract_parse 和 extract_paragraphs）
+- compress:       压缩响应体（见 content_encoding.py）
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 大小直方图的分桶（字节或字符数）
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, LabelValues, Sequence[str], float]]:
+        """返回 (样本名, 标签值, 标签名, 数值)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for sample_name, values, names, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield self.name, values, self.labelnames, value
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield self.name, values, self.labelnames, value
+
+
+class Histogram(_Metric):
+    """分桶直方图，输出 _bucket / _sum / _count 样本"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数（不累计）..., +Inf 分桶计数, 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(values, list(state)) for values, state in self._values.items()]
+        names = self.labelnames + ("le",)
+        for values, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", values + (_format_value(bound),), names, cumulative
+            yield f"{self.name}_sum", values, self.labelnames, state[-1]
+            yield f"{self.name}_count", values, self.labelnames, cumulative
+
+
+class Registry:
+    """
+    指标注册表
+
+    除了直接注册的指标，还可以注册 collector：在每次输出时调用，
+    返回当时的指标列表，用于把缓存统计等已有的计数转换为指标。
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Prometheus 文本格式的 Content-Type（Starlette 会自动加上 charset=utf-8）
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# ---- 请求 ----
+REQUESTS = REGISTRY.register(Counter(
+    "make_card_http_requests_total", "处理的HTTP请求数", ("route", "method", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "make_card_http_request_duration_seconds", "HTTP请求处理耗时（流式响应只统计到响应头发出）", ("route",)))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "make_card_http_requests_in_flight", "正在处理的HTTP请求数", ("route",)))
+
+# ---- 各阶段耗时 ----
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "make_card_stage_duration_seconds", "抓取和正文提取各阶段的耗时", ("stage",)))
+
+# ---- 抓取 ----
+FETCH_BYTES = REGISTRY.register(Counter(
+    "make_card_fetch_downloaded_bytes_total", "抓取网页时从网络读取的字节数（压缩传输时为解压前）"))
+FETCH_RETRIES = REGISTRY.register(Counter(
+    "make_card_fetch_retries_total", "抓取失败后的重试次数", ("reason",)))
+FETCH_RESULTS = REGISTRY.register(Counter(
+    "make_card_fetch_results_total", "抓取结果（ok / not_modified / rejected / failed / circuit_open）", ("result",)))
+
+# ---- 限流 ----
+RATE_LIMITED = REGISTRY.register(Counter(
+    "make_card_rate_limited_total", "被限流拒绝的请求数（reason: rate / concurrency / global）", ("bucket", "reason")))
+
+# ---- 内容大小 ----
+HTML_CHARS = REGISTRY.register(Histogram(
+    "make_card_html_size_chars", "送入正文提取的HTML字符数", buckets=SIZE_BUCKETS))
+EXTRACTED_CHARS = REGISTRY.register(Histogram(
+    "make_card_extracted_size_chars", "提取出的正文字符数", buckets=SIZE_BUCKETS))
+
+
+# ---- Server-Timing ----
+
+# 当前请求的各阶段耗时（秒），由中间件在请求开始时设置；不在请求中时为 None
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def begin_request_timings():
+    """为当前请求创建耗时表，返回用于 end_request_timings() 的令牌"""
+    return _request_timings.set({})
+
+
+def end_request_timings(token) -> Dict[str, float]:
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    return timings
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """记录一个阶段的耗时：写入直方图，并累加到当前请求的 Server-Timing 中"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def observe_stages(stages: Dict[str, float]) -> None:
+    for stage, seconds in stages.items():
+        observe_stage(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def server_timing_header(timings: Dict[str, float], total: Optional[float] = None) -> str:
+    """生成 Server-Timing 响应头，耗时单位为毫秒"""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -0,0 +1,102 @@
+"""
+HTML解析器后端模块
+
+正文提取基于 BeautifulSoup 的文档树完成，但底层的HTML解析器可以替换。
+Python 自带的 html.parser 是纯 Python 实现，处理几兆的大页面时会占用大部分CPU，
+因此这里支持通过配置切换到更快的 C 语言实现：
+
+- html.parser:   标准库自带，无需额外安装（默认）
+- lxml:          基于 libxml2，速度快，pip install lxml
+- html5-parser:  基于 gumbo 的 HTML5 解析器，直接生成 BeautifulSoup 文档树，
+                 pip install html5-parser（需要与 lxml 使用相同版本的 libxml2）
+
+如果配置的解析器所需的库没有安装，会记录一条警告并自动回退到 html.parser。
+
+注意：对于格式不规范的HTML（例如未闭合的 <p> 标签），不同解析器生成的
+文档树可能不同，提取结果也会随之略有差异；格式规范的页面结果一致，
+可用 benchmarks/bench_parsers.py 在样本页面上验证。
+"""
+
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "html.parser"
+
+
+def _parse_with_html_parser(html_content: str) -> BeautifulSoup:
+    return BeautifulSoup(html_content, 'html.parser')
+
+
+def _parse_with_lxml(html_content: str) -> BeautifulSoup:
+    return BeautifulSoup(html_content, 'lxml')
+
+
+def _parse_with_html5_parser(html_content: str) -> BeautifulSoup:
+    from html5_parser import parse
+    return parse(html_content, treebuilder='soup')
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _html5_parser_available() -> bool:
+    try:
+        import html5_parser  # noqa: F401
+    except (ImportError, RuntimeError):
+        # html5-parser 与 lxml 的 libxml2 版本不一致时，导入会抛出 RuntimeError
+        return False
+    return True
+
+
+# 解析器名称 -> (解析函数, 可用性检查函数)
+PARSER_BACKENDS: Dict[str, tuple] = {
+    "html.parser": (_parse_with_html_parser, lambda: True),
+    "lxml": (_parse_with_lxml, _lxml_available),
+    "html5-parser": (_parse_with_html5_parser, _html5_parser_available),
+}
+
+
+def available_backends() -> List[str]:
+    """返回当前环境中可用的解析器名称"""
+    return [name for name, (_, is_available) in PARSER_BACKENDS.items() if is_available()]
+
+
+@lru_cache(maxsize=None)
+def resolve_backend(name: Optional[str] = None) -> str:
+    """
+    确定实际使用的解析器名称
+
+    未知名称或缺少依赖时回退到 html.parser，并只记录一次警告。
+    """
+    name = name or settings.html_parser
+    if name not in PARSER_BACKENDS:
+        logger.warning("未知的HTML解析器 %r，使用 %s", name, DEFAULT_BACKEND)
+        return DEFAULT_BACKEND
+    _, is_available = PARSER_BACKENDS[name]
+    if not is_available():
+        logger.warning("HTML解析器 %s 所需的库未安装或不可用，回退到 %s", name, DEFAULT_BACKEND)
+        return DEFAULT_BACKEND
+    return name
+
+
+def get_parser(name: Optional[str] = None) -> Callable[[str], BeautifulSoup]:
+    """获取解析函数"""
+    parse, _ = PARSER_BACKENDS[resolve_backend(name)]
+    return parse
+
+
+def parse_html(html_content: str, backend: Optional[str] = None) -> BeautifulSoup:
+    """使用配置的解析器把HTML解析为 BeautifulSoup 文档树"""
+    return get_parser(backend)(html_content)
@@ -0,0 +1,137 @@
+"""
+内容处理流水线模块
+
+把“抓取网页 -> 提取正文”这一流程串起来，供各个接口复用：
+- 正文提取在执行池中运行（见 workers.py），执行池已满时返回 503
+- URL 的提取结果会写入内容缓存（见 cache.py），过期后通过条件请求重新验证
+- 同一URL的并发请求会合并为一次抓取和提取（见 singleflight.py）
+- 上传的HTML文件按内容哈希缓存提取结果，重复上传时无需再次解析
+"""
+
+import time
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from cache import CacheEntry, ContentCache, create_cache, create_upload_cache, normalize_url
+from config import settings
+from extractor import extract_main_content_timed
+from fetcher import fetch_page
+import metrics
+from singleflight import SingleFlight
+from uploads import decode_upload, hash_upload
+from workers import PoolSaturatedError, extraction_pool
+
+# 全局内容缓存，cache_backend 配置为 none 时为 None
+content_cache: Optional[ContentCache] = create_cache()
+
+# 上传文件的内容哈希缓存，upload_cache_max_bytes 配置为 0 时为 None
+upload_cache: Optional[ContentCache] = create_upload_cache()
+
+# 合并同一URL的并发抓取
+url_flights = SingleFlight()
+
+# 提取出的正文少于该字符数时，视为没有提取到有效内容
+MIN_CONTENT_LENGTH = 30
+
+
+def render_result(prompt: str, content: str) -> str:
+    """把提示词和内容拼接为最终结果"""
+    return f"[{prompt}] 请参考以下内容：{content}"
+
+
+def result_content(prompt: str, result: str) -> str:
+    """render_result() 的结果中提示词之后的正文部分"""
+    return result[len(render_result(prompt, "")):]
+
+
+def render_extracted(prompt: str, main_content: str, source_label: str) -> str:
+    """拼接提取结果；正文过短时返回“无法从该{source_label}提取有效内容”"""
+    if not main_content or len(main_content.strip()) < MIN_CONTENT_LENGTH:
+        return render_result(prompt, f"无法从该{source_label}提取有效内容")
+    return render_result(prompt, main_content)
+
+
+async def extract_content_async(html_content: str, url: Optional[str] = None) -> str:
+    """
+    在提取执行池中运行正文提取，避免阻塞事件循环；执行池已满时返回503
+
+    url 为页面地址时按该站点的过滤规则提取（见 boilerplate.py）。
+
+    各阶段耗时和内容大小记录到监控指标中，总耗时中除提取各阶段以外的部分
+    （排队、进程间传输）记为 extract_wait。
+    """
+    start = time.perf_counter()
+    try:
+        main_content, timings = await extraction_pool.run(extract_main_content_timed, html_content, None, None, url)
+    except PoolSaturatedError:
+        raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试", headers={"Retry-After": "1"})
+    timings['extract_wait'] = max(0.0, time.perf_counter() - start - sum(timings.values()))
+    metrics.observe_stages(timings)
+    metrics.HTML_CHARS.observe(len(html_content))
+    metrics.EXTRACTED_CHARS.observe(len(main_content))
+    return main_content
+
+
+async def fetch_and_extract(url: str) -> str:
+    """
+    获取URL对应网页的正文内容
+
+    1. 缓存未过期：直接返回
+    2. 同一URL已有抓取在进行中：等待它的结果，不重复抓取
+    3. 缓存已过期但有 ETag/Last-Modified：发起条件请求，源站返回 304 时沿用缓存
+    4. 其它情况：下载网页、提取正文并写入缓存
+    """
+    entry = content_cache.lookup(url) if content_cache is not None else None
+    if entry is not None and not entry.is_expired():
+        return entry.content
+    return await url_flights.do(normalize_url(url), lambda: _fetch_and_extract(url, entry))
+
+
+async def _fetch_and_extract(url: str, entry: Optional[CacheEntry]) -> str:
+    cache = content_cache
+    headers = entry.conditional_headers() if entry is not None else None
+    page = await fetch_page(url, headers=headers)
+    if page.not_modified and entry is not None:
+        cache.revalidated(url, entry)
+        return entry.content
+
+    main_content = await extract_content_async(page.text, url)
+    if cache is not None:
+        cache.store(url, main_content, etag=page.etag, last_modified=page.last_modified)
+    return main_content
+
+
+async def extract_upload(file: UploadFile) -> str:
+    """
+    提取上传的HTML文件的正文内容
+
+    文件按块读取：先计算内容哈希（超过 upload_max_bytes 时返回 413），
+    同一文件重复上传时直接返回缓存结果，不再解码和解析；
+    未命中时再按块增量解码，编码从 BOM 或 <meta charset> 中识别。
+    """
+    return await extract_uploaded_html(*await read_upload(file))
+
+
+async def read_upload(file: UploadFile) -> Tuple[str, Optional[str], str]:
+    """
+    读取上传文件，返回 (内容哈希, 缓存的提取结果, 解码后的HTML)
+
+    命中缓存时不解码文件，HTML 为空字符串。流式接口先调用它读完文件，
+    再在响应过程中调用 extract_uploaded_html() 完成耗时的提取。
+    """
+    key, _ = await hash_upload(file, settings.upload_max_bytes)
+    entry = upload_cache.lookup(key) if upload_cache is not None else None
+    if entry is not None and not entry.is_expired():
+        return key, entry.content, ''
+    return key, None, await decode_upload(file)
+
+
+async def extract_uploaded_html(key: str, cached: Optional[str], html_text: str) -> str:
+    """提取已读取的上传文件的正文并按内容哈希写入缓存；参数为 read_upload() 的返回值"""
+    if cached is not None:
+        return cached
+    main_content = await extract_content_async(html_text)
+    if upload_cache is not None:
+        upload_cache.store(key, main_content)
+    return main_content
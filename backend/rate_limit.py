@@ -0,0 +1,313 @@
+"""
+限流模块
+
+/process_content 等接口会触发网页抓取（每次最多重试几次）和CPU密集的正文提取，
+单个客户端发送大量请求就可能占满出站带宽和提取执行池。限流按客户端进行：
+
+- 客户端标识：请求带 rate_limit_api_keys 中配置的 X-API-Key 时按 API Key（只保存其哈希），否则按客户端IP
+  （rate_limit_trust_forwarded 开启时取 X-Forwarded-For 中从右数第 rate_limit_trusted_hops 个地址，即最外层的可信代理
+  看到的对端地址，仅在可信的反向代理后使用；左边的地址由客户端发送，每次伪造一个新地址也不能绕过限流）；
+  未配置的 API Key 按IP计数，客户端不能靠每次换一个随机 Key 绕过限流
+- 令牌桶：重量级接口（抓取、提取）和其他轻量接口分别使用独立的令牌桶，
+  每个客户端每秒补充 rate 个令牌，最多积累 burst 个；令牌不足时返回 429 和 Retry-After
+- 并发数：每个客户端同时进行的重量级请求数超过 rate_limit_client_concurrency 时返回 429；
+  所有客户端同时进行的重量级请求数达到 rate_limit_global_concurrency 时排队等待，
+  超过 rate_limit_global_wait 秒仍未轮到则返回 503
+
+令牌桶的状态保存在可替换的存储后端中，均无需 Redis 等外部服务：
+- MemoryRateLimitStore: 进程内存，每个工作进程单独计数
+- SqliteRateLimitStore: 本地 sqlite 文件，同一台机器上的多个工作进程共享计数
+并发数限制总是按工作进程单独计算。
+
+批量接口按一次请求计数，条目之间的并发由 batch_concurrency 限制。
+"""
+
+import asyncio
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+import metrics
+from config import Settings, settings
+
+HEAVY = "heavy"
+LIGHT = "light"
+
+# 会触发抓取或正文提取的接口
+HEAVY_ROUTES = frozenset({
+    ("POST", "/process_content"),
+    ("POST", "/process_html_file"),
+    ("POST", "/process_batch"),
+    ("POST", "/jobs"),
+})
+# 不限流的接口（健康检查和监控）
+EXEMPT_PATHS = frozenset({"/", "/metrics"})
+
+
+class RateLimitStore:
+    """令牌桶存储后端接口"""
+
+    def take(self, key: str, rate: float, burst: int, now: float, cost: float = 1.0) -> float:
+        """尝试从 key 的令牌桶中取出 cost 个令牌；成功返回 0，令牌不足时返回需要等待的秒数"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+def _refill(tokens: float, updated: float, rate: float, burst: int, now: float) -> float:
+    return min(float(burst), tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    进程内存后端
+
+    最多记录 max_keys 个客户端，超出时丢弃最久未访问的客户端（相当于把它的令牌桶重新装满）。
+    只在事件循环线程中访问，无需加锁。
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        # key -> (令牌数, 更新时间)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, rate: float, burst: int, now: float, cost: float = 1.0) -> float:
+        state = self._buckets.pop(key, None)
+        tokens = float(burst) if state is None else _refill(state[0], state[1], rate, burst, now)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class SqliteRateLimitStore(RateLimitStore):
+    """本地 sqlite 文件后端：多个工作进程共用同一个文件时共享令牌桶"""
+
+    # 每执行这么多次 take() 清理一次已经装满（长时间未访问）的令牌桶
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " full_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_full ON rate_limit_buckets (full_at)")
+        self._takes = 0
+
+    def take(self, key: str, rate: float, burst: int, now: float, cost: float = 1.0) -> float:
+        with self._lock:
+            # BEGIN IMMEDIATE 先取得写锁，保证多个进程的“读取-计算-写回”不会交错
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = float(burst) if row is None else _refill(row[0], row[1], rate, burst, now)
+                wait = 0.0
+                if tokens >= cost:
+                    tokens -= cost
+                else:
+                    wait = (cost - tokens) / rate
+                full_at = now + (burst - tokens) / rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, full_at),
+                )
+                self._takes += 1
+                if self._takes % self.PURGE_EVERY == 0:
+                    self._conn.execute("DELETE FROM rate_limit_buckets WHERE full_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimitExceeded(Exception):
+    """请求被限流；status_code 为 429（客户端超限）或 503（服务整体繁忙）"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def to_response(self) -> JSONResponse:
+        return JSONResponse(status_code=self.status_code, content={"detail": self.detail},
+                            headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))})
+
+
+def _hash_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def parse_api_keys(value: str) -> frozenset:
+    """
+    解析配置项 rate_limit_api_keys，返回已知 API Key 的 SHA-256 集合
+
+    逗号分隔，每项可以是 Key 原文，也可以是 ``sha256:`` 加上 Key 的十六进制 SHA-256（配置中不保存原文）。
+    """
+    digests = set()
+    for item in value.split(","):
+        item = item.strip()
+        if item.startswith("sha256:"):
+            digests.add(item[len("sha256:"):].lower())
+        elif item:
+            digests.add(_hash_key(item))
+    return frozenset(digests)
+
+
+class RateLimiter:
+    """按客户端的令牌桶和并发数限制"""
+
+    def __init__(self, cfg: Settings, store: RateLimitStore, clock: Callable[[], float] = time.time):
+        self.enabled = cfg.rate_limit_enabled
+        self.limits = {
+            HEAVY: (cfg.rate_limit_heavy_rate, cfg.rate_limit_heavy_burst),
+            LIGHT: (cfg.rate_limit_light_rate, cfg.rate_limit_light_burst),
+        }
+        self.client_concurrency = cfg.rate_limit_client_concurrency
+        self.global_concurrency = cfg.rate_limit_global_concurrency
+        self.global_wait = cfg.rate_limit_global_wait
+        self.trust_forwarded = cfg.rate_limit_trust_forwarded
+        self.trusted_hops = max(1, cfg.rate_limit_trusted_hops)
+        self.api_keys = parse_api_keys(cfg.rate_limit_api_keys)
+        self.store = store
+        self._clock = clock
+        self._global = asyncio.Semaphore(self.global_concurrency) if self.global_concurrency > 0 else None
+        # 客户端 -> 正在进行的重量级请求数
+        self._active: Dict[str, int] = {}
+
+    def client_key(self, headers: Headers, client: Optional[Tuple[str, int]]) -> str:
+        api_key = headers.get("x-api-key")
+        if api_key and self.api_keys:
+            digest = _hash_key(api_key)
+            if digest in self.api_keys:
+                return "key:" + digest[:32]
+        if self.trust_forwarded:
+            # 每层代理把对端地址追加在末尾，只有最右边的 trusted_hops 个地址是可信代理写入的
+            forwarded = [address.strip() for value in headers.getlist("x-forwarded-for")
+                         for address in value.split(",") if address.strip()]
+            if forwarded:
+                return "ip:" + forwarded[-min(self.trusted_hops, len(forwarded))]
+        return "ip:" + (client[0] if client else "unknown")
+
+    def check_rate(self, client: str, bucket: str) -> None:
+        """从客户端的令牌桶中取出一个令牌，不足时抛出 RateLimitExceeded（429）"""
+        rate, burst = self.limits[bucket]
+        if rate <= 0:
+            return
+        wait = self.store.take(f"{bucket}:{client}", rate, burst, self._clock())
+        if wait > 0:
+            metrics.RATE_LIMITED.inc(bucket=bucket, reason="rate")
+            raise RateLimitExceeded(429, "请求过于频繁，请稍后重试", wait)
+
+    async def acquire_slot(self, client: str) -> None:
+        """占用一个重量级请求的并发名额，结束后必须调用 release_slot()"""
+        if self.client_concurrency > 0 and self._active.get(client, 0) >= self.client_concurrency:
+            metrics.RATE_LIMITED.inc(bucket=HEAVY, reason="concurrency")
+            raise RateLimitExceeded(429, f"同时进行的请求数超过 {self.client_concurrency} 个，请等待之前的请求完成", 1)
+        self._active[client] = self._active.get(client, 0) + 1
+        if self._global is None:
+            return
+        try:
+            await asyncio.wait_for(self._global.acquire(), self.global_wait)
+        except asyncio.TimeoutError:
+            self._release_client(client)
+            metrics.RATE_LIMITED.inc(bucket=HEAVY, reason="global")
+            raise RateLimitExceeded(503, "服务繁忙，请稍后重试", self.global_wait) from None
+        except BaseException:
+            self._release_client(client)
+            raise
+
+    def release_slot(self, client: str) -> None:
+        self._release_client(client)
+        if self._global is not None:
+            self._global.release()
+
+    def _release_client(self, client: str) -> None:
+        count = self._active.get(client, 0) - 1
+        if count > 0:
+            self._active[client] = count
+        else:
+            self._active.pop(client, None)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active_clients": len(self._active),
+            "active_heavy_requests": sum(self._active.values()),
+        }
+
+
+def create_rate_limiter(cfg: Settings = settings) -> RateLimiter:
+    """按配置创建限流器"""
+    if cfg.rate_limit_store == "sqlite":
+        store = SqliteRateLimitStore(cfg.rate_limit_sqlite_path)
+    elif cfg.rate_limit_store == "memory":
+        store = MemoryRateLimitStore(cfg.rate_limit_max_clients)
+    else:
+        raise ValueError(f"未知的限流存储后端: {cfg.rate_limit_store}，可选值: memory, sqlite")
+    return RateLimiter(cfg, store)
+
+
+# 全局限流器
+rate_limiter = create_rate_limiter()
+
+
+class RateLimitMiddleware:
+    """
+    限流 ASGI 中间件
+
+    重量级请求的并发名额一直保持到响应（包括流式响应）全部发送完毕。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        limiter = rate_limiter
+        if scope["type"] != "http" or not limiter.enabled or scope["path"] in EXEMPT_PATHS \
+                or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        bucket = HEAVY if (scope["method"], scope["path"]) in HEAVY_ROUTES else LIGHT
+        client = limiter.client_key(Headers(scope=scope), scope.get("client"))
+        try:
+            limiter.check_rate(client, bucket)
+            if bucket == HEAVY:
+                await limiter.acquire_slot(client)
+        except RateLimitExceeded as e:
+            await e.to_response()(scope, receive, send)
+            return
+
+        if bucket == LIGHT:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release_slot(client)
@@ -0,0 +1,57 @@
+"""
+并发请求合并模块（single-flight）
+
+当一篇文章被大量转发时，会有很多并发请求抓取同一个URL。SingleFlight 保证
+同一个键同一时间只有一个真正在执行的任务，其它并发调用者直接等待这个任务的结果：
+
+- 任务成功：所有等待者拿到同一个结果
+- 任务失败：异常会传递给所有等待者
+- 某个等待者被取消（例如客户端断开连接）：只取消它自己的等待，
+  共享任务继续执行，其它等待者不受影响
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """按键合并并发执行的协程"""
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        # 真正执行的次数 / 合并到已有任务上的次数
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行 func()，如果同一个键已有任务在执行，则等待该任务的结果
+
+        func 只在没有进行中的任务时被调用。
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        # shield: 等待者被取消时不会连带取消共享任务
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都被取消时，避免出现 "Task exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {"inflight": self.inflight, "executions": self.executions, "coalesced": self.coalesced}
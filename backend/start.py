@@ -1,4 +1,119 @@
+"""
+启动脚本
+
+开发模式（默认）：单进程，修改代码后自动重启::
+
+    python start.py
+
+生产模式：多个工作进程，不自动重启，参数来自 MAKE_CARD_SERVER_* 配置项
+（环境变量或配置文件，见 config.py），命令行参数优先::
+
+    python start.py --production
+    python start.py --production --config production.env --workers 4
+
+生产模式下：
+- 工作进程数默认为 server_workers，0 表示与CPU核数相同；各进程共享同一个监听端口
+- 安装了 uvloop / httptools（pip install uvicorn[standard]）时自动使用，未安装时回退到 asyncio / h11
+- 收到 SIGTERM / SIGINT 后停止接受新连接，等待进行中的请求（包括正文提取）完成，
+  最多等待 server_graceful_timeout 秒，然后执行应用的关闭流程（等待提取执行池清空、关闭HTTP客户端）
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+from pathlib import Path
+
 import uvicorn
 
+from config import CONFIG_FILE_ENV, Settings
+
+logger = logging.getLogger("start")
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+LOOP_IMPLEMENTATIONS = ("auto", "asyncio", "uvloop")
+HTTP_IMPLEMENTATIONS = ("auto", "h11", "httptools")
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve_loop(name: str) -> str:
+    """把配置项 server_loop 转换为 uvicorn 的 loop 参数，uvloop 未安装时回退到 asyncio"""
+    if name not in LOOP_IMPLEMENTATIONS:
+        raise ValueError(f"未知的事件循环: {name}，可选值: {', '.join(LOOP_IMPLEMENTATIONS)}")
+    if name == "asyncio":
+        return name
+    if _installed("uvloop"):
+        return "uvloop"
+    if name == "uvloop":
+        logger.warning("已指定 uvloop 但未安装，回退到 asyncio（可执行 pip install uvloop）")
+    return "asyncio"
+
+
+def resolve_http(name: str) -> str:
+    """把配置项 server_http 转换为 uvicorn 的 http 参数，httptools 未安装时回退到 h11"""
+    if name not in HTTP_IMPLEMENTATIONS:
+        raise ValueError(f"未知的HTTP实现: {name}，可选值: {', '.join(HTTP_IMPLEMENTATIONS)}")
+    if name == "h11":
+        return name
+    if _installed("httptools"):
+        return "httptools"
+    if name == "httptools":
+        logger.warning("已指定 httptools 但未安装，回退到 h11（可执行 pip install httptools）")
+    return "h11"
+
+
+def production_options(cfg: Settings) -> dict:
+    """生产模式下传给 uvicorn.run() 的参数"""
+    return {
+        "host": cfg.server_host,
+        "port": cfg.server_port,
+        "workers": cfg.server_workers or os.cpu_count() or 1,
+        "loop": resolve_loop(cfg.server_loop),
+        "http": resolve_http(cfg.server_http),
+        "timeout_keep_alive": cfg.server_keepalive_timeout,
+        "backlog": cfg.server_backlog,
+        "timeout_graceful_shutdown": cfg.server_graceful_timeout,
+        "limit_concurrency": cfg.server_limit_concurrency or None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--production", action="store_true", help="生产模式：多工作进程，不自动重启")
+    parser.add_argument("--config", help="配置文件路径（等同于设置环境变量 MAKE_CARD_CONFIG_FILE）")
+    parser.add_argument("--host", help="监听地址，默认使用配置项 server_host")
+    parser.add_argument("--port", type=int, help="监听端口，默认使用配置项 server_port")
+    parser.add_argument("--workers", type=int, help="工作进程数，默认使用配置项 server_workers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.config:
+        # 通过环境变量传给工作进程，各进程导入 config 时读取同一个配置文件
+        os.environ[CONFIG_FILE_ENV] = os.path.abspath(args.config)
+    cfg = Settings.from_env()
+
+    if not args.production:
+        uvicorn.run("main:app", host=args.host or cfg.server_host, port=args.port or cfg.server_port,
+                    reload=True, app_dir=str(BACKEND_DIR))
+        return
+
+    options = production_options(cfg)
+    if args.host:
+        options["host"] = args.host
+    if args.port:
+        options["port"] = args.port
+    if args.workers is not None:
+        options["workers"] = args.workers or os.cpu_count() or 1
+    if options["workers"] > 1 and cfg.job_store == "memory":
+        logger.warning("多个工作进程时内存任务存储互不相通，查询异步任务可能返回404，"
+                       "建议设置 MAKE_CARD_JOB_STORE=sqlite")
+    logger.info("生产模式: %s", ", ".join(f"{name}={value}" for name, value in options.items()))
+    uvicorn.run("main:app", app_dir=str(BACKEND_DIR), **options)
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    main()
@@ -0,0 +1,139 @@
+"""
+流式响应模块
+
+普通接口要等提取全部完成后才一次性返回整个 JSON，正文较长时（没有长度限制，
+可能有几兆）客户端在这段时间里什么也收不到。流式模式下：
+
+- 提示词开头（``[提示词] 请参考以下内容：``）在抓取开始前就立即发出
+- 正文提取完成后按段落逐条发出，不再拼接成一个大字符串
+- 批量请求的每个条目处理完成后立即发出，不等待其它条目
+
+支持两种格式，通过查询参数 ``?stream=ndjson`` / ``?stream=sse`` 或
+Accept 请求头（``application/x-ndjson`` / ``text/event-stream``）选择：
+
+- ndjson: 每行一个 JSON 对象，``{"event": "...", ...}``
+- sse:    Server-Sent Events，``event: ...`` + ``data: {JSON}``
+
+单条结果的事件依次为：
+
+- prompt:    ``{"text": 提示词开头}``；带 ``?response=split`` 并用 prompt_id 引用预设提示词时为
+             ``{"prompt_id": ..., "prompt_version": ...}``，提示词开头由客户端按 ``[提示词] 请参考以下内容：`` 拼接
+- paragraph: ``{"index": 序号, "text": 段落}``，可能有多条
+- done:      ``{"paragraphs": 段落数, "length": 完整结果的字符数}``；启用了卡片存储时与非流式接口一样保存卡片，
+             并附带卡片ID ``card_id``
+- error:     ``{"status_code": 状态码, "detail": 错误信息}``，处理失败时代替 done
+
+客户端把 prompt 的 text 与各段落用换行拼接（``text + "\\n".join(段落)``），
+得到的结果与非流式接口返回的 result 完全相同。
+"""
+
+import json
+from typing import Any, AsyncIterator, Coroutine, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from cards import save_card
+from pipeline import MIN_CONTENT_LENGTH, render_result
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+# 连续的段落事件攒到这么多字节再发出，避免每个短段落都单独写一次
+STREAM_FLUSH_BYTES = 16 * 1024
+
+
+def negotiate_stream_format(request: Request) -> Optional[str]:
+    """
+    确定响应格式：返回 ndjson / sse，或 None（普通 JSON 响应）
+
+    查询参数 stream 优先于 Accept 请求头；stream 的值无效时返回 400。
+    """
+    requested = request.query_params.get("stream")
+    if requested is not None:
+        if requested not in STREAM_MEDIA_TYPES:
+            raise HTTPException(status_code=400,
+                                detail=f"不支持的流式格式: {requested}，可选值: {', '.join(STREAM_MEDIA_TYPES)}")
+        return requested
+    accept = request.headers.get("accept", "")
+    for fmt, media_type in STREAM_MEDIA_TYPES.items():
+        if media_type in accept:
+            return fmt
+    return None
+
+
+def encode_event(fmt: str, event: str, data: Dict[str, Any]) -> bytes:
+    """把一个事件编码为 NDJSON 行或 SSE 消息"""
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+    return (json.dumps({"event": event, **data}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def error_event(fmt: str, exc: Exception) -> bytes:
+    """把处理过程中的异常编码为 error 事件（响应头已经发出，无法再改状态码）"""
+    if isinstance(exc, HTTPException):
+        return encode_event(fmt, "error", {"status_code": exc.status_code, "detail": exc.detail})
+    return encode_event(fmt, "error", {"status_code": 500, "detail": f"处理失败: {str(exc)}"})
+
+
+def prompt_header(prompt: str) -> str:
+    """结果开头的提示词部分，即 render_result(prompt, '')"""
+    return render_result(prompt, "")
+
+
+async def iter_result_events(fmt: str, prompt: str, content: Coroutine[Any, Any, str],
+                             source_label: Optional[str] = None,
+                             prompt_ref: Optional[Dict[str, str]] = None,
+                             card_source: Optional[Tuple[str, Optional[str]]] = None) -> AsyncIterator[bytes]:
+    """
+    单条结果的事件流
+
+    content 是尚未开始执行的协程（抓取、提取等），在提示词开头发出之后才开始等待。
+    source_label 不为 None 时按 render_extracted() 的规则处理过短的正文。
+    prompt_ref 不为空时（?response=split 且引用了预设提示词），prompt 事件只包含 prompt_id 和 prompt_version。
+    card_source 为 (来源类型, 来源) 时把完整结果保存为卡片，卡片ID放在 done 事件中。
+    """
+    try:
+        yield encode_event(fmt, "prompt", prompt_ref or {"text": prompt_header(prompt)})
+    except BaseException:
+        # 客户端在收到开头后就断开了连接，content 还没有开始执行
+        content.close()
+        raise
+    try:
+        text = await content
+    except Exception as e:
+        yield error_event(fmt, e)
+        return
+
+    if source_label is not None and (not text or len(text.strip()) < MIN_CONTENT_LENGTH):
+        text = f"无法从该{source_label}提取有效内容"
+
+    buffer = bytearray()
+    count = 0
+    for count, paragraph in enumerate(text.split("\n"), start=1):
+        buffer += encode_event(fmt, "paragraph", {"index": count - 1, "text": paragraph})
+        if len(buffer) >= STREAM_FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    done = {"paragraphs": count, "length": len(prompt_header(prompt)) + len(text)}
+    if card_source is not None:
+        # 先发出剩余的段落，再保存卡片
+        if buffer:
+            yield bytes(buffer)
+            buffer.clear()
+        card_id = await save_card(prompt, render_result(prompt, text), *card_source)
+        if card_id is not None:
+            done["card_id"] = card_id
+    buffer += encode_event(fmt, "done", done)
+    yield bytes(buffer)
+
+
+def streaming_response(fmt: str, events: AsyncIterator[bytes]) -> StreamingResponse:
+    """创建流式响应，并关闭反向代理的缓冲，使事件能立即到达客户端"""
+    return StreamingResponse(
+        events,
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,26 @@
+"""
+测试公共设置：
+
+- 把 backend 和 backend/benchmarks 目录加入 sys.path，使测试可以直接 import 后端模块、
+  基准测试中的旧实现和本地桩服务器（benchmarks/common.py 中的 StubServer）
+- 异步测试用 @pytest.mark.anyio 标记，在 asyncio 事件循环中运行
+
+运行方式（在 backend 目录下）::
+
+    python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+for path in (BACKEND_DIR, BACKEND_DIR / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,44 @@
+"""
+批量请求和异步任务中直接提交的 HTML 与上传文件一样受 upload_max_bytes 限制
+"""
+
+import dataclasses
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import batch
+import main
+from batch import BatchItem, validate_item
+
+MAX_BYTES = 1024
+
+
+@pytest.fixture(autouse=True)
+def small_upload_limit(monkeypatch):
+    monkeypatch.setattr(batch, "settings", dataclasses.replace(batch.settings, upload_max_bytes=MAX_BYTES))
+
+
+def test_validate_item_counts_encoded_bytes():
+    validate_item(BatchItem(html="a" * MAX_BYTES))
+    with pytest.raises(HTTPException) as error:
+        # 每个汉字按 UTF-8 编码为 3 个字节
+        validate_item(BatchItem(html="正" * (MAX_BYTES // 3 + 1)))
+    assert error.value.status_code == 413
+
+
+def test_oversized_inline_html_is_rejected():
+    client = TestClient(main.app)
+    oversized = "<p>" + "正文" * MAX_BYTES + "</p>"
+
+    response = client.post("/process_batch", json={"items": [{"html": oversized}, {"text": "一段正常的文本内容"}],
+                                                   "prompt": "总结"})
+    assert response.status_code == 200
+    first, second = response.json()["results"]
+    assert not first["ok"] and first["status_code"] == 413
+    assert second["ok"]
+
+    response = client.post("/jobs", json={"html": oversized, "prompt": "总结"})
+    assert response.status_code == 413
+    assert main.job_queue.store.counts()["queued"] == 0
@@ -0,0 +1,37 @@
+"""
+sqlite 内容缓存：多个工作进程共用同一个文件时，总大小仍然不超过 max_bytes
+"""
+
+import sqlite3
+import time
+
+from cache import CacheEntry, SqliteCacheBackend
+
+MAX_BYTES = 10_000
+
+
+def entry(size: int) -> CacheEntry:
+    now = time.time()
+    return CacheEntry(content="x" * size, stored_at=now, expires_at=now + 60)
+
+
+def stored_bytes(path: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+
+
+def test_shared_file_stays_within_max_bytes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    # 模拟两个工作进程各自打开同一个文件
+    workers = [SqliteCacheBackend(path, MAX_BYTES), SqliteCacheBackend(path, MAX_BYTES)]
+    try:
+        for i in range(40):
+            workers[i % 2].set(f"https://example.com/{i}", entry(1000))
+            assert stored_bytes(path) <= MAX_BYTES
+        assert workers[0].total_bytes == workers[1].total_bytes == stored_bytes(path)
+        # 最近写入的条目保留，最早的被淘汰
+        assert workers[0].get("https://example.com/39") is not None
+        assert workers[1].get("https://example.com/0") is None
+    finally:
+        for backend in workers:
+            backend.close()
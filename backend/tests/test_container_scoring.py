@@ -0,0 +1,64 @@
+"""
+内容容器选择：单次遍历的 find_main_container() 与旧的多选择器实现必须选中同一个元素
+
+在样本页面和随机生成的文档树上对比（每种可用的解析器都测试）。
+"""
+
+import random
+
+import pytest
+
+from bench_container_scoring import build_nested_page, legacy_find_container, strip_noise
+from common import load_corpus
+from extractor import find_main_container
+from parsers import available_backends, parse_html
+
+PARSERS = [name for name in ("html.parser", "lxml") if name in available_backends()]
+
+TAGS = ['div', 'div', 'p', 'span', 'a', 'section', 'article', 'main', 'ul', 'li', 'h2', 'nav', 'script']
+CLASSES = ['content', 'article', 'post', 'post-content', 'entry-content', 'article-body', 'main-post',
+           'content-wrap', 'sidebar', 'x']
+IDS = ['content', 'article', 'main', 'other']
+WORDS = ['正文', '内容', '链接', '评论', 'text', '  ', '一段比较长的文字内容']
+
+RANDOM_TREES = 300
+
+
+def random_tree(rng: random.Random, depth: int = 0) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 4 if depth < 5 else 0)):
+        if rng.random() < 0.4:
+            parts.append(rng.choice(WORDS) * rng.randint(1, 5))
+            continue
+        tag = rng.choice(TAGS)
+        attrs = ''
+        if rng.random() < 0.5:
+            attrs += ' class="' + ' '.join(rng.sample(CLASSES, rng.randint(1, 2))) + '"'
+        if rng.random() < 0.2:
+            attrs += f' id="{rng.choice(IDS)}"'
+        parts.append(f'<{tag}{attrs}>{random_tree(rng, depth + 1)}</{tag}>')
+    return ''.join(parts)
+
+
+def assert_same_container(html: str, parser: str) -> None:
+    soup = strip_noise(parse_html(html, parser))
+    assert find_main_container(soup) is legacy_find_container(soup)
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("name", sorted(load_corpus()))
+def test_corpus_pages(name, parser):
+    assert_same_container(load_corpus()[name], parser)
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_nested_page(parser):
+    assert_same_container(build_nested_page(30, 3), parser)
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_random_trees(parser):
+    rng = random.Random(20240518)
+    for _ in range(RANDOM_TREES):
+        html = f'<html><body>{random_tree(rng)}</body></html>'
+        assert_same_container(html, parser)
@@ -0,0 +1,167 @@
+"""
+抓取的重试与熔断：只重试可能恢复的错误，遵守 Retry-After，连续失败的域名熔断后不再访问源站
+
+在可注入故障的本地桩服务器上验证 fetcher.fetch_page()。
+"""
+
+import asyncio
+import dataclasses
+import socket
+import time
+from collections import Counter
+
+import pytest
+from common import StubServer
+from fastapi import HTTPException
+
+import fetcher
+import http_client
+from circuit_breaker import CLOSED, OPEN, CircuitBreakers, CircuitOpenError
+
+PAGE = "<html><body><p>恢复正常后的页面内容</p></body></html>".encode("utf-8")
+
+THRESHOLD = 3
+RECOVERY = 0.5
+
+
+class FaultyOrigin(StubServer):
+    """按路径注入故障的源站，记录每个路径收到的请求数"""
+
+    def __init__(self):
+        self.hits = Counter()
+        # /down 是否已恢复
+        self.healthy = False
+        super().__init__(handler=self.handle)
+
+    def handle(self, request) -> None:
+        path = request.path
+        self.hits[path] += 1
+        status, headers = 200, {}
+        if path == "/missing":
+            status = 404
+        elif path == "/flaky" and self.hits[path] <= 2:
+            status = 503
+        elif path == "/limited" and self.hits[path] == 1:
+            status, headers = 429, {"Retry-After": "1"}
+        elif path == "/down" and not self.healthy:
+            status = 500
+        elif path == "/hang":
+            time.sleep(3)
+        body = PAGE if status == 200 else b"error"
+        request.send_response(status)
+        for key, value in headers.items():
+            request.send_header(key, value)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        try:
+            request.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def origin():
+    with FaultyOrigin() as origin:
+        yield origin
+
+
+@pytest.fixture(autouse=True)
+async def fast_retries(monkeypatch):
+    monkeypatch.setattr(fetcher, "settings", dataclasses.replace(
+        fetcher.settings, fetch_max_attempts=3, fetch_backoff_base=0.05, fetch_backoff_max=0.2,
+        fetch_deadline=5.0, http_timeout=10.0))
+    monkeypatch.setattr(fetcher, "circuit_breakers", CircuitBreakers(THRESHOLD, RECOVERY))
+    yield
+    await http_client.close_client()
+
+
+async def attempt(url: str):
+    """返回 (结果或异常, 耗时)"""
+    start = time.perf_counter()
+    try:
+        result = await fetcher.fetch_page(url)
+    except HTTPException as e:
+        result = e
+    return result, time.perf_counter() - start
+
+
+def free_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.mark.anyio
+async def test_client_error_is_not_retried(origin):
+    result, _ = await attempt(origin.url("/missing"))
+    assert isinstance(result, HTTPException)
+    assert origin.hits["/missing"] == 1
+
+
+@pytest.mark.anyio
+async def test_server_error_is_retried_until_success(origin):
+    result, _ = await attempt(origin.url("/flaky"))
+    assert not isinstance(result, HTTPException)
+    assert origin.hits["/flaky"] == 3
+
+
+@pytest.mark.anyio
+async def test_retry_after_is_honoured(origin):
+    result, elapsed = await attempt(origin.url("/limited"))
+    assert not isinstance(result, HTTPException)
+    assert elapsed >= 1.0
+
+
+@pytest.mark.anyio
+async def test_refused_connection_opens_breaker():
+    refused = f"http://127.0.0.1:{free_port()}/"
+    result, _ = await attempt(refused)
+    assert isinstance(result, HTTPException) and result.status_code == 400
+    assert fetcher.circuit_breakers.state(refused.split("/")[2]) == OPEN
+
+
+@pytest.mark.anyio
+async def test_breaker_opens_probes_and_closes(origin):
+    key = f"127.0.0.1:{origin.port}"
+    # 持续 500：第一次请求的 3 次尝试即达到熔断阈值
+    await attempt(origin.url("/down"))
+    assert origin.hits["/down"] == THRESHOLD
+    assert fetcher.circuit_breakers.state(key) == OPEN
+
+    before = origin.hits["/down"]
+    result, elapsed = await attempt(origin.url("/down"))
+    assert isinstance(result, CircuitOpenError) and result.headers.get("Retry-After")
+    assert origin.hits["/down"] == before and elapsed < 0.05
+
+    # 熔断到期后只放行 1 个探测请求；探测失败后重新熔断，它自己的下一次重试也会被拒绝
+    await asyncio.sleep(RECOVERY)
+    before = origin.hits["/down"]
+    results = await asyncio.gather(*(attempt(origin.url("/down")) for _ in range(5)))
+    assert origin.hits["/down"] == before + 1
+    assert all(isinstance(result, CircuitOpenError) for result, _ in results)
+    assert fetcher.circuit_breakers.state(key) == OPEN
+
+    origin.healthy = True
+    await asyncio.sleep(RECOVERY)
+    result, _ = await attempt(origin.url("/down"))
+    assert not isinstance(result, HTTPException)
+    assert fetcher.circuit_breakers.state(key) == CLOSED
+
+
+@pytest.mark.anyio
+async def test_repeated_requests_to_down_host_stop_at_threshold(origin):
+    # 原先固定 3 次尝试、每次间隔 1 秒：10 次请求需要访问源站 30 次、约 20 秒
+    for _ in range(10):
+        await attempt(origin.url("/down"))
+    assert origin.hits["/down"] == THRESHOLD
+
+
+@pytest.mark.anyio
+async def test_hanging_origin_stops_at_deadline(origin, monkeypatch):
+    monkeypatch.setattr(fetcher, "settings", dataclasses.replace(fetcher.settings, fetch_deadline=1.0))
+    result, elapsed = await attempt(origin.url("/hang"))
+    assert isinstance(result, HTTPException)
+    assert elapsed < 1.5
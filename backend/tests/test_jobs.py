@@ -0,0 +1,71 @@
+"""
+异步任务：租约失效后的结果不覆盖接手者的结果，存储出错时执行协程不退出
+"""
+
+import asyncio
+import dataclasses
+import sqlite3
+import time
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = jobs.MemoryJobStore() if request.param == "memory" else jobs.SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def finished(job: jobs.Job, result: str) -> jobs.Job:
+    return dataclasses.replace(job, status=jobs.SUCCEEDED, result=result, finished_at=time.time(),
+                               expires_at=time.time() + 60, claimed_by=None, lease_until=None)
+
+
+def test_finish_after_lost_lease_is_dropped(store):
+    store.save(jobs.Job(id="job", payload={"text": "正文", "prompt": "总结"}))
+    now = time.time()
+    stale = store.claim("job", now, "a", now - 1)
+    # a 的租约过期，任务由 b 接手并先完成
+    assert store.requeue_expired(now) == 1
+    taken = store.claim("job", now, "b", now + 60)
+    assert store.finish(finished(taken, "b 的结果"), "b")
+
+    assert not store.finish(finished(stale, "a 的结果"), "a")
+    assert store.get("job").result == "b 的结果"
+
+
+def test_worker_survives_claim_errors(monkeypatch):
+    async def scenario():
+        queue = jobs.JobQueue(jobs.MemoryJobStore(), workers=1, max_queue=10, ttl=60)
+        claim = queue.store.claim
+        failures = []
+
+        def flaky_claim(job_id, *args):
+            if not failures:
+                failures.append(job_id)
+                raise sqlite3.OperationalError("database is locked")
+            return claim(job_id, *args)
+
+        async def fake_process_item(item, prompt):
+            return prompt + item.text
+
+        monkeypatch.setattr(queue.store, "claim", flaky_claim)
+        monkeypatch.setattr(jobs, "process_item", fake_process_item)
+        await queue.start()
+        try:
+            first = queue.submit(jobs.JobRequest(text="第一段测试文本", prompt="总结："))
+            second = queue.submit(jobs.JobRequest(text="第二段测试文本", prompt="总结："))
+            for _ in range(100):
+                if queue.get(second.id).done:
+                    break
+                await asyncio.sleep(0.01)
+            return failures, queue.get(first.id), queue.get(second.id)
+        finally:
+            await queue.stop()
+
+    failures, first, second = asyncio.run(scenario())
+    assert failures == [first.id] and first.status == jobs.QUEUED
+    assert second.status == jobs.SUCCEEDED and second.result == "总结：第二段测试文本"
@@ -0,0 +1,76 @@
+"""
+并发请求合并：同一URL的并发抓取只访问一次源站，错误传递给所有等待者，取消一个等待者不影响共享任务
+
+在响应很慢的本地桩服务器上验证，运行期间关闭内容缓存。
+"""
+
+import asyncio
+import time
+
+import pytest
+from common import StubServer
+from fastapi import HTTPException
+
+import http_client
+import pipeline
+from singleflight import SingleFlight
+
+PAGE = ("<html><body><article>" + "<p>并发请求合并测试页面的正文内容，足够长以通过过滤。</p>" * 20
+        + "</article></body></html>").encode("utf-8")
+
+# 桩服务器每次响应前等待的秒数
+DELAY = 0.3
+CALLERS = 50
+
+
+def slow_handler(request) -> None:
+    time.sleep(DELAY)
+    status = 500 if request.path.startswith("/error") else 200
+    body = PAGE if status == 200 else b"error"
+    request.send_response(status)
+    request.send_header("Content-Type", "text/html; charset=utf-8")
+    request.send_header("Content-Length", str(len(body)))
+    request.end_headers()
+    request.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    with StubServer(handler=slow_handler) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+async def fresh_flights(monkeypatch):
+    monkeypatch.setattr(pipeline, "content_cache", None)
+    monkeypatch.setattr(pipeline, "url_flights", SingleFlight())
+    yield
+    await http_client.close_client()
+
+
+@pytest.mark.anyio
+async def test_concurrent_callers_share_one_fetch(server):
+    results = await asyncio.gather(*(pipeline.fetch_and_extract(server.url("/page")) for _ in range(CALLERS)))
+    assert server.requests == 1
+    assert len(set(results)) == 1 and results[0]
+    assert pipeline.url_flights.coalesced == CALLERS - 1
+
+
+@pytest.mark.anyio
+async def test_error_reaches_every_waiter(server):
+    outcomes = await asyncio.gather(*(pipeline.fetch_and_extract(server.url("/error")) for _ in range(CALLERS)),
+                                    return_exceptions=True)
+    assert all(isinstance(outcome, HTTPException) and outcome.status_code == 400 for outcome in outcomes)
+    # 共享的抓取本身会重试：3 次请求，而不是每个等待者各 3 次
+    assert server.requests == 3
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_does_not_cancel_shared_fetch(server):
+    waiters = [asyncio.create_task(pipeline.fetch_and_extract(server.url("/other"))) for _ in range(3)]
+    await asyncio.sleep(DELAY / 2)
+    waiters[0].cancel()
+    outcomes = await asyncio.gather(*waiters, return_exceptions=True)
+    assert isinstance(outcomes[0], asyncio.CancelledError)
+    assert all(isinstance(outcome, str) and outcome for outcome in outcomes[1:])
+    assert server.requests == 1
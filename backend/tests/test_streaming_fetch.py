@@ -0,0 +1,139 @@
+"""
+流式下载的限制：过大、非网页、慢速发送的响应被拒绝或中止，而不是全部下载；编码按响应头识别
+
+在模拟各种异常响应的本地桩服务器上验证 fetcher.fetch_page()。
+"""
+
+import asyncio
+import dataclasses
+import time
+
+import pytest
+from common import StubServer
+from fastapi import HTTPException
+
+import fetcher
+import http_client
+
+MAX_BYTES = 256 * 1024
+CHUNK = b"<p>" + "填充内容".encode("utf-8") * 250 + b"</p>"
+GBK_PAGE = "<html><body><p>这是一段只在响应头中声明GBK编码的中文正文。</p></body></html>".encode("gbk")
+# 无限长的响应最多发送的字节数
+ENDLESS_BYTES = MAX_BYTES * 20
+
+
+def write_chunk(request, data: bytes) -> None:
+    request.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+class Origin(StubServer):
+    """按路径返回各种异常响应，记录每个路径实际发送的字节数"""
+
+    def __init__(self):
+        self.sent = {}
+        super().__init__(handler=self.handle)
+
+    def handle(self, request) -> None:
+        path = request.path
+        request.send_response(200)
+        if path == "/declared-huge":
+            request.send_header("Content-Type", "text/html")
+            request.send_header("Content-Length", str(MAX_BYTES * 10))
+            request.end_headers()
+            return
+        if path == "/binary":
+            body = b"\x00" * 1024
+            request.send_header("Content-Type", "application/octet-stream")
+            request.send_header("Content-Length", str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+            return
+        if path == "/gbk":
+            request.send_header("Content-Type", "text/html; charset=gbk")
+            request.send_header("Content-Length", str(len(GBK_PAGE)))
+            request.end_headers()
+            request.wfile.write(GBK_PAGE)
+            return
+
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Transfer-Encoding", "chunked")
+        request.end_headers()
+        self.sent[path] = 0
+        try:
+            if path == "/endless":
+                for _ in range(ENDLESS_BYTES // len(CHUNK)):
+                    write_chunk(request, CHUNK)
+                    self.sent[path] += len(CHUNK)
+                    time.sleep(0.001)
+            elif path == "/drip":
+                for _ in range(100):
+                    write_chunk(request, b"<p>.</p>")
+                    self.sent[path] += 8
+                    time.sleep(0.1)
+            elif path == "/body-end":
+                write_chunk(request, b"<html><body><article>" + CHUNK + b"</article></body>")
+                for _ in range(ENDLESS_BYTES // len(CHUNK)):
+                    write_chunk(request, b"<!-- trailing -->" + CHUNK)
+                    self.sent[path] += len(CHUNK)
+                    time.sleep(0.001)
+            request.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def origin():
+    with Origin() as origin:
+        yield origin
+
+
+@pytest.fixture(autouse=True)
+async def download_limits(monkeypatch):
+    monkeypatch.setattr(fetcher, "settings", dataclasses.replace(fetcher.settings, fetch_max_bytes=MAX_BYTES,
+                                                                 fetch_download_timeout=1.0))
+    yield
+    await http_client.close_client()
+
+
+async def assert_rejected(url: str) -> None:
+    with pytest.raises(HTTPException) as error:
+        await fetcher.fetch_page(url, max_retries=1)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_declared_huge_response_is_rejected(origin):
+    await assert_rejected(origin.url("/declared-huge"))
+
+
+@pytest.mark.anyio
+async def test_undeclared_huge_response_is_aborted(origin):
+    await assert_rejected(origin.url("/endless"))
+    # 等服务器发现连接已断开
+    await asyncio.sleep(0.5)
+    assert origin.sent["/endless"] < ENDLESS_BYTES
+
+
+@pytest.mark.anyio
+async def test_binary_content_type_is_rejected(origin):
+    await assert_rejected(origin.url("/binary"))
+
+
+@pytest.mark.anyio
+async def test_slow_drip_hits_download_timeout(origin):
+    start = time.perf_counter()
+    await assert_rejected(origin.url("/drip"))
+    assert time.perf_counter() - start < 2
+
+
+@pytest.mark.anyio
+async def test_charset_from_header_is_used(origin):
+    page = await fetcher.fetch_page(origin.url("/gbk"), max_retries=1)
+    assert "GBK编码的中文正文" in page.text
+
+
+@pytest.mark.anyio
+async def test_stop_at_body_end(origin, monkeypatch):
+    monkeypatch.setattr(fetcher, "settings", dataclasses.replace(fetcher.settings, fetch_stop_at_body_end=True))
+    page = await fetcher.fetch_page(origin.url("/body-end"), max_retries=1)
+    assert "</body>" in page.text and len(page.text.encode("utf-8")) < MAX_BYTES
@@ -0,0 +1,36 @@
+"""
+提取执行池：等待方被取消后，仍在执行的任务继续占用名额，直到真正执行完
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from workers import ExtractionPool, PoolSaturatedError
+
+
+def test_cancelled_wait_keeps_slot_until_job_finishes():
+    async def scenario():
+        pool = ExtractionPool(kind="thread", workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(pool.run(release.wait), timeout=0.05)
+            # 执行器中的任务还在运行：不能再放入新任务
+            assert pool.pending == 1
+            with pytest.raises(PoolSaturatedError):
+                await pool.run(sum, [1, 2])
+
+            release.set()
+            for _ in range(100):
+                if pool.pending == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert pool.pending == 0
+            assert await pool.run(sum, [1, 2]) == 3
+        finally:
+            release.set()
+            pool.shutdown()
+
+    asyncio.run(scenario())
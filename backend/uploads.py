@@ -0,0 +1,60 @@
+"""
+上传文件读取模块
+
+上传的HTML文件已经由 FastAPI 暂存在临时文件中（较大的文件会写到磁盘），
+这里按块读取而不是一次性 ``await file.read()``，避免同时在内存中保留
+完整的原始字节和解码后的文本：
+
+- hash_upload():   第一遍按块读取，计算内容哈希并检查大小，超过上限时抛出 413
+- decode_upload(): 第二遍按块增量解码，编码从 BOM 或 <meta charset> 中识别，
+                   识别不到时使用 UTF-8
+"""
+
+import codecs
+import hashlib
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from charsets import detect_charset
+
+# 每次读取的块大小
+CHUNK_SIZE = 64 * 1024
+
+
+async def hash_upload(file: UploadFile, max_bytes: int) -> Tuple[str, int]:
+    """
+    按块读取上传文件，返回 (内容哈希, 文件字节数)
+
+    文件超过 max_bytes 时立即停止读取并返回 413。读取结束后文件指针回到开头。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"文件过大，最大支持 {max_bytes // (1024 * 1024)}MB")
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
+async def decode_upload(file: UploadFile, encoding: Optional[str] = None) -> str:
+    """按块增量解码上传文件；未指定 encoding 时从 BOM 或 <meta charset> 中识别"""
+    await file.seek(0)
+    head = await file.read(CHUNK_SIZE)
+    detected, bom_length = detect_charset(head)
+    decoder = codecs.getincrementaldecoder(encoding or detected)(errors='ignore')
+
+    parts: List[str] = [decoder.decode(head[bom_length:])]
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
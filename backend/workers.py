@@ -0,0 +1,118 @@
+"""
+提取任务执行池模块
+
+正文提取（BeautifulSoup 解析 + 文本过滤）是同步的CPU密集型操作，
+如果直接在 async 接口里执行，一个大网页就会阻塞整个 uvicorn 事件循环，
+导致 /preset_prompts 这样的轻量请求也一起卡住。
+
+ExtractionPool 把这些同步函数放到线程池或进程池中执行：
+- thread:  线程池，启动快，适合中小页面（受GIL限制，CPU并行度有限）
+- process: 进程池，真正的多核并行，适合大页面较多的场景
+- inline:  不使用执行池，直接在事件循环中执行（仅用于调试或对比测试）
+
+执行池的排队深度是有限的：正在执行与排队的任务总数达到
+``workers + max_queue`` 时，新任务会立即抛出 PoolSaturatedError，
+由接口层转换为 503 响应，而不是无限堆积请求。等待结果的请求被取消（客户端断开、超时）后，
+已经开始执行的任务仍然计入总数，直到它真正执行完。
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+class PoolSaturatedError(RuntimeError):
+    """执行池已满（正在执行和排队的任务数达到上限）"""
+
+
+class ExtractionPool:
+    """带有界队列的提取任务执行池"""
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_queue: int = 32):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"未知的执行池类型: {kind}，可选值: {', '.join(EXECUTOR_KINDS)}")
+        if workers < 1:
+            raise ValueError("workers 必须大于0")
+        if max_queue < 0:
+            raise ValueError("max_queue 不能为负数")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        # 正在执行 + 排队中的任务数，只在事件循环线程中修改，无需加锁
+        self._pending = 0
+
+    @classmethod
+    def from_settings(cls, cfg: Settings = settings) -> "ExtractionPool":
+        return cls(kind=cfg.extract_executor, workers=cfg.extract_workers, max_queue=cfg.extract_max_queue)
+
+    @property
+    def capacity(self) -> int:
+        """最多同时容纳的任务数（执行中 + 排队中）"""
+        return self.workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self) -> None:
+        """创建底层执行器（重复调用无副作用）"""
+        if self._executor is not None or self.kind == "inline":
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="extract")
+        logger.info("提取执行池已启动: kind=%s workers=%d max_queue=%d", self.kind, self.workers, self.max_queue)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭执行池；wait=True 时等待已提交的任务执行完毕"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        在执行池中运行同步函数并等待结果
+
+        注意：使用进程池时 func 和参数必须可以被 pickle（即模块级函数）。
+        """
+        if self._pending >= self.capacity:
+            raise PoolSaturatedError(f"提取任务已满（{self._pending}/{self.capacity}）")
+
+        if self.kind == "inline":
+            return func(*args)
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(functools.partial(func, *args))
+        self._pending += 1
+        # 等待方被取消（客户端断开、wait_for 超时）时已开始执行的任务仍会执行完，
+        # 所以在执行器中的任务结束时才减少计数，而不是在等待结束时
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        """执行器中的任务结束（完成、出错或排队时被取消）后在事件循环线程中减少计数"""
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            # 事件循环已关闭（服务正在退出），计数不再使用
+            pass
+
+    def _decrement(self) -> None:
+        self._pending -= 1
+
+
+# 全局执行池实例
+extraction_pool = ExtractionPool.from_settings()